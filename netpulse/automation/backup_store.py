@@ -0,0 +1,272 @@
+"""
+NetPulse Backup Store
+Content-addressed local storage for device configuration backups
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional
+
+
+class BackupStore:
+    """Deduplicated backup blobs keyed by SHA-256, indexed by marker/role/time in SQLite"""
+
+    def __init__(self, root: str = None, db_path: str = None):
+        """
+        root: directory holding the blob objects (default: the app's data/backups)
+        db_path: SQLite index (default: the application's netpulse.db)
+        """
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core', 'data')
+        self.root = root or os.path.join(data_dir, 'backups')
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.db_path = db_path or os.path.join(data_dir, 'netpulse.db')
+        self._lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._init_database()
+
+    def _init_database(self):
+        """Create the blob and backup index tables"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS backup_blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS backup_entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    marker TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    host TEXT,
+                    remote_path TEXT,
+                    sha256 TEXT NOT NULL REFERENCES backup_blobs(sha256),
+                    backup_time DATETIME NOT NULL
+                )
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_backup_entries_lookup
+                ON backup_entries (marker, role, name, backup_time)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_backup_entries_time
+                ON backup_entries (backup_time)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_backup_entries_sha
+                ON backup_entries (sha256)
+            ''')
+
+            conn.commit()
+
+    def add_file(self, path: str, marker: str, role: str, name: str,
+                 backup_time: datetime = None, host: str = None,
+                 remote_path: str = None, sha256: str = None) -> Dict:
+        """
+        Store a local file and record it as a backup of name on marker/role.
+        sha256: digest of the file when already known (e.g. computed while downloading)
+        """
+        if sha256 is None:
+            sha256 = self._hash_file(path)
+        size = os.path.getsize(path)
+
+        with open(path, 'rb') as source:
+            deduplicated = self._store_blob(sha256, size, source)
+
+        entry_id = self._add_entry(marker, role, name, sha256, backup_time, host, remote_path)
+        return {"id": entry_id, "sha256": sha256, "bytes": size, "deduplicated": deduplicated}
+
+    def add_bytes(self, data: bytes, marker: str, role: str, name: str,
+                  backup_time: datetime = None, host: str = None,
+                  remote_path: str = None) -> Dict:
+        """Store in-memory content and record it as a backup of name on marker/role"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        deduplicated = self._store_blob(sha256, len(data), io.BytesIO(data))
+        entry_id = self._add_entry(marker, role, name, sha256, backup_time, host, remote_path)
+        return {"id": entry_id, "sha256": sha256, "bytes": len(data), "deduplicated": deduplicated}
+
+    def add_existing(self, sha256: str, marker: str, role: str, name: str,
+                     backup_time: datetime = None, host: str = None,
+                     remote_path: str = None) -> Optional[Dict]:
+        """
+        Record a backup whose content is already stored, without any data.
+        Returns None when no blob with this hash exists.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute('SELECT size FROM backup_blobs WHERE sha256 = ?', (sha256,)).fetchone()
+        if row is None or not os.path.exists(self._object_path(sha256)):
+            return None
+        entry_id = self._add_entry(marker, role, name, sha256, backup_time, host, remote_path)
+        return {"id": entry_id, "sha256": sha256, "bytes": row[0], "deduplicated": True}
+
+    def open(self, sha256: str) -> BinaryIO:
+        """Open a stored blob for streaming reads"""
+        path = self._object_path(sha256)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No stored backup with hash {sha256}")
+        return gzip.open(path, 'rb')
+
+    def read(self, sha256: str) -> bytes:
+        """Return the full content of a stored blob"""
+        with self.open(sha256) as f:
+            return f.read()
+
+    def export(self, sha256: str, destination: str):
+        """Write a stored blob back out as a plain file"""
+        with self.open(sha256) as source, open(destination, 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+    def latest(self, marker: str, role: str, name: str) -> Optional[Dict]:
+        """Most recent backup entry of name on marker/role"""
+        entries = self.history(marker=marker, role=role, name=name, limit=1)
+        return entries[0] if entries else None
+
+    def latest_per_device(self, name: str, markers: List[str] = None) -> List[Dict]:
+        """Most recent backup entry of name for every marker/role (optionally only these markers)"""
+        where, params = "WHERE name = ?", [name]
+        if markers:
+            where += f" AND marker IN ({', '.join('?' * len(markers))})"
+            params += list(markers)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f'''
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY marker, role ORDER BY backup_time DESC, id DESC
+                    ) AS recency
+                    FROM backup_entries {where}
+                ) WHERE recency = 1
+                ORDER BY marker, role
+            ''', params)
+            return [{key: row[key] for key in row.keys() if key != "recency"} for row in cursor.fetchall()]
+
+    def history(self, marker: str = None, role: str = None, name: str = None,
+                since: datetime = None, until: datetime = None, limit: int = 100) -> List[Dict]:
+        """Backup entries matching the filters, newest first"""
+        clauses, params = [], []
+        for column, value in (("marker", marker), ("role", role), ("name", name)):
+            if value is not None:
+                clauses.append(f"e.{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("e.backup_time >= ?")
+            params.append(self._format_time(since))
+        if until is not None:
+            clauses.append("e.backup_time < ?")
+            params.append(self._format_time(until))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f'''
+                SELECT e.*, b.size FROM backup_entries e
+                JOIN backup_blobs b ON b.sha256 = e.sha256
+                {where}
+                ORDER BY e.backup_time DESC, e.id DESC
+                LIMIT ?
+            ''', (*params, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def stats(self) -> Dict[str, int]:
+        """Entry and blob counts plus logical vs stored bytes"""
+        with sqlite3.connect(self.db_path) as conn:
+            entries, logical = conn.execute('''
+                SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM backup_entries e
+                JOIN backup_blobs b ON b.sha256 = e.sha256
+            ''').fetchone()
+            blobs, stored = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(stored_size), 0) FROM backup_blobs'
+            ).fetchone()
+        return {"entries": entries, "blobs": blobs, "logical_bytes": logical, "stored_bytes": stored}
+
+    def prune(self, keep_after: datetime) -> Dict[str, int]:
+        """Drop entries older than keep_after and delete blobs nothing refers to any more"""
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            removed = conn.execute('DELETE FROM backup_entries WHERE backup_time < ?',
+                                   (self._format_time(keep_after),)).rowcount
+            orphans = [row[0] for row in conn.execute('''
+                SELECT sha256 FROM backup_blobs
+                WHERE sha256 NOT IN (SELECT DISTINCT sha256 FROM backup_entries)
+            ''')]
+            conn.executemany('DELETE FROM backup_blobs WHERE sha256 = ?', ((sha,) for sha in orphans))
+            conn.commit()
+
+        for sha256 in orphans:
+            try:
+                os.remove(self._object_path(sha256))
+            except OSError:
+                pass
+        return {"entries": removed, "blobs": len(orphans)}
+
+    def has_blob(self, sha256: str) -> bool:
+        """True when content with this hash is already stored"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('SELECT 1 FROM backup_blobs WHERE sha256 = ?', (sha256,)).fetchone() is not None
+
+    def _store_blob(self, sha256: str, size: int, source) -> bool:
+        """Write a compressed blob unless it exists; returns True when it was deduplicated"""
+        path = self._object_path(sha256)
+        with self._lock:
+            if self.has_blob(sha256) and os.path.exists(path):
+                return True
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as target:
+                    shutil.copyfileobj(source, target, 1 << 16)
+                os.replace(partial, path)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO backup_blobs (sha256, size, stored_size)
+                    VALUES (?, ?, ?)
+                ''', (sha256, size, os.path.getsize(path)))
+                conn.commit()
+            return False
+
+    def _add_entry(self, marker: str, role: str, name: str, sha256: str,
+                   backup_time: datetime, host: str, remote_path: str) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute('''
+                INSERT INTO backup_entries (marker, role, name, host, remote_path, sha256, backup_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (marker, role, name, host, remote_path, sha256,
+                  self._format_time(backup_time or datetime.now())))
+            conn.commit()
+            return cursor.lastrowid
+
+    def _object_path(self, sha256: str) -> str:
+        # Two-level fan-out keeps directories small with many thousands of blobs
+        return os.path.join(self.objects_dir, sha256[:2], sha256[2:] + '.gz')
+
+    @staticmethod
+    def _format_time(value: datetime) -> str:
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
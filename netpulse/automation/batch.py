@@ -0,0 +1,219 @@
+"""
+NetPulse Batch Automation
+Run one DeviceManager command across many markers and stream the results
+"""
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    from .device_manager import DeviceManager
+    from .inventory_cache import normalize_marker
+except ImportError:
+    from netpulse.automation.device_manager import DeviceManager
+    from netpulse.automation.inventory_cache import normalize_marker
+
+# Commands that can be run per marker, with the keyword arguments they accept
+BATCH_COMMANDS = {
+    "connect_devices": ("method",),
+    "show_pai_version": (),
+    "data": ("new_date",),
+    "mcu": ("action", "config_file"),
+    "change_mcu_value": ("new_mcu_value",),
+    "advanced_mcu_config": ("config_updates", "transactional"),
+    "backup_config": ("config_type", "incremental"),
+}
+
+
+class BatchRunner:
+    """Run a DeviceManager command for many markers with global concurrency limits"""
+
+    def __init__(self, manager: DeviceManager = None, max_markers: int = 16,
+                 max_devices: int = 64):
+        """
+        manager: DeviceManager to use (a new one is created if omitted)
+        max_markers: markers processed at once
+        max_devices: devices worked on at once across every marker
+        """
+        self.manager = manager or DeviceManager()
+        self.max_markers = max(1, int(max_markers))
+        # Shared by this runner's markers only, the manager may be shared with others
+        self._device_slots = threading.BoundedSemaphore(max(1, int(max_devices)))
+        self._write_lock = threading.Lock()
+
+    def resolve_markers(self, markers: List[str] = None, pattern: str = None) -> List[str]:
+        """Resolve every marker's devices in bulk and return the markers to process"""
+        resolved = self.manager.prefetch_devices(markers=markers, pattern=pattern)
+        # Spellings of one marker that differ only in case are the same marker;
+        # the first one given wins, and pattern matches go after the explicit markers
+        seen = {}
+        for marker in markers or []:
+            seen.setdefault(normalize_marker(marker), marker)
+        for marker in sorted(resolved):
+            seen.setdefault(normalize_marker(marker), marker)
+        return list(seen.values())
+
+    def run(self, command: str, markers: List[str] = None, pattern: str = None,
+            output: Optional[str] = None, command_args: Dict = None,
+            callback: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Run command for every marker and stream one JSON line per marker to output.
+
+        command: one of BATCH_COMMANDS
+        markers / pattern: explicit markers and/or a SQL LIKE pattern on PL
+        output: JSON-lines file path, '-' for stdout, None to skip writing
+        command_args: keyword arguments passed to the command
+        callback(record) is called as each marker completes.
+        """
+        if command not in BATCH_COMMANDS:
+            return {"success": False, "error": f"Unknown batch command: {command}"}
+        if not markers and not pattern:
+            return {"success": False, "error": "No markers or pattern given"}
+
+        command_args = command_args or {}
+        unknown = set(command_args) - set(BATCH_COMMANDS[command])
+        if unknown:
+            return {"success": False,
+                    "error": f"Unsupported arguments for {command}: {', '.join(sorted(unknown))}"}
+
+        try:
+            marker_list = self.resolve_markers(markers, pattern)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+        summary = {"success": True, "command": command, "markers": len(marker_list),
+                   "completed": 0, "failed": 0, "output": output}
+        start = time.time()
+
+        stream = None
+        if output == "-":
+            stream = sys.stdout
+        elif output:
+            stream = open(output, "a", encoding="utf-8")
+
+        try:
+            for record in self.iter_results(command, marker_list, command_args):
+                if record["success"]:
+                    summary["completed"] += 1
+                else:
+                    summary["failed"] += 1
+                if stream:
+                    self._write_record(stream, record)
+                if callback:
+                    callback(record)
+        finally:
+            if stream and stream is not sys.stdout:
+                stream.close()
+
+        summary["duration"] = round(time.time() - start, 2)
+        return summary
+
+    def iter_results(self, command: str, markers: List[str],
+                     command_args: Dict) -> Iterator[Dict]:
+        """Yield one result record per marker in completion order"""
+        method = getattr(self.manager, command)
+
+        def run_marker(marker):
+            started = time.time()
+            try:
+                with self.manager.device_limit(self._device_slots):
+                    result = method(marker, **command_args)
+                error = result.get("error") if isinstance(result, dict) else None
+            except Exception as e:
+                result, error = None, str(e)
+            return {
+                "marker": marker,
+                "command": command,
+                "success": error is None,
+                "error": error,
+                "result": result,
+                "duration": round(time.time() - started, 2),
+                "timestamp": datetime.now().isoformat(timespec="seconds")
+            }
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_markers, max(1, len(markers))))
+        try:
+            futures = [executor.submit(run_marker, marker) for marker in markers]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _write_record(self, stream, record: Dict):
+        """Append one record as a JSON line and flush so partial runs are usable"""
+        line = json.dumps(record, default=str, ensure_ascii=False)
+        with self._write_lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+
+def _parse_command_args(pairs: List[str]) -> Dict:
+    """Parse KEY=VALUE pairs; values that are valid JSON are decoded"""
+    args = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected KEY=VALUE, got '{pair}'")
+        try:
+            args[key] = json.loads(value)
+        except ValueError:
+            args[key] = value
+    return args
+
+
+def main():
+    """Headless batch automation entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NetPulse Batch Automation")
+    parser.add_argument("command", choices=sorted(BATCH_COMMANDS), help="Command to run per marker")
+    parser.add_argument("--markers", nargs="+", metavar="PL", help="Markers to process")
+    parser.add_argument("--markers-file", metavar="FILE", help="File with one marker per line")
+    parser.add_argument("--pattern", metavar="LIKE", help="SQL LIKE pattern on PL, e.g. 'PL1%%'")
+    parser.add_argument("--output", "-o", default="-", help="JSON-lines output file ('-' for stdout)")
+    parser.add_argument("--arg", action="append", metavar="KEY=VALUE", help="Command argument")
+    parser.add_argument("--max-markers", type=int, default=16, help="Markers processed at once")
+    parser.add_argument("--max-devices", type=int, default=64, help="Devices worked on at once")
+    parser.add_argument("--refresh-inventory", action="store_true",
+                        help="Reload the cached device inventory before running")
+
+    args = parser.parse_args()
+
+    markers = list(args.markers or [])
+    if args.markers_file:
+        with open(args.markers_file, encoding="utf-8") as f:
+            markers += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    try:
+        command_args = _parse_command_args(args.arg)
+    except ValueError as e:
+        parser.error(str(e))
+
+    runner = BatchRunner(max_markers=args.max_markers, max_devices=args.max_devices)
+    try:
+        if args.refresh_inventory:
+            try:
+                runner.manager.refresh_inventory()
+            except Exception as e:
+                print(f"⚠️  Inventory refresh failed, using cached inventory: {e}", file=sys.stderr)
+        summary = runner.run(args.command, markers=markers or None, pattern=args.pattern,
+                             output=args.output, command_args=command_args)
+    finally:
+        runner.manager.close()
+
+    if not summary["success"]:
+        print(f"✗ Batch failed: {summary['error']}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ {summary['completed']}/{summary['markers']} markers completed, "
+          f"{summary['failed']} failed in {summary['duration']}s", file=sys.stderr)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
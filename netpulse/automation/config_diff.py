@@ -0,0 +1,145 @@
+"""
+NetPulse Config Diff
+Line and key level comparison of key=value device configuration files
+"""
+
+import difflib
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+def parse_config(text: str) -> Dict[str, str]:
+    """
+    Parse key=value lines into a dict.
+    Blank lines, comments (# or ;) and lines without '=' are ignored; a repeated key keeps its last value.
+    """
+    values = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;" or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        values[key.strip()] = value.strip()
+    return values
+
+
+def apply_config_updates(text: str, updates: Dict[str, str]) -> Tuple[str, Dict[str, bool]]:
+    """
+    Set key=value for each update on every line starting with 'key=', keeping
+    all other lines and line endings as they are. Keys are never added.
+    Returns the new text and {key: True if the key was found}.
+    """
+    found = {key: False for key in updates}
+    lines = text.splitlines(keepends=True)
+    for index, line in enumerate(lines):
+        key, sep, _ = line.partition("=")
+        if sep and key in updates:
+            ending = line[len(line.rstrip("\r\n")):]
+            lines[index] = f"{key}={updates[key]}{ending}"
+            found[key] = True
+    return "".join(lines), found
+
+
+def diff_lines(old: str, new: str, old_label: str = "before", new_label: str = "after",
+               context: int = 0) -> str:
+    """Unified line diff between two config texts ('' when identical)"""
+    return "\n".join(difflib.unified_diff(
+        old.splitlines(), new.splitlines(),
+        fromfile=old_label, tofile=new_label, n=context, lineterm=""
+    ))
+
+
+def diff_keys(old: Dict[str, str], new: Dict[str, str]) -> Dict[str, Dict]:
+    """Key level delta: added and removed keys plus changed values as (old, new)"""
+    old_keys, new_keys = old.keys(), new.keys()
+    return {
+        "added": {key: new[key] for key in new_keys - old_keys},
+        "removed": {key: old[key] for key in old_keys - new_keys},
+        "changed": {key: (old[key], new[key]) for key in old_keys & new_keys if old[key] != new[key]}
+    }
+
+
+def diff_configs(old: str, new: str, old_label: str = "before", new_label: str = "after") -> Dict:
+    """Line diff and key delta of two config texts"""
+    keys = diff_keys(parse_config(old), parse_config(new))
+    return {
+        "identical": old == new,
+        "line_diff": diff_lines(old, new, old_label, new_label),
+        "added": keys["added"],
+        "removed": keys["removed"],
+        "changed": keys["changed"]
+    }
+
+
+class ConfigIndex:
+    """
+    Per-key index over many device configs for fleet-wide comparisons.
+
+    Devices are any hashable id (e.g. (marker, role)). For every key the index
+    maps value -> set of devices, so "who differs from this baseline" is a few
+    set differences per key instead of a full comparison per device.
+    """
+
+    def __init__(self):
+        self.configs: Dict[object, Dict[str, str]] = {}
+        self._by_key: Dict[str, Dict[str, Set]] = {}
+
+    def add(self, device, config: Dict[str, str]):
+        """Index one device's parsed config, replacing any earlier one"""
+        if device in self.configs:
+            self.remove(device)
+        self.configs[device] = config
+        for key, value in config.items():
+            self._by_key.setdefault(key, {}).setdefault(value, set()).add(device)
+
+    def remove(self, device):
+        """Drop a device from the index"""
+        config = self.configs.pop(device, None)
+        if not config:
+            return
+        for key, value in config.items():
+            holders = self._by_key[key][value]
+            holders.discard(device)
+            if not holders:
+                del self._by_key[key][value]
+                if not self._by_key[key]:
+                    del self._by_key[key]
+
+    def devices_with(self, key: str, value: str) -> Set:
+        """Devices whose key has exactly this value"""
+        return set(self._by_key.get(key, {}).get(value, ()))
+
+    def value_counts(self, key: str) -> Dict[str, int]:
+        """How many devices use each value of key"""
+        return {value: len(devices) for value, devices in self._by_key.get(key, {}).items()}
+
+    def differing_from(self, baseline: Dict[str, str], keys: Optional[Iterable[str]] = None,
+                       include_extra: bool = False) -> Dict[object, Dict[str, Tuple]]:
+        """
+        Devices that differ from a baseline config, with their differing keys.
+
+        keys: only compare these keys (default: every key in the baseline)
+        include_extra: also report keys a device has that the baseline lacks
+        Returns {device: {key: (baseline_value, device_value)}}; None marks a missing key.
+        """
+        all_devices = set(self.configs)
+        differences: Dict[object, Dict[str, Tuple]] = {}
+
+        for key in (keys if keys is not None else baseline.keys()):
+            expected = baseline.get(key)
+            matching = self.devices_with(key, expected) if expected is not None else \
+                all_devices - self._holders(key)
+            for device in all_devices - matching:
+                differences.setdefault(device, {})[key] = (expected, self.configs[device].get(key))
+
+        if include_extra and keys is None:
+            for key in self._by_key.keys() - baseline.keys():
+                for device in self._holders(key):
+                    differences.setdefault(device, {})[key] = (None, self.configs[device][key])
+
+        return differences
+
+    def _holders(self, key: str) -> Set:
+        holders = set()
+        for devices in self._by_key.get(key, {}).values():
+            holders |= devices
+        return holders
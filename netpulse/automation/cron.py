@@ -0,0 +1,148 @@
+"""
+NetPulse Cron
+Five-field cron expressions and interval strings for scheduled tasks
+"""
+
+import bisect
+import re
+from datetime import datetime, timedelta
+from typing import List
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {name: index for index, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+DAY_NAMES = {name: index for index, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_interval(value) -> float:
+    """
+    Interval in seconds from a number or a string like "90", "30s", "5m", "1h30m" or "1d".
+    Raises ValueError for anything else or a non-positive interval.
+    """
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        text = str(value).strip().lower().replace(" ", "")
+        parts = re.findall(r"(\d+(?:\.\d+)?)([smhdw]?)", text)
+        if not parts or "".join(number + unit for number, unit in parts) != text:
+            raise ValueError(f"Invalid interval: '{value}'")
+        seconds = sum(float(number) * INTERVAL_UNITS[unit] for number, unit in parts)
+    if seconds <= 0:
+        raise ValueError(f"Interval must be positive: '{value}'")
+    return seconds
+
+
+class CronSchedule:
+    """
+    Standard five-field cron expression (minute hour day-of-month month day-of-week)
+    with lists, ranges, steps, month/day names and the @daily style aliases.
+    As in cron, a day matches either day field when both are restricted; a field
+    starting with '*' is unrestricted.
+    Times are naive local datetimes.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+
+        self.minutes = self._parse_field(fields[0], 0, 59)
+        self.hours = self._parse_field(fields[1], 0, 23)
+        self.days = self._parse_field(fields[2], 1, 31)
+        self.months = self._parse_field(fields[3], 1, 12, MONTH_NAMES)
+        # 7 is Sunday too
+        self.weekdays = sorted({day % 7 for day in self._parse_field(fields[4], 0, 7, DAY_NAMES)})
+        # As in Vixie cron, a field starting with '*' (including '*/2') does not restrict the day
+        self._days_restricted = not fields[2].startswith("*")
+        self._weekdays_restricted = not fields[4].startswith("*")
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after the given time"""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Impossible dates such as 30 February are reported instead of searched forever
+        last_year = t.year + 8
+
+        while t.year <= last_year:
+            if t.month not in self.months:
+                t = self._first_of_next_month(t)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+
+            index = bisect.bisect_left(self.hours, t.hour)
+            if index == len(self.hours):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if self.hours[index] != t.hour:
+                t = t.replace(hour=self.hours[index], minute=0)
+
+            index = bisect.bisect_left(self.minutes, t.minute)
+            if index == len(self.minutes):
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            return t.replace(minute=self.minutes[index])
+
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+    def _day_matches(self, t: datetime) -> bool:
+        day_ok = t.day in self.days
+        weekday_ok = t.isoweekday() % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        if self._days_restricted:
+            return day_ok
+        if self._weekdays_restricted:
+            return weekday_ok
+        return True
+
+    @staticmethod
+    def _first_of_next_month(t: datetime) -> datetime:
+        if t.month == 12:
+            return t.replace(year=t.year + 1, month=1, day=1, hour=0, minute=0)
+        return t.replace(month=t.month + 1, day=1, hour=0, minute=0)
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int, names: dict = None) -> List[int]:
+        """Sorted values of one field: '*', 'a', 'a-b', with optional '/step', comma separated"""
+        def value(token):
+            token = token.lower()
+            if names and token in names:
+                return names[token]
+            if not token.isdigit():
+                raise ValueError(f"Invalid cron value '{token}' in '{field}'")
+            number = int(token)
+            if not low <= number <= high:
+                raise ValueError(f"Cron value {number} outside {low}-{high} in '{field}'")
+            return number
+
+        values = set()
+        for part in field.split(","):
+            span, _, step = part.partition("/")
+            step = int(step) if step else 1
+            if step < 1:
+                raise ValueError(f"Invalid cron step in '{field}'")
+            if span == "*":
+                start, end = low, high
+            elif "-" in span:
+                start, end = (value(token) for token in span.split("-", 1))
+            else:
+                start = value(span)
+                # 'a/n' means every n from a on
+                end = high if step > 1 else start
+            if start > end:
+                raise ValueError(f"Invalid cron range in '{field}'")
+            values.update(range(start, end + 1, step))
+        return sorted(values)
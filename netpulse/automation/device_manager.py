@@ -1,12 +1,18 @@
 import os
-import pyodbc
-import requests
+import re
 import paramiko
 import time
 import json
+import uuid
+import shlex
+import shutil
+import tempfile
+from datetime import datetime
 from configparser import ConfigParser
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Import credential manager
 try:
@@ -14,17 +20,64 @@ try:
 except ImportError:
     from netpulse.core.credential_manager import CredentialManager
 
+from .ssh_pool import SSHConnectionPool
+from .inventory_cache import InventoryCache, normalize_marker
+from .odbc_pool import ODBCConnectionPool
+from .file_transfer import FileTransfer
+from .backup_store import BackupStore
+from .http_probe import HTTPProbe
+from .config_diff import ConfigIndex, apply_config_updates, diff_configs, parse_config
+
 class DeviceManager:
     """Enhanced device management with secure credential storage"""
     
-    def __init__(self, db_config_file: str = None):
+    # SQL Server accepts at most 2100 parameters per statement
+    PREFETCH_CHUNK = 500
+    
+    def __init__(self, db_config_file: str = None, inventory_cache: InventoryCache = None,
+                 inventory_ttl: float = 3600, backup_dir: str = None,
+                 backup_store: BackupStore = None):
         self.db_config_file = db_config_file
         self.conn_str = None
+        self.db_pool = None
+        self._db_pool_lock = threading.Lock()
         self.ssh_credentials = None
+        self.ssh_pool = None
+        self.file_transfer = None
         self.credential_manager = CredentialManager()
         
-        # Initialize database connection
+        # Per-device fan-out limits
+        self.max_parallel_devices = 8
+        self.device_timeout = 60
+        self.operation_deadline = 300
+        self._device_slots = threading.BoundedSemaphore(64)
+        self._scoped_slots = threading.local()
+        
+        # Keep-alive HTTP session shared by every reachability probe
+        self.http_probe = HTTPProbe()
+        
+        # Local copy of v_ListaPL / Stazioni so lookups don't hit SQL Server
+        self.inventory = inventory_cache or InventoryCache(ttl=inventory_ttl)
+        self._refresh_lock = threading.Lock()
+        
+        # Local directory device backups are downloaded into, and the
+        # deduplicating store they are kept in (opened on first backup)
+        self.backup_dir = backup_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core', 'data', 'backups'
+        )
+        self.backup_store = backup_store
+        
+        # Per-key indexes over the latest stored snapshot of each device,
+        # updated only for devices whose snapshot hash changed
+        self._config_indexes: Dict[str, tuple] = {}
+        self._parsed_configs: Dict[str, Dict[str, str]] = {}
+        # Reentrant: config_drift holds it across the index update and the comparison
+        self._config_index_lock = threading.RLock()
+        
+        # Initialize database connection; the pool starts logging in right away
         self._init_database_connection()
+        if self.conn_str:
+            self._get_db_pool()
         
         # Load SSH credentials
         self._load_ssh_credentials()
@@ -84,6 +137,8 @@ class DeviceManager:
         try:
             self.ssh_credentials = self.credential_manager.get_ssh_credentials()
             if self.ssh_credentials:
+                self.ssh_pool = SSHConnectionPool(self.ssh_credentials)
+                self.file_transfer = FileTransfer(self.ssh_pool)
                 print("✓ SSH credentials loaded from keyring")
             else:
                 print("⚠️  No SSH credentials found")
@@ -92,75 +147,160 @@ class DeviceManager:
             print(f"✗ SSH credential loading failed: {e}")
             self.ssh_credentials = None
     
-    def _get_devices(self, marker: str) -> List[Dict]:
-        """Get devices from database for a given marker"""
+    def _get_devices(self, marker: str, refresh: bool = False) -> List[Dict]:
+        """
+        Get devices for a given marker from the inventory cache, prefetching the
+        whole inventory on a miss. refresh=True bypasses the cache.
+        Falls back to stale cached devices when the database is unreachable.
+        A marker missing from a fresh full inventory is looked up once on its own,
+        in case it was added since; the result is cached like any other.
+        """
+        if not refresh:
+            devs = self.inventory.get_devices(marker)
+            if devs or (devs is not None and self.inventory.has_entry(marker)):
+                return devs
+            if devs is not None:
+                try:
+                    return self.prefetch_devices(markers=[marker])[marker]
+                except Exception as e:
+                    print(f"⚠️  Could not look up {marker}: {e}")
+                    return devs
+        
+        try:
+            self.refresh_inventory(force=refresh)
+        except Exception as e:
+            devs = self.inventory.get_devices(marker, allow_stale=True)
+            if devs is not None:
+                print(f"⚠️  Using cached inventory for {marker}: {e}")
+                return devs
+            raise
+        
+        return self.inventory.get_devices(marker, allow_stale=True) or []
+    
+    def refresh_inventory(self, force: bool = True) -> Dict:
+        """
+        Bulk-load v_ListaPL and Stazioni into the inventory cache over one connection.
+        Without force, a refresh is skipped while the cached inventory is fresh.
+        """
         if not self.conn_str:
             raise Exception("Database connection not configured. Run credential setup.")
         
-        try:
-            con = pyodbc.connect(self.conn_str)
-            cur = con.cursor()
-            cur.execute(
-                """
-                SELECT *
-                FROM dbo.v_ListaPL
-                WHERE PL = ?
-                """,
-                marker
-            )
-            row = cur.fetchone()
-            con.close()
-            
-            if not row:
-                return []
-
-            cols = [col[0] for col in cur.description]
-            devs = []
-            for idx, col in enumerate(cols):
-                if col.upper().startswith("IP_"):
-                    ip = row[idx]
-                    if ip and str(ip).strip():
-                        role = col[3:].replace("_", " ").title()
-                        devs.append({"role": role, "host": str(ip).strip()})
-            return devs
+        # Concurrent misses wait for one prefetch instead of each running their own
+        with self._refresh_lock:
+            if not force and self.inventory.is_complete():
+                return {"success": True, "skipped": True, **self.inventory.stats()}
             
+            def load(con):
+                cur = con.cursor()
+                cur.execute("SELECT * FROM dbo.v_ListaPL")
+                devices = self._rows_to_inventory(cur)
+                
+                cur.execute(
+                    """
+                    SELECT Codice_Stazione, Km_Inizio, Km_Fine, Descrizione
+                    FROM Stazioni
+                    """
+                )
+                stations = [self._station_info(row) for row in cur.fetchall()]
+                cur.close()
+                return devices, stations
+            
+            try:
+                devices, stations = self._get_db_pool().run(load)
+            except Exception as e:
+                raise Exception(f"Database query failed: {e}")
+            
+            self.inventory.replace(devices, stations)
+            return {"success": True, "markers": len(devices), "stations": len(stations)}
+    
+    def _rows_to_inventory(self, cur) -> Dict[str, List[Dict]]:
+        """Map every fetched v_ListaPL row to {marker: devices}"""
+        cols = [col[0] for col in cur.description]
+        pl_index = next(i for i, col in enumerate(cols) if col.upper() == "PL")
+        return {str(row[pl_index]).strip(): self._row_to_devices(cols, row)
+                for row in cur.fetchall()}
+    
+    def _row_to_devices(self, cols: List[str], row) -> List[Dict]:
+        """Turn the IP_* columns of a v_ListaPL row into device dicts"""
+        devs = []
+        for idx, col in enumerate(cols):
+            if col.upper().startswith("IP_"):
+                ip = row[idx]
+                if ip and str(ip).strip():
+                    role = col[3:].replace("_", " ").title()
+                    devs.append({"role": role, "host": str(ip).strip()})
+        return devs
+    
+    def prefetch_devices(self, markers: List[str] = None, pattern: str = None) -> Dict[str, List[Dict]]:
+        """
+        Resolve the devices of many markers in bulk into the inventory cache.
+        
+        markers: explicit marker list, queried in chunks of IN (...) parameters
+        pattern: SQL LIKE pattern on PL (e.g. 'PL1%'), queried in one statement
+        Returns {marker: [devices]}; markers missing from the database map to [].
+        Explicit markers keep the caller's spelling, pattern matches the database's.
+        """
+        if not self.conn_str:
+            raise Exception("Database connection not configured. Run credential setup.")
+        
+        queries = []
+        if pattern:
+            queries.append(("SELECT * FROM dbo.v_ListaPL WHERE PL LIKE ?", [pattern]))
+        if markers:
+            unique = list(dict.fromkeys(markers))
+            for i in range(0, len(unique), self.PREFETCH_CHUNK):
+                chunk = unique[i:i + self.PREFETCH_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                queries.append((f"SELECT * FROM dbo.v_ListaPL WHERE PL IN ({placeholders})", chunk))
+        
+        def load(con):
+            found = {}
+            cur = con.cursor()
+            for sql, params in queries:
+                cur.execute(sql, *params)
+                found.update(self._rows_to_inventory(cur))
+            cur.close()
+            return found
+        
+        try:
+            found = self._get_db_pool().run(load)
         except Exception as e:
             raise Exception(f"Database query failed: {e}")
+        
+        # PL compares case-insensitively in SQL Server, so match the rows back the same way
+        found_by_key = {normalize_marker(marker): devs for marker, devs in found.items()}
+        explicit = {}
+        for marker in markers or []:
+            explicit.setdefault(normalize_marker(marker), marker)
+        
+        missing = {marker: [] for key, marker in explicit.items() if key not in found_by_key}
+        self.inventory.store_devices({**found, **missing})
+        
+        resolved = {marker: devs for marker, devs in found.items()
+                    if normalize_marker(marker) not in explicit}
+        for key, marker in explicit.items():
+            resolved[marker] = found_by_key.get(key, [])
+        return resolved
+    
+    def _get_db_pool(self) -> ODBCConnectionPool:
+        """Shared SQL Server connection pool, rebuilt if the connection string changed"""
+        if not self.conn_str:
+            raise Exception("Database connection not configured. Run credential setup.")
+        
+        with self._db_pool_lock:
+            if self.db_pool is None or self.db_pool.closed or self.db_pool.conn_str != self.conn_str:
+                if self.db_pool:
+                    self.db_pool.close_all()
+                self.db_pool = ODBCConnectionPool(self.conn_str)
+            return self.db_pool
     
     def _ssh_command(self, host: str, command: str, timeout: int = 10) -> str:
-        """Execute SSH command on remote host with stored credentials (faster timeout)"""
-        if not self.ssh_credentials:
+        """Execute SSH command on remote host over a pooled, already-authenticated connection"""
+        if not self.ssh_credentials or not self.ssh_pool:
             return "SSH Error: No SSH credentials configured"
         
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Use stored credentials with faster connection timeout
-            if self.ssh_credentials.get('key_file'):
-                # Use key file authentication
-                ssh.connect(
-                    host, 
-                    username=self.ssh_credentials['username'],
-                    key_filename=self.ssh_credentials['key_file'],
-                    timeout=timeout
-                )
-            else:
-                # Use password authentication with faster timeout
-                ssh.connect(
-                    host,
-                    username=self.ssh_credentials['username'], 
-                    password=self.ssh_credentials['password'],
-                    timeout=5,  # Faster connection timeout
-                    banner_timeout=5,  # Faster banner timeout
-                    auth_timeout=5  # Faster auth timeout
-                )
-            
-            stdin, stdout, stderr = ssh.exec_command(command, timeout=timeout)
-            output = stdout.read().decode().strip()
-            error = stderr.read().decode().strip()
-            
-            ssh.close()
+            output, error = self.ssh_pool.exec_command(host, command, timeout=timeout)
             
             if error:
                 return f"Command output: {output}\nError: {error}"
@@ -168,23 +308,188 @@ class DeviceManager:
             
         except Exception as e:
             return f"SSH Error: {str(e)}"
+    
+    def _ssh_batch(self, host: str, commands: Dict[str, str], timeout: int = 30) -> Dict[str, str]:
+        """
+        Run several named commands over one SSH channel and return {name: result}.
+        
+        Each command runs in its own subshell in order, so a 'cd' in one doesn't
+        affect the next. A random marker line is written to stdout and stderr
+        before each command and both streams are split on it afterwards. Each
+        result is formatted exactly like _ssh_command() output.
+        """
+        if not commands:
+            return {}
+        if not self.ssh_credentials or not self.ssh_pool:
+            return {name: "SSH Error: No SSH credentials configured" for name in commands}
+        
+        token = uuid.uuid4().hex
+        markers = [f"__NETPULSE_{token}_{index}__" for index in range(len(commands))]
+        
+        script = []
+        for marker, command in zip(markers, commands.values()):
+            # Leading newline so a command without a trailing one can't hide the marker
+            script.append(f"printf '\\n%s\\n' {marker}; printf '\\n%s\\n' {marker} >&2")
+            script.append(f"( {command}\n) </dev/null")
+        
+        try:
+            output, error = self.ssh_pool.exec_command(host, "\n".join(script), timeout=timeout)
+        except Exception as e:
+            return {name: f"SSH Error: {str(e)}" for name in commands}
+        
+        outputs = self._split_batch_output(output, markers)
+        errors = self._split_batch_output(error, markers)
+        
+        results = {}
+        for index, name in enumerate(commands):
+            if errors[index]:
+                results[name] = f"Command output: {outputs[index]}\nError: {errors[index]}"
+            else:
+                results[name] = outputs[index]
+        return results
+    
+    def _split_batch_output(self, text: str, markers: List[str]) -> List[str]:
+        """Split a framed batch stream into the stripped section of each marker"""
+        sections = [[] for _ in markers]
+        index_of = {marker: index for index, marker in enumerate(markers)}
+        current = None
+        for line in text.split("\n"):
+            if line in index_of:
+                current = index_of[line]
+            elif current is not None:
+                sections[current].append(line)
+        return ["\n".join(lines).strip() for lines in sections]
+    
+    def _is_command_error(self, result: str) -> bool:
+        """True when an _ssh_command()/_ssh_batch() result reports a failure"""
+        return result.startswith("SSH Error:") or (result.startswith("Command output:") and "\nError: " in result)
+    
+    def _get_backup_store(self) -> BackupStore:
+        """Content-addressed store for downloaded backups"""
+        if self.backup_store is None:
+            self.backup_store = BackupStore(root=self.backup_dir)
+        return self.backup_store
+    
+    def set_global_device_limit(self, limit: int):
+        """Cap the number of devices worked on at once across all concurrent operations"""
+        self._device_slots = threading.BoundedSemaphore(max(1, int(limit)))
+    
+    @contextmanager
+    def device_limit(self, slots: threading.Semaphore):
+        """
+        Use slots instead of the global device limit for operations started
+        by the calling thread, so one caller's limit doesn't leak to others
+        sharing this manager
+        """
+        previous = getattr(self._scoped_slots, "slots", None)
+        self._scoped_slots.slots = slots
+        try:
+            yield
+        finally:
+            self._scoped_slots.slots = previous
+    
+    def close(self):
+        """Close pooled SSH, database and HTTP connections"""
+        if self.ssh_pool:
+            self.ssh_pool.close_all()
+        with self._db_pool_lock:
+            db_pool, self.db_pool = self.db_pool, None
+        if db_pool:
+            db_pool.close_all()
+        self.http_probe.close()
 
-    def connect_devices(self, marker: str) -> Dict:
-        """HTTP GET on each device IP to check connectivity"""
+    def _fan_out(self, devices: List[Dict], work: Callable[[Dict], Any],
+                 on_error: Callable[[Exception], Any],
+                 max_workers: int = None, device_timeout: float = None,
+                 deadline: float = None) -> Dict[str, Any]:
+        """
+        Run work(device) for every device concurrently and collect results by role.
+        
+        max_workers: maximum devices worked on at once (default self.max_parallel_devices)
+        device_timeout: seconds each device may take once started (default self.device_timeout)
+        deadline: seconds the whole operation may take (default self.operation_deadline)
+        on_error(exception) builds the result for a device that failed or timed out.
+        Results keep the order of the devices list.
+        """
+        if not devices:
+            return {}
+        
+        max_workers = max_workers or self.max_parallel_devices
+        device_timeout = device_timeout if device_timeout is not None else self.device_timeout
+        deadline = deadline if deadline is not None else self.operation_deadline
+        
+        started = {}
+        slots = getattr(self._scoped_slots, "slots", None) or self._device_slots
+        
+        def run(index, device):
+            # Time spent waiting for a global slot doesn't count against the device
+            with slots:
+                started[index] = time.monotonic()
+                return work(device)
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(devices)))
+        futures = {executor.submit(run, index, device): index for index, device in enumerate(devices)}
+        outcomes = {}
+        give_up_at = time.monotonic() + deadline
+        
+        try:
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures[future]
+                    try:
+                        outcomes[index] = future.result()
+                    except Exception as e:
+                        outcomes[index] = on_error(e)
+                
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if now >= give_up_at:
+                        error = TimeoutError(f"Operation deadline of {deadline}s exceeded")
+                    elif index in started and now - started[index] >= device_timeout:
+                        error = TimeoutError(f"Device did not respond within {device_timeout}s")
+                    else:
+                        continue
+                    # The worker thread can't be killed; it finishes in the background
+                    future.cancel()
+                    pending.discard(future)
+                    outcomes[index] = on_error(error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return {devices[index]["role"]: outcomes[index] for index in range(len(devices))}
+
+    def connect_devices(self, marker: str, method: str = None) -> Dict:
+        """
+        HTTP probe on each device IP to check connectivity
+        method: GET or HEAD (default: the probe's configured method)
+        All devices are probed at once, so a marker takes as long as its slowest device.
+        """
         try:
             devs = self._get_devices(marker)
         except Exception as e:
             return {"error": str(e)}
 
-        results = {}
-        for dev in devs:
-            url = f"http://{dev['host']}"
-            try:
-                r = requests.get(url, timeout=5)
-                results[dev["role"]] = f"UP ({r.status_code})"
-            except Exception as e:
-                results[dev["role"]] = f"DOWN ({type(e).__name__})"
-        return {"connect devices": results}
+        probe = self.http_probe
+        results = self._fan_out(
+            devs, lambda dev: probe.probe(dev["host"], method=method),
+            lambda e: {"up": False, "status": None, "latency_ms": None, "error": type(e).__name__},
+            max_workers=probe.max_concurrency,
+            device_timeout=probe.connect_timeout + probe.read_timeout + 5
+        )
+        
+        status = {}
+        for role, result in results.items():
+            if result["up"]:
+                status[role] = f"UP ({result['status']}, {result['latency_ms']} ms)"
+            else:
+                status[role] = f"DOWN ({result['error']})"
+        return {
+            "connect devices": status,
+            "latency_ms": {role: result["latency_ms"] for role, result in results.items()}
+        }
 
     def show_pai_version(self, marker: str) -> Dict:
         """SSH to each device to get PAI-PL version"""
@@ -193,15 +498,11 @@ class DeviceManager:
         except Exception as e:
             return {"error": str(e)}
 
-        results = {}
-        for dev in devs:
-            ip = dev["host"]
-            role = dev["role"]
-            try:
-                output = self._ssh_command(ip, "./PAI-PL_USR v")
-                results[role] = output or "<no output>"
-            except Exception as e:
-                results[role] = f"SSH Error: {e}"
+        def version(dev):
+            output = self._ssh_command(dev["host"], "./PAI-PL_USR v")
+            return output or "<no output>"
+
+        results = self._fan_out(devs, version, lambda e: f"SSH Error: {e}")
         return {"pai-pl version": results}
 
     def data(self, marker: str, new_date: str = None) -> Dict:
@@ -219,13 +520,13 @@ class DeviceManager:
         if not cpu:
             return {"error": f"No CPU B for PL {marker}"}
 
-        results = {}
-        for d in cpu:
+        def manage_date(d):
             h = d["host"]
             
-            # Execute commands
-            nav = self._ssh_command(h, "cd .. && ls")
-            cur = self._ssh_command(h, "date")
+            commands = {
+                "navigation": "cd .. && ls",
+                "current_date": "date"
+            }
             seto = ""
             
             if new_date:
@@ -233,18 +534,22 @@ class DeviceManager:
                 try:
                     # Basic date validation - you can enhance this
                     if len(new_date.split()) >= 2:  # Basic check for date format
-                        seto = self._ssh_command(h, f'date -s "{new_date}"')
+                        commands["set_date"] = f'date -s "{new_date}"'
                     else:
                         seto = "Error: Invalid date format. Use format like 'YYYY-MM-DD HH:MM:SS'"
                 except:
                     seto = "Error: Failed to parse date format"
             
-            results[d["role"]] = {
-                "navigation": nav,
-                "current_date": cur,
-                "set_date": seto
-            }
+            # Execute commands in one round trip
+            output = self._ssh_batch(h, commands)
             
+            return {
+                "navigation": output["navigation"],
+                "current_date": output["current_date"],
+                "set_date": output.get("set_date", seto)
+            }
+
+        results = self._fan_out(cpu, manage_date, lambda e: {"error": str(e)})
         return {"data_pai_pl": results}
 
     def mcu(self, marker: str, action: str = "status", config_file: str = "CONFIGURAZIONE") -> Dict:
@@ -264,89 +569,51 @@ class DeviceManager:
         if not mcu_devices:
             return {"error": f"No MCU/Controller devices found for PL {marker}"}
 
+        if action.lower() == "change_mcu_value":
+            # This will be handled by change_mcu_value method
+            return {"error": "Use change_mcu_value method to change MCU values"}
+
         results = {"marker": marker, "devices": {}}
         
-        for device in mcu_devices:
-            host = device["host"]
-            role = device["role"]
-            
-            try:
-                if action.lower() == "status":
-                    # Get full CONFIGURAZIONE content
-                    config_content = self._ssh_command(host, f"cat {config_file}")
-                    
-                    # Extract MCU-related settings
-                    mcu_status = self._ssh_command(host, f"grep -i 'mcu=' {config_file}")
-                    
-                    # Get system status
-                    system_info = self._ssh_command(host, "ps aux | grep -i mcu | head -5")
-                    uptime = self._ssh_command(host, "uptime")
-                    
-                    # Get kilometric parameter from database
-                    kilometric_info = self._get_kilometric_info(marker)
-                    
-                    results["devices"][role] = {
-                        "action": "status",
-                        "host": host,
-                        "configurazione_content": config_content,
-                        "mcu_parameter": mcu_status,
-                        "system_processes": system_info,
-                        "uptime": uptime,
-                        "kilometric_info": kilometric_info,
-                        "timestamp": self._ssh_command(host, "date")
-                    }
-                
-                elif action.lower() == "change_mcu_value":
-                    # This will be handled by change_mcu_value method
-                    return {"error": "Use change_mcu_value method to change MCU values"}
-                
-                else:
-                    results["devices"][role] = {
-                        "action": action,
-                        "error": f"Action '{action}' not supported. Use 'status' or 'change_mcu_value'"
-                    }
-                
-            except Exception as e:
-                results["devices"][role] = {
+        if action.lower() != "status":
+            for device in mcu_devices:
+                results["devices"][device["role"]] = {
                     "action": action,
-                    "error": str(e)
+                    "error": f"Action '{action}' not supported. Use 'status' or 'change_mcu_value'"
                 }
+            return results
+        
+        # Get kilometric parameter from database (same for every device of the marker)
+        kilometric_info = self._get_kilometric_info(marker)
+        
+        def status(device):
+            host = device["host"]
+            
+            output = self._ssh_batch(host, {
+                # Full CONFIGURAZIONE content and its MCU-related settings
+                "configurazione_content": f"cat {config_file}",
+                "mcu_parameter": f"grep -i 'mcu=' {config_file}",
+                # System status
+                "system_processes": "ps aux | grep -i mcu | head -5",
+                "uptime": "uptime",
+                "timestamp": "date"
+            })
+            
+            return {
+                "action": "status",
+                "host": host,
+                "configurazione_content": output["configurazione_content"],
+                "mcu_parameter": output["mcu_parameter"],
+                "system_processes": output["system_processes"],
+                "uptime": output["uptime"],
+                "kilometric_info": kilometric_info,
+                "timestamp": output["timestamp"]
+            }
         
+        results["devices"] = self._fan_out(mcu_devices, status,
+                                           lambda e: {"action": action, "error": str(e)})
         return results
     
-    def _get_kilometric_info(self, marker: str) -> dict:
-        """Get kilometric information from database"""
-        try:
-            query = """
-            SELECT TOP 1 
-                Codice_Stazione,
-                Km_Inizio,
-                Km_Fine,
-                Descrizione
-            FROM Stazioni 
-            WHERE Codice_Stazione LIKE ?
-            """
-            
-            if self.conn_str:
-                with pyodbc.connect(self.conn_str) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(query, (f"%{marker}%",))
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        return {
-                            "code": row[0],
-                            "km_start": row[1],
-                            "km_end": row[2],
-                            "description": row[3],
-                            "kilometric_parameter": f"{row[1]}+{row[2]}" if row[1] and row[2] else "Unknown"
-                        }
-            
-            return {"error": "No kilometric information found"}
-            
-        except Exception as e:
-            return {"error": f"Database query failed: {str(e)}"}
-
     def change_mcu_value(self, marker: str, new_mcu_value: str) -> dict:
         """Change the mcu= value in CONFIGURAZIONE file"""
         try:
@@ -363,76 +630,65 @@ class DeviceManager:
 
         results = {"marker": marker, "new_value": new_mcu_value, "devices": {}}
         
-        for device in mcu_devices:
+        def change(device):
             host = device["host"]
-            role = device["role"]
             
-            try:
+            output = self._ssh_batch(host, {
                 # Create backup first
-                backup_cmd = f"cp CONFIGURAZIONE CONFIGURAZIONE.backup.$(date +%Y%m%d_%H%M%S)"
-                backup_result = self._ssh_command(host, backup_cmd)
-                
+                "backup_result": "cp CONFIGURAZIONE CONFIGURAZIONE.backup.$(date +%Y%m%d_%H%M%S)",
                 # Change mcu= value
-                change_cmd = f"sed -i 's/mcu=.*$/mcu={new_mcu_value}/g' CONFIGURAZIONE"
-                change_result = self._ssh_command(host, change_cmd)
-                
+                "change_result": f"sed -i 's/mcu=.*$/mcu={new_mcu_value}/g' CONFIGURAZIONE",
                 # Verify change
-                verify_cmd = "grep 'mcu=' CONFIGURAZIONE"
-                verify_result = self._ssh_command(host, verify_cmd)
-                
-                results["devices"][role] = {
-                    "action": "change_mcu_value",
-                    "host": host,
-                    "backup_result": backup_result,
-                    "change_result": change_result,
-                    "verification": verify_result,
-                    "timestamp": self._ssh_command(host, "date")
-                }
-                
-            except Exception as e:
-                results["devices"][role] = {
-                    "action": "change_mcu_value",
-                    "error": str(e)
-                }
+                "verification": "grep 'mcu=' CONFIGURAZIONE",
+                "timestamp": "date"
+            })
+            
+            return {
+                "action": "change_mcu_value",
+                "host": host,
+                **output
+            }
         
+        results["devices"] = self._fan_out(mcu_devices, change,
+                                           lambda e: {"action": "change_mcu_value", "error": str(e)})
         return results
+    
     def _get_kilometric_info(self, marker: str) -> dict:
-        """Get kilometric information from database"""
-        try:
-            query = """
-            SELECT TOP 1 
-                Codice_Stazione,
-                Km_Inizio,
-                Km_Fine,
-                Descrizione
-            FROM Stazioni 
-            WHERE Codice_Stazione LIKE ?
-            """
-            
-            if self.conn_str:
-                with pyodbc.connect(self.conn_str) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(query, (f"%{marker}%",))
-                    row = cursor.fetchone()
-                    
-                    if row:
-                        return {
-                            "code": row[0],
-                            "km_start": row[1],
-                            "km_end": row[2],
-                            "description": row[3],
-                            "kilometric_parameter": f"{row[1]}+{row[2]}" if row[1] and row[2] else "Unknown"
-                        }
-            
-            return {"error": "No kilometric information found"}
-            
-        except Exception as e:
-            return {"error": f"Database query failed: {str(e)}"}
+        """Get kilometric information for a marker from the cached Stazioni table"""
+        stations = self.inventory.get_stations()
+        if stations is None:
+            try:
+                self.refresh_inventory(force=False)
+            except Exception as e:
+                if self.inventory.get_stations(allow_stale=True) is None:
+                    return {"error": f"Database query failed: {str(e)}"}
+            stations = self.inventory.get_stations(allow_stale=True) or []
+        
+        # Same match as the original "Codice_Stazione LIKE %marker%" query
+        needle = marker.lower()
+        for station in stations:
+            if needle in str(station["code"] or "").lower():
+                return station
+        
+        return {"error": "No kilometric information found"}
+    
+    def _station_info(self, row) -> dict:
+        """Kilometric info dict for a Stazioni row"""
+        return {
+            "code": row[0],
+            "km_start": row[1],
+            "km_end": row[2],
+            "description": row[3],
+            "kilometric_parameter": f"{row[1]}+{row[2]}" if row[1] and row[2] else "Unknown"
+        }
 
-    def advanced_mcu_config(self, marker: str, config_updates: dict = None) -> dict:
+    def advanced_mcu_config(self, marker: str, config_updates: dict = None,
+                            transactional: bool = True) -> dict:
         """
         Advanced MCU configuration management
         config_updates: dict of configuration key-value pairs to update
+        transactional: fetch CONFIGURATION once, apply every update locally and swap
+        the new file in atomically; False runs one sed/grep per key on the device
         """
         try:
             devs = self._get_devices(marker)
@@ -445,170 +701,399 @@ class DeviceManager:
         if not mcu_devices:
             return {"error": f"No MCU/Controller devices found for PL {marker}"}
 
-        results = {}
-        
-        for device in mcu_devices:
+        def configure(device):
             host = device["host"]
-            role = device["role"]
+            if transactional and config_updates and self.file_transfer:
+                return self._apply_config_transaction(host, config_updates)
             
-            try:
+            commands = {
                 # Create timestamped backup
-                backup_cmd = f"cp CONFIGURATION CONFIGURATION.backup.$(date +%Y%m%d_%H%M%S)"
-                backup_result = self._ssh_command(host, backup_cmd)
-                
+                "backup_result": "cp CONFIGURATION CONFIGURATION.backup.$(date +%Y%m%d_%H%M%S)",
                 # Read current configuration
-                current_config = self._ssh_command(host, "cat CONFIGURATION")
-                
-                updates_applied = []
-                
-                if config_updates:
-                    for key, value in config_updates.items():
-                        # Update configuration
-                        update_cmd = f"sed -i 's/^{key}=.*$/{key}={value}/g' CONFIGURATION"
-                        update_result = self._ssh_command(host, update_cmd)
-                        
-                        # Verify update
-                        verify_cmd = f"grep '^{key}=' CONFIGURATION"
-                        verify_result = self._ssh_command(host, verify_cmd)
-                        
-                        updates_applied.append({
-                            "key": key,
-                            "value": value,
-                            "update_result": update_result,
-                            "verification": verify_result
-                        })
-                
-                # Get updated configuration
-                updated_config = self._ssh_command(host, "cat CONFIGURATION")
-                
-                # Get configuration diff
-                diff_cmd = "diff CONFIGURATION.backup.$(ls -t CONFIGURATION.backup.* | head -1 | cut -d'.' -f3-) CONFIGURATION"
-                diff_result = self._ssh_command(host, diff_cmd)
-                
-                results[role] = {
-                    "backup_result": backup_result,
-                    "current_config": current_config,
-                    "updates_applied": updates_applied,
-                    "updated_config": updated_config,
-                    "configuration_diff": diff_result,
-                    "timestamp": self._ssh_command(host, "date")
-                }
-                
-            except Exception as e:
-                results[role] = {
-                    "error": f"Advanced MCU config failed: {str(e)}"
+                "current_config": "cat CONFIGURATION"
+            }
+            
+            updates = list((config_updates or {}).items())
+            for index, (key, value) in enumerate(updates):
+                # Update configuration, then verify the update
+                commands[f"update_{index}"] = f"sed -i 's/^{key}=.*$/{key}={value}/g' CONFIGURATION"
+                commands[f"verify_{index}"] = f"grep '^{key}=' CONFIGURATION"
+            
+            # Get updated configuration; it is diffed locally against current_config
+            commands["updated_config"] = "cat CONFIGURATION"
+            commands["timestamp"] = "date"
+            
+            output = self._ssh_batch(host, commands)
+            
+            updates_applied = [
+                {
+                    "key": key,
+                    "value": value,
+                    "update_result": output[f"update_{index}"],
+                    "verification": output[f"verify_{index}"]
                 }
+                for index, (key, value) in enumerate(updates)
+            ]
+            
+            current, updated = output["current_config"], output["updated_config"]
+            if self._is_command_error(current) or self._is_command_error(updated):
+                configuration_diff, key_changes = "Diff unavailable: configuration could not be read", None
+            else:
+                diff = diff_configs(current, updated, "CONFIGURATION.backup", "CONFIGURATION")
+                configuration_diff = diff["line_diff"]
+                key_changes = {k: diff[k] for k in ("added", "removed", "changed")}
+            
+            return {
+                "backup_result": output["backup_result"],
+                "current_config": current,
+                "updates_applied": updates_applied,
+                "updated_config": updated,
+                "configuration_diff": configuration_diff,
+                "key_changes": key_changes,
+                "timestamp": output["timestamp"]
+            }
+        
+        results = self._fan_out(mcu_devices, configure,
+                                lambda e: {"error": f"Advanced MCU config failed: {str(e)}"})
         
         return {"advanced_mcu_config": results}
 
-    def backup_config(self, marker: str, config_type: str = "running") -> dict:
+    def _apply_config_transaction(self, host: str, config_updates: dict) -> dict:
+        """
+        Update CONFIGURATION on host in one transaction: read it over SFTP, apply all
+        updates locally, upload the result next to it and swap it in with mv, which
+        is atomic. The swap is refused if the file changed since it was read, and
+        the outcome is verified with a single checksum.
+        """
+        fetched = self.file_transfer.read_bytes(host, "CONFIGURATION")
+        if not fetched["success"]:
+            return {"error": f"Could not read CONFIGURATION: {fetched['error']}"}
+        
+        current = fetched["data"].decode("utf-8", errors="surrogateescape")
+        updated, found = apply_config_updates(current, config_updates)
+        new_data = updated.encode("utf-8", errors="surrogateescape")
+        
+        staged = f"CONFIGURATION.netpulse-{uuid.uuid4().hex}"
+        uploaded = self.file_transfer.upload_bytes(host, new_data, staged, mode=fetched["mode"])
+        if not uploaded["success"]:
+            return {"error": f"Could not upload new CONFIGURATION: {uploaded['error']}"}
+        
+        swap = (
+            f"[ \"$(sha256sum CONFIGURATION | cut -d' ' -f1)\" = {fetched['sha256']} ] || "
+            f"{{ rm -f {staged}; echo 'CONFIGURATION changed on the device while updating, aborted' >&2; exit 1; }}\n"
+            f"cp -p CONFIGURATION CONFIGURATION.backup.$(date +%Y%m%d_%H%M%S) && mv -f {staged} CONFIGURATION "
+            f"|| {{ rm -f {staged}; exit 1; }}"
+        )
+        output = self._ssh_batch(host, {
+            "backup_result": swap,
+            "checksum": "sha256sum CONFIGURATION | cut -d' ' -f1",
+            "timestamp": "date"
+        })
+        
+        checksum = {
+            "expected": uploaded["sha256"],
+            "actual": output["checksum"],
+            "verified": output["checksum"] == uploaded["sha256"]
+        }
+        if not checksum["verified"]:
+            return {"error": f"Configuration update failed: {output['backup_result'] or 'checksum mismatch'}",
+                    "checksum": checksum}
+        
+        updated_lines = updated.splitlines()
+        updates_applied = [
+            {
+                "key": key,
+                "value": value,
+                "update_result": "" if found[key] else "Key not found in CONFIGURATION",
+                "verification": "\n".join(line for line in updated_lines if line.startswith(f"{key}="))
+            }
+            for key, value in config_updates.items()
+        ]
+        
+        diff = diff_configs(current, updated, "CONFIGURATION.backup", "CONFIGURATION")
+        return {
+            "mode": "transactional",
+            "backup_result": output["backup_result"],
+            "current_config": current.strip(),
+            "updates_applied": updates_applied,
+            "updated_config": updated.strip(),
+            "configuration_diff": diff["line_diff"],
+            "key_changes": {k: diff[k] for k in ("added", "removed", "changed")},
+            "checksum": checksum,
+            "timestamp": output["timestamp"]
+        }
+
+    def backup_config(self, marker: str, config_type: str = "running", incremental: bool = False) -> dict:
         """
         Enhanced configuration backup with multiple options
         config_type: running, startup, full, mcu
+        incremental: hash the files on the device and only transfer the ones whose
+        hash differs from the last stored backup (no tar archive is made)
+        Backup files are saved on the device, downloaded over SFTP and kept
+        in the deduplicating backup store; the tar archive goes to
+        backup_dir/archives/<marker>/<role>/.
         """
         try:
             devs = self._get_devices(marker)
         except Exception as e:
             return {"error": str(e)}
 
-        results = {}
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        backup_time = datetime.now()
+        timestamp = backup_time.strftime("%Y%m%d_%H%M%S")
+        try:
+            store = self._get_backup_store()
+        except Exception as e:
+            return {"error": f"Backup store unavailable: {str(e)}"}
         
-        for device in devs:
+        def backup(device):
             host = device["host"]
             role = device["role"]
             
+            backup_results = {}
+            
+            # The device writes every backup file itself - no content goes through Python
+            saves = {}
+            
+            if config_type == "running" or config_type == "full":
+                # Backup running configuration
+                saves["running_config"] = ("show running-config > {}", f"/tmp/running-config-{timestamp}.txt")
+            
+            if config_type == "startup" or config_type == "full":
+                # Backup startup configuration
+                saves["startup_config"] = ("show startup-config > {}", f"/tmp/startup-config-{timestamp}.txt")
+            
+            if config_type == "mcu" or config_type == "full":
+                # Backup MCU configuration
+                saves["mcu_config"] = ("cp CONFIGURATION {}", f"/tmp/CONFIGURATION-{timestamp}.backup")
+            
+            # Additional system files
+            system_files = []
+            if config_type == "full":
+                system_files = [
+                    "/etc/network/interfaces",
+                    "/etc/hosts",
+                    "/etc/resolv.conf",
+                    "/proc/version",
+                    "/proc/meminfo"
+                ]
+                for file_path in system_files:
+                    backup_file = f"/tmp/{file_path.replace('/', '_')}-{timestamp}.backup"
+                    saves[file_path] = (f"cp {file_path} {{}}", backup_file)
+            
+            commands = {name: command.format(target) for name, (command, target) in saves.items()}
+            
+            if incremental:
+                # Hash each saved file in the same round trip as the saves
+                archive_file = None
+                for name, (_, target) in saves.items():
+                    commands[f"{name}:sha256"] = f"sha256sum {target} | cut -d' ' -f1"
+            else:
+                # Create archive of all backups
+                archive_file = f"/tmp/full-backup-{self._path_component(role)}-{timestamp}.tar.gz"
+                commands["archive"] = f"tar -czf {shlex.quote(archive_file)} /tmp/*{timestamp}*"
+            
+            saved = self._ssh_batch(host, commands)
+            
+            # Files whose remote hash matches the last stored backup are recorded, not transferred
+            unchanged = {}
+            if incremental:
+                for name, (_, target) in saves.items():
+                    remote_hash = saved[f"{name}:sha256"]
+                    last = store.latest(marker, role, name)
+                    if last and remote_hash == last["sha256"]:
+                        stored = store.add_existing(remote_hash, marker, role, name, backup_time=backup_time,
+                                                    host=host, remote_path=target)
+                        if stored:
+                            unchanged[target] = {
+                                "success": True,
+                                "skipped": True,
+                                "bytes": 0,
+                                "sha256": remote_hash,
+                                "stored": {"id": stored["id"], "deduplicated": True}
+                            }
+            
+            # Stream the saved files and the archive over SFTP into a staging directory
+            os.makedirs(os.path.join(self.backup_dir, "staging"), exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=f"{timestamp}-", dir=os.path.join(self.backup_dir, "staging"))
             try:
-                backup_results = {}
-                
-                if config_type == "running" or config_type == "full":
-                    # Backup running configuration
-                    running_cmd = "show running-config"
-                    running_backup = self._ssh_command(host, running_cmd)
-                    
-                    # Save to file
-                    save_cmd = f"echo '{running_backup}' > /tmp/running-config-{timestamp}.txt"
-                    save_result = self._ssh_command(host, save_cmd)
-                    
-                    backup_results["running_config"] = {
-                        "content": running_backup,
-                        "saved_to": f"/tmp/running-config-{timestamp}.txt",
-                        "save_result": save_result
-                    }
-                
-                if config_type == "startup" or config_type == "full":
-                    # Backup startup configuration
-                    startup_cmd = "show startup-config"
-                    startup_backup = self._ssh_command(host, startup_cmd)
-                    
-                    # Save to file
-                    save_cmd = f"echo '{startup_backup}' > /tmp/startup-config-{timestamp}.txt"
-                    save_result = self._ssh_command(host, save_cmd)
-                    
-                    backup_results["startup_config"] = {
-                        "content": startup_backup,
-                        "saved_to": f"/tmp/startup-config-{timestamp}.txt",
-                        "save_result": save_result
-                    }
-                
-                if config_type == "mcu" or config_type == "full":
-                    # Backup MCU configuration
-                    mcu_config = self._ssh_command(host, "cat CONFIGURATION")
-                    
-                    # Save MCU config
-                    save_cmd = f"cp CONFIGURATION /tmp/CONFIGURATION-{timestamp}.backup"
-                    save_result = self._ssh_command(host, save_cmd)
-                    
-                    backup_results["mcu_config"] = {
-                        "content": mcu_config,
-                        "saved_to": f"/tmp/CONFIGURATION-{timestamp}.backup", 
-                        "save_result": save_result
-                    }
-                
-                if config_type == "full":
-                    # Additional system files
-                    system_files = [
-                        "/etc/network/interfaces",
-                        "/etc/hosts",
-                        "/etc/resolv.conf",
-                        "/proc/version",
-                        "/proc/meminfo"
-                    ]
-                    
-                    system_backup = {}
-                    for file_path in system_files:
-                        content = self._ssh_command(host, f"cat {file_path}")
-                        backup_file = f"/tmp/{file_path.replace('/', '_')}-{timestamp}.backup"
-                        save_cmd = f"cp {file_path} {backup_file}"
-                        save_result = self._ssh_command(host, save_cmd)
-                        
-                        system_backup[file_path] = {
-                            "content": content,
-                            "backup_file": backup_file,
-                            "save_result": save_result
-                        }
-                    
-                    backup_results["system_files"] = system_backup
+                remote_files = [target for _, target in saves.values() if target not in unchanged]
+                if archive_file:
+                    remote_files.append(archive_file)
+                if not remote_files:
+                    downloads = {}
+                elif self.file_transfer:
+                    downloads = self.file_transfer.download_many(
+                        host, {remote: os.path.join(staging, f"{index}-{os.path.basename(remote)}")
+                               for index, remote in enumerate(remote_files)}
+                    )
+                else:
+                    downloads = {remote: {"success": False, "error": "SSH Error: No SSH credentials configured"}
+                                 for remote in remote_files}
+                downloads.update(unchanged)
                 
-                # Create archive of all backups
-                archive_cmd = f"tar -czf /tmp/full-backup-{role}-{timestamp}.tar.gz /tmp/*{timestamp}*"
-                archive_result = self._ssh_command(host, archive_cmd)
+                # Configs go into the store, where identical content is kept once
+                for name, (_, target) in saves.items():
+                    download = downloads[target]
+                    if download.get("success") and not download.get("skipped"):
+                        stored = store.add_file(download.pop("local_file"), marker, role, name,
+                                                backup_time=backup_time, host=host,
+                                                remote_path=target, sha256=download["sha256"])
+                        download["stored"] = {"id": stored["id"], "deduplicated": stored["deduplicated"]}
                 
+                # Archives embed timestamps and never deduplicate, so they stay plain files
+                download = downloads.get(archive_file, {})
+                if download.get("success"):
+                    archive_dir = os.path.join(self.backup_dir, "archives",
+                                               self._path_component(marker), self._path_component(role))
+                    os.makedirs(archive_dir, exist_ok=True)
+                    local_archive = os.path.join(archive_dir, os.path.basename(archive_file))
+                    shutil.move(download["local_file"], local_archive)
+                    download["local_file"] = local_archive
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+            
+            def entry(name, key="saved_to"):
+                target = saves[name][1]
+                return {
+                    key: target,
+                    "save_result": saved[name],
+                    "download": downloads[target]
+                }
+            
+            for name in ("running_config", "startup_config", "mcu_config"):
+                if name in saves:
+                    backup_results[name] = entry(name)
+            
+            if system_files:
+                backup_results["system_files"] = {
+                    file_path: entry(file_path, "backup_file") for file_path in system_files
+                }
+            
+            if archive_file:
                 backup_results["archive"] = {
-                    "archive_file": f"/tmp/full-backup-{role}-{timestamp}.tar.gz",
-                    "archive_result": archive_result,
+                    "archive_file": archive_file,
+                    "archive_result": saved["archive"],
+                    "download": downloads[archive_file],
                     "timestamp": timestamp
                 }
-                
-                results[role] = backup_results
-                
-            except Exception as e:
-                results[role] = {
-                    "error": f"Backup failed: {str(e)}"
+            else:
+                backup_results["incremental"] = {
+                    "transferred": len(remote_files),
+                    "unchanged": len(unchanged),
+                    "bytes": sum(d.get("bytes", 0) for d in downloads.values()),
+                    "timestamp": timestamp
                 }
+            
+            return backup_results
+        
+        results = self._fan_out(devs, backup,
+                                lambda e: {"error": f"Backup failed: {str(e)}"})
         
         return {"backup_config": results}
     
+    @staticmethod
+    def _path_component(name: str) -> str:
+        """Database-sourced name reduced to characters safe in a single path component"""
+        return re.sub(r"[^A-Za-z0-9_-]+", "_", str(name).strip()).strip("_") or "_"
+    
+    def compare_config_snapshots(self, marker: str, role: str, name: str = "mcu_config",
+                                 other_marker: str = None, other_role: str = None) -> dict:
+        """
+        Diff stored config snapshots.
+        Without other_marker/other_role, the latest backup of name on marker/role is compared
+        with the one before it; otherwise it is compared with the other device's latest.
+        """
+        store = self._get_backup_store()
+        if other_marker is None and other_role is None:
+            entries = store.history(marker=marker, role=role, name=name, limit=2)
+            if len(entries) < 2:
+                return {"error": f"Need two stored {name} backups of {marker} {role}, found {len(entries)}"}
+            new, old = entries
+        else:
+            new = store.latest(marker, role, name)
+            old = store.latest(other_marker or marker, other_role or role, name)
+            if new is None or old is None:
+                return {"error": f"No stored {name} backup for one of the devices"}
+        
+        try:
+            old_text = store.read(old["sha256"]).decode("utf-8", errors="replace")
+            new_text = store.read(new["sha256"]).decode("utf-8", errors="replace")
+        except OSError as e:
+            return {"error": f"Could not read stored backup: {str(e)}"}
+        
+        def label(entry):
+            return f"{entry['marker']}/{entry['role']}/{name} @ {entry['backup_time']}"
+        
+        diff = diff_configs(old_text, new_text, label(old), label(new))
+        diff["old"] = {k: old[k] for k in ("id", "marker", "role", "backup_time", "sha256")}
+        diff["new"] = {k: new[k] for k in ("id", "marker", "role", "backup_time", "sha256")}
+        return {"compare_config_snapshots": diff}
+    
+    def config_drift(self, baseline_marker: str, baseline_role: str, name: str = "mcu_config",
+                     keys: List[str] = None, markers: List[str] = None,
+                     include_extra: bool = False) -> dict:
+        """
+        Devices whose latest stored snapshot of name differs from a baseline device's.
+        keys: compare only these keys; markers: only report devices on these markers
+        Returns {"config_drift": {"baseline", "devices", "differing": {"marker/role": {key: [baseline, value]}}}}
+        """
+        # Held throughout, so a concurrent rebuild can't change the index mid-comparison
+        with self._config_index_lock:
+            try:
+                index = self._config_index(name)
+            except OSError as e:
+                return {"error": f"Could not read stored backups: {str(e)}"}
+            
+            # Markers are matched like the inventory does, ignoring case and whitespace
+            baseline_key = normalize_marker(baseline_marker)
+            baseline = next((config for (marker, role), config in index.configs.items()
+                             if normalize_marker(marker) == baseline_key and role == baseline_role), None)
+            if baseline is None:
+                return {"error": f"No stored {name} backup for {baseline_marker} {baseline_role}"}
+            
+            differing = index.differing_from(baseline, keys=keys, include_extra=include_extra)
+            wanted = {normalize_marker(m) for m in markers} if markers else None
+            devices = [d for d in index.configs if wanted is None or normalize_marker(d[0]) in wanted]
+        return {
+            "config_drift": {
+                "baseline": f"{baseline_marker}/{baseline_role}",
+                "devices": len(devices),
+                "differing": {
+                    f"{marker}/{role}": {key: list(values) for key, values in sorted(changes.items())}
+                    for (marker, role), changes in sorted(differing.items())
+                    if wanted is None or normalize_marker(marker) in wanted
+                }
+            }
+        }
+    
+    def _config_index(self, name: str) -> ConfigIndex:
+        """Per-key index of the latest stored snapshot of name for every marker/role"""
+        store = self._get_backup_store()
+        latest = {(e["marker"], e["role"]): e["sha256"] for e in store.latest_per_device(name)}
+        
+        with self._config_index_lock:
+            index, indexed = self._config_indexes.get(name) or (ConfigIndex(), {})
+            for device in set(indexed) - set(latest):
+                index.remove(device)
+                del indexed[device]
+            for device, sha256 in latest.items():
+                if indexed.get(device) == sha256:
+                    continue
+                # Snapshots are content-addressed, so identical configs are parsed once
+                config = self._parsed_configs.get(sha256)
+                if config is None:
+                    config = parse_config(store.read(sha256).decode("utf-8", errors="replace"))
+                    self._parsed_configs[sha256] = config
+                index.add(device, config)
+                indexed[device] = sha256
+            self._config_indexes[name] = (index, indexed)
+            
+            # Forget parsed snapshots no device points at any more
+            in_use = {sha for _, shas in self._config_indexes.values() for sha in shas.values()}
+            for sha256 in set(self._parsed_configs) - in_use:
+                del self._parsed_configs[sha256]
+            return index
+    
     def setup_credentials(self):
         """Setup credentials interactively"""
         return self.credential_manager.setup_credentials_interactive()
@@ -628,12 +1113,11 @@ class DeviceManager:
         except:
             pass
         
-        # Test database
+        # Test database (checkout validates the pooled connection)
         if self.conn_str:
             try:
-                con = pyodbc.connect(self.conn_str)
-                con.close()
-                results["database"] = True
+                with self._get_db_pool().connection():
+                    results["database"] = True
             except:
                 pass
         
@@ -0,0 +1,216 @@
+"""
+NetPulse File Transfer
+Streams files between devices and local storage over pooled SFTP sessions
+"""
+
+import hashlib
+import io
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterator, Optional
+
+try:
+    from .ssh_pool import SSHConnectionPool
+except ImportError:
+    from netpulse.automation.ssh_pool import SSHConnectionPool
+
+
+class FileTransfer:
+    """Chunked SFTP transfers with bounded memory"""
+
+    def __init__(self, ssh_pool: SSHConnectionPool, chunk_size: int = 32768,
+                 max_requests: int = 64):
+        """
+        ssh_pool: pool the SFTP sessions are opened on
+        chunk_size: bytes read and written per step
+        max_requests: SFTP read requests kept in flight. Reads are prefetched one
+                      window of max_requests * 32 KiB at a time, which caps
+                      buffered data at about that much regardless of file size
+        """
+        self.ssh_pool = ssh_pool
+        self.chunk_size = chunk_size
+        self.max_requests = max_requests
+
+    def download(self, host: str, remote_path: str, local_path: str,
+                 callback: Optional[Callable[[int, int], None]] = None) -> Dict:
+        """
+        Stream one remote file to local_path.
+        callback(bytes_done, bytes_total) is called after each chunk.
+        """
+        return self.download_many(host, {remote_path: local_path}, callback)[remote_path]
+
+    def download_many(self, host: str, files: Dict[str, str],
+                      callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Dict]:
+        """
+        Stream several remote files over one SFTP session.
+        files: {remote_path: local_path}
+        Returns {remote_path: {"success", "local_file", "bytes", "sha256"} or {"success", "error"}}
+        """
+        if not files:
+            return {}
+
+        try:
+            client = self.ssh_pool.acquire(host)
+        except Exception as e:
+            return {remote: {"success": False, "error": f"SSH Error: {str(e)}"} for remote in files}
+
+        results = {}
+        try:
+            sftp = client.open_sftp()
+            try:
+                for remote_path, local_path in files.items():
+                    try:
+                        results[remote_path] = self._fetch(sftp, remote_path, local_path, callback)
+                    except (IOError, OSError) as e:
+                        results[remote_path] = {"success": False, "error": f"Transfer failed: {str(e)}"}
+            finally:
+                sftp.close()
+        except Exception as e:
+            for remote_path in files:
+                results.setdefault(remote_path, {"success": False, "error": f"SFTP Error: {str(e)}"})
+        finally:
+            self.ssh_pool.release(host, client)
+
+        return results
+
+    def read_bytes(self, host: str, remote_path: str) -> Dict:
+        """
+        Read a small remote file into memory.
+        Returns {"success", "data", "sha256", "mode"} or {"success", "error"}
+        """
+        try:
+            with self._sftp(host) as sftp:
+                with sftp.open(remote_path, "rb") as remote_file:
+                    attrs = remote_file.stat()
+                    data = b"".join(self._read_chunks(remote_file, attrs.st_size or 0))
+        except (IOError, OSError) as e:
+            return {"success": False, "error": f"Transfer failed: {str(e)}"}
+        except Exception as e:
+            return {"success": False, "error": f"SFTP Error: {str(e)}"}
+        
+        return {
+            "success": True,
+            "data": data,
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "mode": attrs.st_mode
+        }
+
+    def upload(self, host: str, local_path: str, remote_path: str,
+               callback: Optional[Callable[[int, int], None]] = None,
+               mode: Optional[int] = None) -> Dict:
+        """
+        Stream a local file to remote_path.
+        mode: permission bits to set on the uploaded file
+        callback(bytes_done, bytes_total) is called after each chunk.
+        """
+        with open(local_path, "rb") as source:
+            return self._upload(host, source, os.path.getsize(local_path), remote_path, callback, mode)
+
+    def upload_bytes(self, host: str, data: bytes, remote_path: str,
+                     mode: Optional[int] = None) -> Dict:
+        """Write in-memory content to remote_path"""
+        return self._upload(host, io.BytesIO(data), len(data), remote_path, None, mode)
+
+    def _upload(self, host: str, source: BinaryIO, total: int, remote_path: str,
+                callback: Optional[Callable[[int, int], None]], mode: Optional[int]) -> Dict:
+        """Copy source to the device chunk by chunk, hashing as it goes"""
+        digest = hashlib.sha256()
+        done = 0
+        try:
+            with self._sftp(host) as sftp:
+                with sftp.open(remote_path, "wb") as remote_file:
+                    # Don't wait for each write to be acknowledged before sending the next
+                    remote_file.set_pipelined(True)
+                    while True:
+                        chunk = source.read(self.chunk_size)
+                        if not chunk:
+                            break
+                        remote_file.write(chunk)
+                        digest.update(chunk)
+                        done += len(chunk)
+                        if callback:
+                            callback(done, total)
+                if mode is not None:
+                    sftp.chmod(remote_path, mode & 0o7777)
+                written = sftp.stat(remote_path).st_size
+        except (IOError, OSError) as e:
+            return {"success": False, "error": f"Transfer failed: {str(e)}"}
+        except Exception as e:
+            return {"success": False, "error": f"SFTP Error: {str(e)}"}
+
+        if written != done:
+            return {"success": False, "error": f"Transfer failed: wrote {done} bytes, remote file has {written}"}
+        return {
+            "success": True,
+            "remote_file": remote_path,
+            "bytes": done,
+            "sha256": digest.hexdigest()
+        }
+
+    @contextmanager
+    def _sftp(self, host: str):
+        """SFTP session on a pooled connection, released afterwards"""
+        client = self.ssh_pool.acquire(host)
+        try:
+            sftp = client.open_sftp()
+            try:
+                yield sftp
+            finally:
+                sftp.close()
+        finally:
+            self.ssh_pool.release(host, client)
+
+    def _fetch(self, sftp, remote_path: str, local_path: str,
+               callback: Optional[Callable[[int, int], None]]) -> Dict:
+        """Copy one file chunk by chunk, hashing as it goes"""
+        os.makedirs(os.path.dirname(os.path.abspath(local_path)), exist_ok=True)
+        partial = local_path + ".part"
+        digest = hashlib.sha256()
+        done = 0
+
+        try:
+            with sftp.open(remote_path, "rb") as remote_file:
+                total = remote_file.stat().st_size or 0
+                with open(partial, "wb") as local_file:
+                    for chunk in self._read_chunks(remote_file, total):
+                        local_file.write(chunk)
+                        digest.update(chunk)
+                        done += len(chunk)
+                        if callback:
+                            callback(done, total)
+            # Only complete files ever appear under the final name
+            os.replace(partial, local_path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+        return {
+            "success": True,
+            "local_file": local_path,
+            "bytes": done,
+            "sha256": digest.hexdigest()
+        }
+
+    def _read_chunks(self, remote_file, total: int) -> Iterator[bytes]:
+        """
+        Yield the file chunk by chunk with pipelined reads. Paramiko keeps every
+        prefetched response until it is read, so reads are prefetched one window
+        at a time instead of for the whole file.
+        """
+        window = self.max_requests * remote_file.MAX_REQUEST_SIZE
+        done = 0
+        while True:
+            if done < total:
+                end = min(total, done + window)
+                remote_file.prefetch(end, max_concurrent_requests=self.max_requests)
+            else:
+                # Past the size we were told - read whatever else is there
+                end = None
+            while end is None or done < end:
+                size = self.chunk_size if end is None else min(self.chunk_size, end - done)
+                chunk = remote_file.read(size)
+                if not chunk:
+                    return
+                done += len(chunk)
+                yield chunk
@@ -0,0 +1,473 @@
+"""
+NetPulse Fleet Monitor
+Background reachability monitoring of every inventoried device
+"""
+
+import heapq
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .device_manager import DeviceManager
+    from ..core.network_tools import NetworkTools
+    from ..core.timeseries import TimeSeriesStore
+except ImportError:
+    from netpulse.automation.device_manager import DeviceManager
+    from netpulse.core.network_tools import NetworkTools
+    from netpulse.core.timeseries import TimeSeriesStore
+
+
+class _MonitoredDevice:
+    """Reachability state and poll schedule of one device"""
+
+    def __init__(self, marker: str, role: str, host: str, interval: float):
+        self.marker = marker
+        self.role = role
+        self.host = host
+        self.state = "unknown"
+        self.since = None
+        self.last_check = None
+        self.latency_ms = None
+        self.via = None
+        self.failures = 0
+        self.interval = interval
+        self.due = 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "marker": self.marker,
+            "role": self.role,
+            "host": self.host,
+            "state": self.state,
+            "since": self.since,
+            "last_check": self.last_check,
+            "latency_ms": self.latency_ms,
+            "via": self.via,
+            "failures": self.failures,
+            "interval": round(self.interval, 1)
+        }
+
+
+class FleetMonitor:
+    """
+    Keeps probing every device in the inventory from one scheduler thread.
+
+    Due devices are checked together each round: one ICMP sweep, TCP connects
+    for hosts that didn't answer, and an HTTP probe as a last resort. Stable
+    devices are polled less and less often and long-dead ones back off further;
+    any state change drops a device back to the base interval. Current state
+    and every transition are kept in SQLite.
+    """
+
+    def __init__(self, manager: DeviceManager = None, network_tools: NetworkTools = None,
+                 db_path: str = None, methods: Tuple[str, ...] = ("icmp", "tcp", "http"),
+                 base_interval: float = 30, max_up_interval: float = 300,
+                 max_down_interval: float = 1800, backoff: float = 1.5,
+                 down_after: int = 2, timeout: float = 2, tcp_ports: Tuple[int, ...] = (22, 80),
+                 inventory_refresh: float = 3600,
+                 on_transition: Optional[Callable[[Dict], None]] = None):
+        """
+        manager: DeviceManager providing the inventory and HTTP probe (created if omitted)
+        network_tools: NetworkTools used for ICMP/TCP checks (created if omitted, recording
+                       into the timeseries directory next to db_path)
+        db_path: SQLite database for state and transitions (default: the application's netpulse.db)
+        methods: probes to use, cheapest first; a device is up when any of them answers
+        base_interval: seconds between checks right after start or a state change
+        max_up_interval / max_down_interval: longest poll interval for up / down devices
+        backoff: factor the interval grows by after each unchanged result
+        down_after: consecutive failed checks before an up device is marked down
+        timeout: seconds each probe waits for an answer
+        tcp_ports: ports tried by the TCP probe
+        inventory_refresh: seconds between re-reading the device inventory
+        on_transition(event) is called from the monitor thread for every state change.
+        """
+        self.manager = manager or DeviceManager()
+        if db_path is None:
+            core_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core')
+            db_path = os.path.join(core_dir, 'data', 'netpulse.db')
+        self.db_path = db_path
+        self.network_tools = network_tools or NetworkTools(
+            timeseries=TimeSeriesStore(os.path.join(os.path.dirname(db_path), 'timeseries')))
+        self.methods = tuple(methods)
+        self.base_interval = base_interval
+        self.max_up_interval = max_up_interval
+        self.max_down_interval = max_down_interval
+        self.backoff = backoff
+        self.down_after = max(1, int(down_after))
+        self.timeout = timeout
+        self.tcp_ports = tuple(tcp_ports)
+        self.inventory_refresh = inventory_refresh
+        self.on_transition = on_transition
+
+        self._devices: Dict[Tuple[str, str], _MonitoredDevice] = {}
+        self._schedule: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inventory_at = 0.0
+        self._rounds = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._init_database()
+
+    def _init_database(self):
+        """Create the monitor state and transition tables"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_devices (
+                    marker TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    since DATETIME,
+                    last_check DATETIME,
+                    latency_ms REAL,
+                    via TEXT,
+                    failures INTEGER DEFAULT 0,
+                    interval REAL,
+                    PRIMARY KEY (marker, role)
+                )
+            ''')
+
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    marker TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    host TEXT NOT NULL,
+                    old_state TEXT,
+                    new_state TEXT NOT NULL,
+                    via TEXT,
+                    latency_ms REAL,
+                    event_time DATETIME NOT NULL
+                )
+            ''')
+
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_monitor_events_device
+                ON monitor_events (marker, role, event_time)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_monitor_events_time
+                ON monitor_events (event_time)
+            ''')
+
+            conn.commit()
+
+    def start(self):
+        """Start monitoring in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="netpulse-fleet-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Stop the monitor thread and wait for the current round to finish"""
+        self._stop.set()
+        self.network_tools.stop_scan = True
+        if self._thread:
+            self._thread.join(timeout)
+        self.network_tools.stop_scan = False
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def sync_inventory(self) -> Dict[str, int]:
+        """Add newly inventoried devices and drop removed ones; returns the counts"""
+        try:
+            self.manager.refresh_inventory(force=False)
+        except Exception as e:
+            print(f"⚠️  Fleet monitor using cached inventory: {e}")
+
+        wanted = {}
+        for marker, devices in self.manager.inventory.all_devices().items():
+            for device in devices:
+                wanted[(marker, device["role"])] = device["host"]
+
+        saved = self._load_saved_state()
+        added = removed = 0
+        with self._lock:
+            for key in set(self._devices) - set(wanted):
+                del self._devices[key]
+                removed += 1
+            for key, host in wanted.items():
+                device = self._devices.get(key)
+                if device is None:
+                    device = _MonitoredDevice(key[0], key[1], host, self.base_interval)
+                    if key in saved:
+                        self._restore(device, saved[key])
+                    self._devices[key] = device
+                    # Spread the first round over the base interval instead of probing everything at once
+                    self._push(key, time.monotonic() + random.uniform(0, min(self.base_interval, device.interval)))
+                    added += 1
+                elif device.host != host:
+                    device.host = host
+                    device.failures = 0
+            self._inventory_at = time.monotonic()
+
+        self._forget(set(saved) - set(wanted))
+        return {"devices": len(wanted), "added": added, "removed": removed}
+
+    def run_once(self, force: bool = False) -> Dict:
+        """
+        Check every due device once (every device when force) and record the results.
+        Returns {"checked", "up", "down", "transitions"}
+        """
+        now = time.monotonic()
+        with self._lock:
+            if force:
+                due = list(self._devices.values())
+                self._schedule = []
+            else:
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, _, key = heapq.heappop(self._schedule)
+                    device = self._devices.get(key)
+                    # Devices removed from the inventory leave stale heap entries behind
+                    if device is not None and device.due <= now:
+                        due.append(device)
+
+        if not due:
+            return {"checked": 0, "up": 0, "down": 0, "transitions": []}
+
+        results = self._probe({device.host for device in due})
+        transitions = self._apply(due, results)
+        self._rounds += 1
+        up = sum(1 for device in due if results[device.host]["up"])
+        return {"checked": len(due), "up": up, "down": len(due) - up, "transitions": transitions}
+
+    def status(self, marker: str = None, state: str = None) -> List[Dict]:
+        """Current state of the monitored devices, optionally filtered"""
+        with self._lock:
+            return [
+                device.as_dict() for device in self._devices.values()
+                if (marker is None or device.marker == marker) and (state is None or device.state == state)
+            ]
+
+    def events(self, marker: str = None, role: str = None, since: datetime = None,
+               limit: int = 100) -> List[Dict]:
+        """State transitions recorded in the database, newest first"""
+        clauses, params = [], []
+        for column, value in (("marker", marker), ("role", role)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("event_time >= ?")
+            params.append(since.strftime('%Y-%m-%d %H:%M:%S'))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f'''
+                SELECT * FROM monitor_events {where}
+                ORDER BY event_time DESC, id DESC
+                LIMIT ?
+            ''', (*params, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def stats(self) -> Dict:
+        """Device counts per state and the time until the next scheduled check"""
+        with self._lock:
+            counts = {}
+            for device in self._devices.values():
+                counts[device.state] = counts.get(device.state, 0) + 1
+            next_due = self._schedule[0][0] - time.monotonic() if self._schedule else None
+        return {
+            "devices": sum(counts.values()),
+            "states": counts,
+            "rounds": self._rounds,
+            "next_check_in": round(max(0.0, next_due), 1) if next_due is not None else None,
+            "running": self.is_running()
+        }
+
+    def _run(self):
+        """Scheduler loop: sleep until the next device is due, then check all due devices"""
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._inventory_at >= self.inventory_refresh or not self._devices:
+                    self.sync_inventory()
+                self.run_once()
+            except Exception as e:
+                print(f"✗ Fleet monitor round failed: {e}")
+
+            with self._lock:
+                wait = self._schedule[0][0] - time.monotonic() if self._schedule else self.base_interval
+            # Short waits are batched so close due times share a round
+            self._stop.wait(min(max(wait, 1.0), self.base_interval))
+
+    def _probe(self, hosts: set) -> Dict[str, Dict]:
+        """Check hosts with each configured method, trying only those still unanswered"""
+        return self.network_tools.check_reachability(
+            list(hosts), tcp_ports=self.tcp_ports if "tcp" in self.methods else (),
+            timeout=self.timeout, use_icmp="icmp" in self.methods,
+            fallback=self._probe_http if "http" in self.methods else None
+        )
+
+    def _probe_http(self, hosts: List[str]) -> Dict[str, Dict]:
+        """HTTP probe of the hosts no cheaper method reached, returning those that answered"""
+        probe = self.manager.http_probe
+        with ThreadPoolExecutor(max_workers=min(probe.max_concurrency, len(hosts))) as executor:
+            replies = list(executor.map(probe.probe, hosts))
+        self.network_tools.record_samples(
+            ((host, reply["latency_ms"]) for host, reply in zip(hosts, replies)), metric="http")
+        return {host: {"up": True, "via": "http", "rtt_ms": reply["latency_ms"]}
+                for host, reply in zip(hosts, replies) if reply["up"]}
+
+    def _apply(self, devices: List[_MonitoredDevice], results: Dict[str, Dict]) -> List[Dict]:
+        """Update state and schedule from a round of results and persist them in one transaction"""
+        now = time.monotonic()
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        transitions = []
+
+        with self._lock:
+            for device in devices:
+                if (device.marker, device.role) not in self._devices:
+                    continue
+                result = results[device.host]
+                device.last_check = timestamp
+                device.latency_ms = result["rtt_ms"]
+                device.via = result["via"]
+                device.failures = 0 if result["up"] else device.failures + 1
+
+                if result["up"]:
+                    new_state = "up"
+                elif device.state != "up" or device.failures >= self.down_after:
+                    new_state = "down"
+                else:
+                    # One missed check isn't an outage - confirm it quickly
+                    new_state = device.state
+
+                if new_state != device.state:
+                    transitions.append({
+                        "marker": device.marker, "role": device.role, "host": device.host,
+                        "old_state": device.state, "new_state": new_state,
+                        "via": device.via, "latency_ms": device.latency_ms, "event_time": timestamp
+                    })
+                    device.state = new_state
+                    device.since = timestamp
+                    device.interval = self.base_interval
+                elif device.failures and new_state == "up":
+                    device.interval = self.base_interval / 2
+                else:
+                    limit = self.max_up_interval if new_state == "up" else self.max_down_interval
+                    device.interval = min(device.interval * self.backoff, limit)
+
+                # Jitter keeps devices from falling into lockstep rounds
+                self._push((device.marker, device.role),
+                           now + device.interval * random.uniform(0.9, 1.1))
+
+        self._save(devices, transitions)
+
+        if self.on_transition:
+            for event in transitions:
+                try:
+                    self.on_transition(event)
+                except Exception as e:
+                    print(f"⚠️  Fleet monitor transition callback failed: {e}")
+        return transitions
+
+    def _push(self, key: Tuple[str, str], due: float):
+        """Schedule a device (caller holds the lock)"""
+        self._devices[key].due = due
+        self._sequence += 1
+        heapq.heappush(self._schedule, (due, self._sequence, key))
+
+    def _save(self, devices: List[_MonitoredDevice], transitions: List[Dict]):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO monitor_devices
+                    (marker, role, host, state, since, last_check, latency_ms, via, failures, interval)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(d.marker, d.role, d.host, d.state, d.since, d.last_check, d.latency_ms,
+                       d.via, d.failures, d.interval) for d in devices])
+                conn.executemany('''
+                    INSERT INTO monitor_events
+                    (marker, role, host, old_state, new_state, via, latency_ms, event_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(e["marker"], e["role"], e["host"], e["old_state"], e["new_state"],
+                       e["via"], e["latency_ms"], e["event_time"]) for e in transitions])
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not save fleet monitor state: {e}")
+
+    def _load_saved_state(self) -> Dict[Tuple[str, str], sqlite3.Row]:
+        """Device state from a previous run, so a restart keeps 'since' and intervals"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.row_factory = sqlite3.Row
+                return {(row["marker"], row["role"]): row
+                        for row in conn.execute('SELECT * FROM monitor_devices')}
+        except sqlite3.Error:
+            return {}
+
+    def _restore(self, device: _MonitoredDevice, row: sqlite3.Row):
+        device.state = row["state"]
+        device.since = row["since"]
+        device.last_check = row["last_check"]
+        device.latency_ms = row["latency_ms"]
+        device.via = row["via"]
+        device.failures = row["failures"] or 0
+        device.interval = row["interval"] or self.base_interval
+
+    def _forget(self, keys):
+        """Drop saved state of devices no longer in the inventory"""
+        if not keys:
+            return
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany('DELETE FROM monitor_devices WHERE marker = ? AND role = ?', keys)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not save fleet monitor state: {e}")
+
+
+def main():
+    """Run the fleet monitor in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NetPulse Fleet Monitor")
+    parser.add_argument("--methods", default="icmp,tcp,http", help="Comma separated probes, cheapest first")
+    parser.add_argument("--interval", type=float, default=30, help="Base poll interval in seconds")
+    parser.add_argument("--max-up-interval", type=float, default=300, help="Longest interval for up devices")
+    parser.add_argument("--max-down-interval", type=float, default=1800, help="Longest interval for down devices")
+    parser.add_argument("--timeout", type=float, default=2, help="Seconds each probe waits")
+    parser.add_argument("--tcp-ports", default="22,80", help="Comma separated ports for the TCP probe")
+
+    args = parser.parse_args()
+
+    def report(event):
+        icon = "✓" if event["new_state"] == "up" else "✗"
+        print(f"{icon} {event['event_time']} {event['marker']} {event['role']} ({event['host']}): "
+              f"{event['old_state']} -> {event['new_state']}", flush=True)
+
+    monitor = FleetMonitor(
+        methods=tuple(m.strip() for m in args.methods.split(",") if m.strip()),
+        base_interval=args.interval, max_up_interval=args.max_up_interval,
+        max_down_interval=args.max_down_interval, timeout=args.timeout,
+        tcp_ports=tuple(int(p) for p in args.tcp_ports.split(",") if p.strip()),
+        on_transition=report
+    )
+    monitor.start()
+    try:
+        while monitor.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping fleet monitor...", file=sys.stderr)
+    finally:
+        monitor.stop()
+        monitor.manager.close()
+
+
+if __name__ == "__main__":
+    main()
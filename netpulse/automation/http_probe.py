@@ -0,0 +1,83 @@
+"""
+NetPulse HTTP Probe
+Reachability checks over a shared keep-alive HTTP session
+"""
+
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HTTPProbe:
+    """HTTP health probes with pooled connections, split timeouts and latency capture"""
+
+    def __init__(self, connect_timeout: float = 2.0, read_timeout: float = 5.0,
+                 method: str = "GET", max_hosts: int = 256, per_host: int = 2,
+                 max_concurrency: int = 32):
+        """
+        connect_timeout: seconds to establish the TCP connection - a dead device fails after this
+        read_timeout: seconds to wait for the response once connected
+        method: default request method, GET or HEAD
+        max_hosts: devices whose keep-alive connections are kept in the pool
+        per_host: idle connections kept per device
+        max_concurrency: devices probed at once
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.method = method.upper()
+        self.max_concurrency = max_concurrency
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=per_host, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def probe(self, host: str, method: Optional[str] = None, scheme: str = "http",
+              path: str = "/") -> Dict:
+        """
+        Probe one device.
+        method: GET or HEAD (default self.method); HEAD falls back to GET when the
+                device answers 405/501
+        Returns {"up", "status", "latency_ms", "method", "error"}
+        """
+        method = (method or self.method).upper()
+        url = f"{scheme}://{host}{path}"
+        try:
+            response = self._request(method, url)
+            if method == "HEAD" and response.status_code in (405, 501):
+                method = "GET"
+                response = self._request(method, url)
+        except requests.RequestException as e:
+            return {
+                "up": False,
+                "status": None,
+                "latency_ms": None,
+                "method": method,
+                "error": self._describe_error(e)
+            }
+
+        return {
+            "up": True,
+            "status": response.status_code,
+            # Time until the response headers arrived, not including the body
+            "latency_ms": round(response.elapsed.total_seconds() * 1000, 1),
+            "method": method,
+            "error": None
+        }
+
+    def close(self):
+        """Close pooled keep-alive connections"""
+        self.session.close()
+
+    def _request(self, method: str, url: str) -> requests.Response:
+        # The body is read in full so the connection goes back to the pool for reuse
+        return self.session.request(method, url, timeout=(self.connect_timeout, self.read_timeout),
+                                    allow_redirects=False)
+
+    def _describe_error(self, error: requests.RequestException) -> str:
+        if isinstance(error, requests.ConnectTimeout):
+            return f"ConnectTimeout after {self.connect_timeout}s"
+        if isinstance(error, requests.ReadTimeout):
+            return f"ReadTimeout after {self.read_timeout}s"
+        return type(error).__name__
@@ -0,0 +1,243 @@
+"""
+NetPulse Inventory Cache
+Local copy of the SQL Server device inventory (v_ListaPL, Stazioni)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+def normalize_marker(marker: str) -> str:
+    """
+    Cache key for a marker. SQL Server compares PL case-insensitively,
+    so 'pl01 ' and 'PL01' name the same devices.
+    """
+    return str(marker).strip().casefold()
+
+
+class InventoryCache:
+    """In-memory inventory backed by the local SQLite database, with TTL expiry"""
+
+    def __init__(self, db_path: str = None, ttl: float = 3600):
+        """
+        db_path: SQLite file to persist to (default: the application's netpulse.db)
+        ttl: seconds before cached entries are considered stale
+        """
+        if db_path is None:
+            core_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core')
+            db_path = os.path.join(core_dir, 'data', 'netpulse.db')
+        self.db_path = db_path
+        self.ttl = ttl
+
+        # normalized marker -> (devices, fetched_at, marker as spelled by the database)
+        self._devices: Dict[str, tuple] = {}
+        self._stations: List[Dict] = []
+        self._complete_at = 0.0
+        self._stations_at = 0.0
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def get_devices(self, marker: str, allow_stale: bool = False) -> Optional[List[Dict]]:
+        """
+        Cached devices for marker, or None when the database must be asked.
+        A marker missing from a fresh full inventory is known not to exist ([]).
+        allow_stale: return entries regardless of age (offline fallback)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._devices.get(normalize_marker(marker))
+            if entry and (allow_stale or self._is_fresh(entry[1])):
+                return [dict(dev) for dev in entry[0]]
+            if entry is None and self._is_fresh(self._complete_at):
+                return []
+        return None
+
+    def has_entry(self, marker: str) -> bool:
+        """
+        True when marker has a fresh entry of its own (possibly empty), False when
+        get_devices() only infers [] from the marker's absence in the full inventory
+        """
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._devices.get(normalize_marker(marker))
+            return entry is not None and self._is_fresh(entry[1])
+
+    def all_devices(self, allow_stale: bool = True) -> Dict[str, List[Dict]]:
+        """Every cached marker with its devices (stale entries included by default)"""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                marker: [dict(dev) for dev in devs]
+                for devs, fetched_at, marker in self._devices.values()
+                if allow_stale or self._is_fresh(fetched_at)
+            }
+
+    def get_stations(self, allow_stale: bool = False) -> Optional[List[Dict]]:
+        """Cached Stazioni rows, or None when missing or stale"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._stations_at and (allow_stale or self._is_fresh(self._stations_at)):
+                return list(self._stations)
+        return None
+
+    def is_complete(self) -> bool:
+        """True while a full inventory prefetch is within the TTL"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._is_fresh(self._complete_at)
+
+    def store_devices(self, devices: Dict[str, List[Dict]]):
+        """Add or update the devices of some markers"""
+        self._ensure_loaded()
+        devices = self._normalized(devices)
+        now = time.time()
+        with self._lock:
+            for key, (marker, devs) in devices.items():
+                self._devices[key] = (devs, now, marker)
+        self._persist_devices(devices, now, replace=False)
+
+    def replace(self, devices: Dict[str, List[Dict]], stations: List[Dict] = None):
+        """Replace the whole inventory with a full prefetch"""
+        self._ensure_loaded()
+        devices = self._normalized(devices)
+        now = time.time()
+        with self._lock:
+            self._devices = {key: (devs, now, marker) for key, (marker, devs) in devices.items()}
+            self._complete_at = now
+            if stations is not None:
+                self._stations = list(stations)
+                self._stations_at = now
+        self._persist_devices(devices, now, replace=True)
+        if stations is not None:
+            self._persist_stations(stations, now)
+
+    def invalidate(self, marker: str = None):
+        """Expire one marker, or the whole inventory when marker is None"""
+        self._ensure_loaded()
+        with self._lock:
+            if marker is None:
+                self._devices.clear()
+                self._stations = []
+                self._complete_at = self._stations_at = 0.0
+            else:
+                self._devices.pop(normalize_marker(marker), None)
+                self._complete_at = 0.0
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                if marker is None:
+                    conn.execute('DELETE FROM inventory_devices')
+                    conn.execute('DELETE FROM inventory_stations')
+                    conn.execute('DELETE FROM inventory_meta')
+                else:
+                    conn.execute('DELETE FROM inventory_devices WHERE marker = ? COLLATE NOCASE',
+                                 (marker.strip(),))
+                    conn.execute("DELETE FROM inventory_meta WHERE key = 'complete_at'")
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict:
+        """Number of cached markers and age of the last full prefetch"""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "markers": len(self._devices),
+                "stations": len(self._stations),
+                "complete": self._is_fresh(self._complete_at),
+                "age": round(time.time() - self._complete_at, 1) if self._complete_at else None
+            }
+
+    @staticmethod
+    def _normalized(devices: Dict[str, List[Dict]]) -> Dict[str, tuple]:
+        """{normalized marker: (marker, devices)}, keeping the first spelling of each marker"""
+        normalized = {}
+        for marker, devs in devices.items():
+            normalized.setdefault(normalize_marker(marker), (str(marker).strip(), devs))
+        return normalized
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return bool(fetched_at) and time.time() - fetched_at < self.ttl
+
+    def _ensure_loaded(self):
+        """Create the cache tables and load persisted entries on first use"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS inventory_devices (
+                            marker TEXT PRIMARY KEY,
+                            devices TEXT NOT NULL,
+                            fetched_at REAL NOT NULL
+                        )
+                    ''')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS inventory_stations (
+                            code TEXT,
+                            data TEXT NOT NULL
+                        )
+                    ''')
+                    conn.execute('''
+                        CREATE TABLE IF NOT EXISTS inventory_meta (
+                            key TEXT PRIMARY KEY,
+                            value REAL NOT NULL
+                        )
+                    ''')
+                    conn.commit()
+
+                    for marker, devices, fetched_at in conn.execute(
+                            'SELECT marker, devices, fetched_at FROM inventory_devices'):
+                        key = normalize_marker(marker)
+                        # Rows written before markers were normalized may differ only in case
+                        if key not in self._devices or self._devices[key][1] < fetched_at:
+                            self._devices[key] = (json.loads(devices), fetched_at, marker.strip())
+                    self._stations = [json.loads(data) for (data,) in
+                                      conn.execute('SELECT data FROM inventory_stations ORDER BY rowid')]
+                    meta = dict(conn.execute('SELECT key, value FROM inventory_meta'))
+                    self._complete_at = meta.get('complete_at', 0.0)
+                    self._stations_at = meta.get('stations_at', 0.0)
+            except (sqlite3.Error, OSError, ValueError) as e:
+                # Persistence is best effort - the in-memory cache still works
+                print(f"⚠️  Inventory cache persistence unavailable: {e}")
+            self._loaded = True
+
+    def _persist_devices(self, devices: Dict[str, tuple], fetched_at: float, replace: bool):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                if replace:
+                    conn.execute('DELETE FROM inventory_devices')
+                    conn.execute("INSERT OR REPLACE INTO inventory_meta VALUES ('complete_at', ?)",
+                                 (fetched_at,))
+                else:
+                    # Drop rows stored under another spelling of the same marker
+                    conn.executemany('DELETE FROM inventory_devices WHERE marker = ? COLLATE NOCASE',
+                                     ((marker,) for marker, _ in devices.values()))
+                conn.executemany(
+                    'INSERT OR REPLACE INTO inventory_devices (marker, devices, fetched_at) VALUES (?, ?, ?)',
+                    ((marker, json.dumps(devs), fetched_at) for marker, devs in devices.values())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not persist inventory cache: {e}")
+
+    def _persist_stations(self, stations: List[Dict], fetched_at: float):
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute('DELETE FROM inventory_stations')
+                conn.executemany(
+                    'INSERT INTO inventory_stations (code, data) VALUES (?, ?)',
+                    ((str(station.get("code")), json.dumps(station, default=str)) for station in stations)
+                )
+                conn.execute("INSERT OR REPLACE INTO inventory_meta VALUES ('stations_at', ?)",
+                             (fetched_at,))
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not persist inventory cache: {e}")
@@ -0,0 +1,221 @@
+"""
+NetPulse ODBC Connection Pool
+Reuses logged-in SQL Server connections across queries
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import pyodbc
+
+
+class _PooledODBCConnection:
+    """An idle pooled connection with the time it was last returned"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.last_used = time.monotonic()
+
+
+class ODBCConnectionPool:
+    """Thread-safe pool of pyodbc connections sharing one connection string"""
+
+    def __init__(self, conn_str: str, min_size: int = 1, max_size: int = 8,
+                 idle_timeout: float = 300, validate_after: float = 30,
+                 acquire_timeout: float = 30, warm: bool = True):
+        """
+        conn_str: ODBC connection string
+        min_size: idle connections kept open even past idle_timeout
+        max_size: maximum connections open at once; further checkouts wait
+        idle_timeout: seconds an idle connection above min_size is kept
+        validate_after: idle seconds after which a connection is validated on checkout
+        acquire_timeout: seconds to wait for a free connection before giving up
+        warm: open min_size connections in the background right away, so the
+        first queries don't pay the login cost
+        """
+        self.conn_str = conn_str
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[_PooledODBCConnection] = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        if warm and self.min_size:
+            threading.Thread(target=self.warm, daemon=True).start()
+
+    @property
+    def closed(self) -> bool:
+        """True once close_all() has been called"""
+        return self._closed
+
+    def warm(self) -> int:
+        """Open connections until min_size are open, returning how many were opened"""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._closed or self._open >= self.min_size:
+                    return opened
+                self._open += 1
+            try:
+                connection = pyodbc.connect(self.conn_str)
+            except Exception as e:
+                self._forget()
+                print(f"⚠️  Could not pre-open database connection: {e}")
+                return opened
+            self.release(connection)
+            opened += 1
+
+    def acquire(self):
+        """Check out a validated connection, opening a new one if none is idle"""
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                self._reap_idle()
+                while not self._closed and not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No database connection available within {self.acquire_timeout}s")
+                    self._cond.wait(remaining)
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                if self._idle:
+                    # Most recently used first - the one least likely to have gone stale
+                    pooled = self._idle.pop()
+                else:
+                    pooled = None
+                    self._open += 1
+
+            if pooled is None:
+                try:
+                    return pyodbc.connect(self.conn_str)
+                except Exception:
+                    self._forget()
+                    raise
+
+            if time.monotonic() - pooled.last_used < self.validate_after or self._is_healthy(pooled.connection):
+                return pooled.connection
+
+            # Server dropped it (restart, idle timeout, network blip) - try the next one
+            self._close_connection(pooled.connection)
+            self._forget()
+
+    def release(self, connection, broken: bool = False):
+        """Return a connection to the pool, closing it instead when broken"""
+        if not broken:
+            try:
+                # End any open read transaction so the connection is clean for the next user
+                connection.rollback()
+            except Exception:
+                broken = True
+
+        if broken:
+            self._close_connection(connection)
+            self._forget()
+            return
+
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                close = True
+            else:
+                self._idle.append(_PooledODBCConnection(connection))
+                close = False
+            self._cond.notify()
+        if close:
+            self._close_connection(connection)
+
+    @contextmanager
+    def connection(self):
+        """Context manager around acquire()/release(); errors discard the connection"""
+        con = self.acquire()
+        try:
+            yield con
+        except Exception:
+            self.release(con, broken=not self._is_healthy(con))
+            raise
+        else:
+            self.release(con)
+
+    def run(self, work: Callable[[Any], Any], retries: int = 1) -> Any:
+        """
+        Call work(connection) with a pooled connection and return its result.
+        When the connection turns out to be dead, work is retried on a fresh one.
+        Only use for read queries - a retried write could be applied twice.
+        """
+        attempt = 0
+        while True:
+            con = self.acquire()
+            try:
+                result = work(con)
+            except pyodbc.Error:
+                healthy = self._is_healthy(con)
+                self.release(con, broken=not healthy)
+                if healthy or attempt >= retries:
+                    raise
+                attempt += 1
+                continue
+            except Exception:
+                self.release(con, broken=not self._is_healthy(con))
+                raise
+            self.release(con)
+            return result
+
+    def close_all(self):
+        """Close every idle connection; checked-out ones are closed on release"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_connection(pooled.connection)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of open, idle and checked-out connections"""
+        with self._cond:
+            return {
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle)
+            }
+
+    def _forget(self):
+        """Account for a connection that was closed or never opened"""
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def _reap_idle(self):
+        """Close idle connections past idle_timeout, keeping min_size (caller holds the lock)"""
+        cutoff = time.monotonic() - self.idle_timeout
+        # Idle list is oldest first
+        while len(self._idle) > self.min_size and self._idle[0].last_used < cutoff:
+            pooled = self._idle.pop(0)
+            self._open -= 1
+            self._close_connection(pooled.connection)
+
+    def _is_healthy(self, connection) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close_connection(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,506 @@
+"""
+NetPulse Scheduler
+Runs the tasks of the scheduled_tasks table on interval, cron or one-off schedules
+"""
+
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .cron import CronSchedule, parse_interval
+    from ..core.config_manager import ConfigManager
+    from ..core.network_tools import NetworkTools
+    from ..core.timeseries import TimeSeriesStore
+except ImportError:
+    from netpulse.automation.cron import CronSchedule, parse_interval
+    from netpulse.core.config_manager import ConfigManager
+    from netpulse.core.network_tools import NetworkTools
+    from netpulse.core.timeseries import TimeSeriesStore
+
+# NetworkTools methods a task may run; any other command is a DeviceManager batch command
+NETWORK_COMMANDS = (
+    "ping", "traceroute", "nslookup", "port_scan", "network_discovery", "bandwidth_test",
+    "check_reachability", "calc_subnet_info", "calc_subnet_batch", "get_network_interfaces",
+)
+
+SCHEDULE_TYPES = ("interval", "cron", "once")
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _to_epoch(value: Optional[str]) -> Optional[float]:
+    """UTC 'YYYY-MM-DD HH:MM:SS' from the database as a timestamp"""
+    if not value:
+        return None
+    return datetime.strptime(str(value)[:19], TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _to_utc_text(epoch: Optional[float]) -> Optional[str]:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(TIME_FORMAT)
+
+
+class _ScheduledTask:
+    """One row of scheduled_tasks with its parsed schedule"""
+
+    def __init__(self, row: Dict):
+        self.id = row["id"]
+        self.row = dict(row)
+        self.schedule_type = row["schedule_type"]
+        self.interval = None
+        self.cron = None
+        self.at = None
+        if self.schedule_type == "interval":
+            self.interval = parse_interval(row["schedule_value"])
+        elif self.schedule_type == "cron":
+            self.cron = CronSchedule(row["schedule_value"])
+        elif self.schedule_type == "once":
+            # Given in local time, like cron expressions
+            self.at = datetime.strptime(row["schedule_value"].strip(), TIME_FORMAT).timestamp()
+        else:
+            raise ValueError(f"Unknown schedule type: {self.schedule_type}")
+        self.due = _to_epoch(row["next_run"])
+        self.running = False
+        # Definition changed in the database while a run was in progress
+        self.edited = False
+
+    def same_definition(self, row: Dict) -> bool:
+        """True when row only differs in its run bookkeeping"""
+        return all(self.row[key] == row[key] for key in
+                   ("name", "command", "parameters", "schedule_type", "schedule_value", "enabled"))
+
+    def next_after(self, now: float, previous_due: float = None) -> Optional[float]:
+        """
+        Next run time after now. Interval tasks keep their phase from previous_due,
+        skipping the slots they missed; one-off tasks have none after running.
+        """
+        if self.interval is not None:
+            if previous_due is None:
+                return now + self.interval
+            missed = max(0, int((now - previous_due) // self.interval))
+            return previous_due + (missed + 1) * self.interval
+        if self.cron is not None:
+            return self.cron.next_after(datetime.fromtimestamp(now)).timestamp()
+        return None
+
+
+class TaskScheduler:
+    """
+    Runs scheduled tasks from the database in a bounded worker pool.
+
+    Enabled tasks wait in a heap ordered by next run time; one thread sleeps until
+    the earliest is due and hands it to a worker once one is free, so a task never
+    overlaps itself. last_run/next_run are written back after every run. Runs missed
+    while the scheduler was down are caught up with a single run at start-up.
+    """
+
+    def __init__(self, config: ConfigManager = None, network_tools: NetworkTools = None,
+                 device_manager=None, max_workers: int = 4, refresh_interval: float = 30,
+                 catch_up: bool = True, record_history: bool = True,
+                 on_result: Optional[Callable[[Dict], None]] = None):
+        """
+        config: ConfigManager holding scheduled_tasks (created if omitted)
+        network_tools: NetworkTools whose time-series store runs share (created if omitted,
+                       recording into the config's data/timeseries)
+        device_manager: DeviceManager for device commands (created on first use if omitted)
+        max_workers: tasks run at once
+        refresh_interval: seconds between re-reading the task table for changes
+        catch_up: run once at start-up for tasks whose next run passed while stopped
+        record_history: add each run to the command history
+        on_result(record) is called from the worker thread after every run.
+        """
+        self.config = config or ConfigManager()
+        self.network_tools = network_tools or NetworkTools(
+            timeseries=TimeSeriesStore(os.path.join(self.config.data_dir, 'timeseries')))
+        self.device_manager = device_manager
+        self.max_workers = max(1, int(max_workers))
+        self.refresh_interval = refresh_interval
+        self.catch_up = catch_up
+        self.record_history = record_history
+        self.on_result = on_result
+
+        self._tasks: Dict[int, _ScheduledTask] = {}
+        self._schedule: List[Tuple[float, int, int]] = []
+        self._sequence = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._manager_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._loaded_at = 0.0
+
+    def add_task(self, name: str, command: str, parameters="", schedule_type: str = "interval",
+                 schedule_value: str = "1h", enabled: bool = True) -> int:
+        """
+        Validate and store a new task; returns its id.
+        command: one of NETWORK_COMMANDS or a DeviceManager batch command
+        parameters: a JSON object of keyword arguments (device commands take "marker",
+                    or "markers"/"pattern" for many), a JSON list of arguments, or one plain argument
+        schedule_type / schedule_value: "interval" with "30s"/"5m"/"1h30m"..., "cron" with a
+                    five-field expression, or "once" with a local 'YYYY-MM-DD HH:MM:SS'
+        """
+        if not isinstance(parameters, str):
+            parameters = json.dumps(parameters)
+        self._resolve(command, parameters)
+        if schedule_type not in SCHEDULE_TYPES:
+            raise ValueError(f"Unknown schedule type: {schedule_type}")
+        row = {"id": None, "name": name, "command": command, "parameters": parameters,
+               "schedule_type": schedule_type, "schedule_value": str(schedule_value),
+               "enabled": enabled, "last_run": None, "next_run": None}
+        task = _ScheduledTask(row)
+
+        now = time.time()
+        if task.at is not None and task.at < now:
+            raise ValueError(f"Run time of one-off task '{name}' has already passed")
+        next_run = self._first_run(task, now)
+        task_id = self.config.add_scheduled_task(name, command, parameters, schedule_type,
+                                                 str(schedule_value), enabled, _to_utc_text(next_run))
+        self.reload()
+        return task_id
+
+    def remove_task(self, task_id: int):
+        """Delete a task (a run in progress finishes)"""
+        self.config.remove_scheduled_task(task_id)
+        self.reload()
+
+    def set_enabled(self, task_id: int, enabled: bool):
+        self.config.update_scheduled_task(task_id, enabled=enabled)
+        self.reload()
+
+    def start(self):
+        """Load the tasks and start scheduling in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="netpulse-task")
+        self.reload()
+        self._thread = threading.Thread(target=self._run, name="netpulse-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """Stop scheduling and wait for running tasks to finish"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def reload(self) -> Dict[str, int]:
+        """
+        Pick up tasks added, changed or removed in the database.
+        A task first seen with its next run in the past (missed while stopped) runs once
+        right away, or skips to its next slot when catch_up is off. Edited tasks are
+        scheduled afresh; one edited while running is rescheduled once the run ends.
+        """
+        now = time.time()
+        rows = {row["id"]: row for row in self.config.get_scheduled_tasks()}
+        updates = {}
+        added = removed = 0
+
+        with self._lock:
+            for task_id in set(self._tasks) - set(rows):
+                del self._tasks[task_id]
+                removed += 1
+
+            for task_id, row in rows.items():
+                current = self._tasks.get(task_id)
+                if current and current.same_definition(row):
+                    continue
+                if current and current.running:
+                    # Rescheduled by the reload that follows the run
+                    current.edited = True
+                    continue
+                try:
+                    task = _ScheduledTask(row)
+                except ValueError as e:
+                    print(f"⚠️  Skipping scheduled task {task_id} ({row['name']}): {e}")
+                    self._tasks.pop(task_id, None)
+                    continue
+
+                self._tasks[task_id] = task
+                if current is None:
+                    added += 1
+                if not row["enabled"]:
+                    continue
+
+                if current is not None and current.edited and task.interval is not None:
+                    # Edited during the run that just finished: wait a full new interval
+                    due = now + task.interval
+                elif current is not None or task.due is None:
+                    due = self._first_run(task, now)
+                elif task.due < now and not self.catch_up:
+                    due = task.next_after(now, task.due)
+                else:
+                    due = task.due
+                if due is None:
+                    # One-off task whose time is gone
+                    task.row.update(enabled=False, next_run=None)
+                    updates[task_id] = {"enabled": False, "next_run": None}
+                    continue
+                if due != task.due:
+                    updates[task_id] = {"next_run": _to_utc_text(due)}
+                self._push(task, due)
+            self._loaded_at = time.monotonic()
+
+        for task_id, fields in updates.items():
+            self.config.update_scheduled_task(task_id, **fields)
+        self._wake.set()
+        return {"tasks": len(rows), "added": added, "removed": removed}
+
+    def run_task(self, task_id: int) -> Dict:
+        """Run a task now in the calling thread, without changing its schedule"""
+        rows = {row["id"]: row for row in self.config.get_scheduled_tasks()}
+        if task_id not in rows:
+            return {"success": False, "error": f"No scheduled task {task_id}"}
+        return self._execute(rows[task_id])
+
+    def tasks(self) -> List[Dict]:
+        """Tasks with their next run (UTC) and whether they are running"""
+        with self._lock:
+            return [
+                {**task.row, "next_run": _to_utc_text(task.due) if task.row["enabled"] else None,
+                 "running": task.running}
+                for task in sorted(self._tasks.values(), key=lambda t: (t.due is None, t.due or 0))
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            next_due = self._next_due()
+            return {
+                "tasks": len(self._tasks),
+                "enabled": sum(1 for task in self._tasks.values() if task.row["enabled"]),
+                "running": self._active,
+                "next_run_in": round(max(0.0, next_due - time.time()), 1) if next_due is not None else None,
+                "active": self.is_running()
+            }
+
+    def _run(self):
+        """Scheduler loop: hand due tasks to free workers, then sleep until the next one"""
+        while not self._stop.is_set():
+            if time.monotonic() - self._loaded_at >= self.refresh_interval:
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️  Could not reload scheduled tasks: {e}")
+
+            self._wake.clear()
+            with self._lock:
+                now = time.time()
+                while self._schedule and self._active < self.max_workers:
+                    due, _, task_id = self._schedule[0]
+                    if due > now:
+                        break
+                    heapq.heappop(self._schedule)
+                    task = self._tasks.get(task_id)
+                    # Removed, disabled or rescheduled tasks leave stale heap entries behind
+                    if task is None or task.running or task.due != due or not task.row["enabled"]:
+                        continue
+                    task.running = True
+                    self._active += 1
+                    self._executor.submit(self._run_task, task, due)
+                next_due = self._next_due() if self._active < self.max_workers else None
+
+            wait = self.refresh_interval
+            if next_due is not None:
+                wait = min(wait, max(0.0, next_due - time.time()))
+            # Woken early by finished runs and reloads
+            self._wake.wait(wait)
+
+    def _run_task(self, task: _ScheduledTask, due: float):
+        started = time.time()
+        try:
+            self._execute(task.row)
+        finally:
+            self._finish(task, due, started)
+
+    def _finish(self, task: _ScheduledTask, due: float, started: float):
+        """Save last_run/next_run of a finished run and schedule the next one"""
+        next_due = task.next_after(time.time(), due)
+        fields = {"last_run": _to_utc_text(started), "next_run": _to_utc_text(next_due)}
+        if next_due is None:
+            # One-off task done
+            fields["enabled"] = False
+        try:
+            self.config.update_scheduled_task(task.id, **fields)
+        except Exception as e:
+            print(f"⚠️  Could not save scheduled task {task.id}: {e}")
+
+        # The task counts as running until here, so a concurrent reload can't reschedule it twice
+        with self._lock:
+            self._active -= 1
+            task.running = False
+            task.row.update(fields)
+            current = self._tasks.get(task.id) is task
+            if current and not task.edited and next_due is not None:
+                self._push(task, next_due)
+        if current and task.edited:
+            self.reload()
+        self._wake.set()
+
+    def _execute(self, row: Dict) -> Dict:
+        """Run one task and record the outcome; returns {"task_id", "name", "command", "success", "result"}"""
+        start = time.time()
+        try:
+            call = self._resolve(row["command"], row["parameters"])
+            result = call()
+            if not isinstance(result, dict):
+                result = {"result": result, "success": True}
+        except Exception as e:
+            result = {"error": str(e), "success": False}
+        execution_time = time.time() - start
+        success = bool(result.get("success", "error" not in result))
+
+        icon = "✓" if success else "✗"
+        print(f"{icon} Scheduled task {row['id']} ({row['name']}): {row['command']} "
+              f"in {execution_time:.2f}s" + ("" if success else f" - {result.get('error')}"))
+
+        if self.record_history:
+            self.config.add_to_history(row["command"], row["parameters"] or "", execution_time,
+                                       success, self.network_tools.format_output(result), result=result)
+
+        record = {"task_id": row["id"], "name": row["name"], "command": row["command"],
+                  "success": success, "execution_time": round(execution_time, 2), "result": result}
+        if self.on_result:
+            try:
+                self.on_result(record)
+            except Exception as e:
+                print(f"⚠️  Scheduled task callback failed: {e}")
+        return record
+
+    def _resolve(self, command: str, parameters: str) -> Callable[[], Dict]:
+        """Check a command and its parameters; returns the call that runs it"""
+        args, kwargs = self._parse_parameters(parameters)
+
+        if command in NETWORK_COMMANDS:
+            def run_network():
+                # A NetworkTools per run: ping keeps per-instance process state
+                tools = NetworkTools(timeseries=self.network_tools.timeseries)
+                return getattr(tools, command)(*args, **kwargs)
+            return run_network
+
+        try:
+            from .batch import BATCH_COMMANDS, BatchRunner
+        except ImportError as e:
+            raise ValueError(f"Unknown command '{command}' (device commands unavailable: {e})")
+        if command not in BATCH_COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+
+        if len(args) > 1:
+            raise ValueError(f"{command} takes one marker argument; "
+                             f"pass a JSON object with \"markers\" for several")
+        markers = kwargs.pop("markers", None)
+        pattern = kwargs.pop("pattern", None)
+        marker = kwargs.pop("marker", args[0] if args else None)
+        unknown = set(kwargs) - set(BATCH_COMMANDS[command])
+        if unknown:
+            raise ValueError(f"Unsupported arguments for {command}: {', '.join(sorted(unknown))}")
+        if not marker and not markers and not pattern:
+            raise ValueError(f"{command} needs a marker, markers or pattern")
+
+        def run_device():
+            manager = self._device_manager()
+            if marker and not markers and not pattern:
+                return getattr(manager, command)(marker, **kwargs)
+            return BatchRunner(manager).run(command, markers=markers or ([marker] if marker else None),
+                                            pattern=pattern, command_args=kwargs)
+        return run_device
+
+    def _device_manager(self):
+        with self._manager_lock:
+            if self.device_manager is None:
+                from .device_manager import DeviceManager
+                self.device_manager = DeviceManager()
+            return self.device_manager
+
+    @staticmethod
+    def _parse_parameters(parameters: str) -> Tuple[list, dict]:
+        """JSON object -> keyword arguments, JSON list -> arguments, anything else -> one argument"""
+        if parameters is None or not str(parameters).strip():
+            return [], {}
+        try:
+            value = json.loads(parameters)
+        except (TypeError, ValueError):
+            return [str(parameters).strip()], {}
+        if isinstance(value, dict):
+            return [], dict(value)
+        if isinstance(value, list):
+            return list(value), {}
+        return [value], {}
+
+    def _first_run(self, task: _ScheduledTask, now: float) -> Optional[float]:
+        """Run time of a task that has none yet: interval tasks start right away"""
+        if task.interval is not None:
+            return now
+        if task.at is not None:
+            return task.at if task.at >= now or self.catch_up else None
+        return task.next_after(now)
+
+    def _push(self, task: _ScheduledTask, due: float):
+        """Schedule a task (caller holds the lock)"""
+        task.due = due
+        self._sequence += 1
+        heapq.heappush(self._schedule, (due, self._sequence, task.id))
+
+    def _next_due(self) -> Optional[float]:
+        """Earliest live heap entry (caller holds the lock)"""
+        while self._schedule:
+            due, _, task_id = self._schedule[0]
+            task = self._tasks.get(task_id)
+            if task is not None and not task.running and task.due == due and task.row["enabled"]:
+                return due
+            heapq.heappop(self._schedule)
+        return None
+
+
+def main():
+    """Run the scheduler in the foreground"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NetPulse Scheduler")
+    parser.add_argument("--workers", type=int, default=4, help="Tasks run at once")
+    parser.add_argument("--no-catch-up", action="store_true",
+                        help="Skip runs missed while the scheduler was stopped")
+    parser.add_argument("--list", action="store_true", help="List scheduled tasks and exit")
+
+    args = parser.parse_args()
+
+    scheduler = TaskScheduler(max_workers=args.workers, catch_up=not args.no_catch_up)
+    if args.list:
+        for task in scheduler.config.get_scheduled_tasks():
+            state = "enabled" if task["enabled"] else "disabled"
+            print(f"{task['id']:>4}  {task['name']}  {task['command']} {task['parameters']}  "
+                  f"[{task['schedule_type']} {task['schedule_value']}]  {state}  next: {task['next_run']} UTC")
+        return
+
+    scheduler.start()
+    print(f"✓ Scheduler running {scheduler.stats()['enabled']} task(s)", flush=True)
+    try:
+        while scheduler.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping scheduler...", file=sys.stderr)
+    finally:
+        scheduler.stop()
+        scheduler.config.close()
+        if scheduler.device_manager is not None:
+            scheduler.device_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+NetPulse SSH Connection Pool
+Reuses authenticated SSH transports across commands
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import paramiko
+
+
+class _PooledConnection:
+    """A pooled client with its last-use time and number of active users"""
+
+    def __init__(self, client: paramiko.SSHClient):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.active = 0
+        # Out of the pool, closed when the last user checks it in
+        self.retired = False
+
+
+class SSHConnectionPool:
+    """Pool of authenticated SSH clients keyed by (host, username)"""
+
+    def __init__(self, credentials: Dict, idle_timeout: float = 300,
+                 keepalive_interval: int = 30):
+        """
+        credentials: SSH credentials as returned by CredentialManager.get_ssh_credentials()
+        idle_timeout: seconds an unused connection is kept before it is closed
+        keepalive_interval: seconds between transport keepalive packets
+        """
+        self.credentials = credentials
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+
+        self._connections: Dict[Tuple[str, str], _PooledConnection] = {}
+        # id(client) -> connection, for pooled and retired connections not yet closed
+        self._leased: Dict[int, _PooledConnection] = {}
+        # key -> [handshake lock, threads holding or waiting for it]; dropped when unused
+        self._key_locks: Dict[Tuple[str, str], List] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def acquire(self, host: str, timeout: int = 10) -> paramiko.SSHClient:
+        """
+        Return a healthy authenticated client for host, connecting only if needed.
+        Every acquire() must be paired with release(host, client) so idle eviction
+        can tell the connection is in use.
+        """
+        return self._checkout(host, timeout).client
+
+    def release(self, host: str, client: Optional[paramiko.SSHClient] = None):
+        """Mark one use of client (default: the pooled connection for host) as finished"""
+        with self._lock:
+            if client is not None:
+                conn = self._leased.get(id(client))
+            else:
+                conn = self._connections.get(self._key(host))
+        if conn:
+            self._checkin(conn)
+
+    def discard(self, host: str):
+        """Drop the pooled connection for host; it is closed once its last user releases it"""
+        with self._lock:
+            conn = self._connections.get(self._key(host))
+        if conn:
+            self._retire(self._key(host), conn)
+
+    def exec_command(self, host: str, command: str, timeout: int = 10) -> Tuple[str, str]:
+        """Run command on host over a pooled connection, returning (stdout, stderr)"""
+        key = self._key(host)
+        conn = self._checkout(host, timeout)
+        try:
+            try:
+                stdin, stdout, stderr = conn.client.exec_command(command, timeout=timeout)
+            except (paramiko.SSHException, EOFError, OSError):
+                # Transport went stale (device rebooted, NAT entry expired) - reconnect once.
+                # Only opening the channel is retried, so a command never runs twice.
+                self._retire(key, conn)
+                self._checkin(conn)
+                # Cleared first so a failed reconnect isn't checked in twice
+                conn = None
+                conn = self._checkout(host, timeout)
+                stdin, stdout, stderr = conn.client.exec_command(command, timeout=timeout)
+
+            try:
+                output = stdout.read().decode().strip()
+                error = stderr.read().decode().strip()
+            finally:
+                stdout.channel.close()
+            return output, error
+        except Exception:
+            # A slow command isn't a broken connection - only drop it if the transport died
+            if conn and not self._is_healthy(conn.client):
+                self._retire(key, conn)
+            raise
+        finally:
+            if conn:
+                self._checkin(conn)
+
+    def close_all(self):
+        """Close every pooled connection and stop the idle reaper"""
+        self._closed.set()
+        with self._lock:
+            connections = list(self._leased.values())
+            self._connections.clear()
+            self._leased.clear()
+            self._reaper = None
+        for conn in connections:
+            self._close_client(conn.client)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of pooled and currently used connections"""
+        with self._lock:
+            return {
+                "connections": len(self._connections),
+                "active": sum(1 for conn in self._connections.values() if conn.active)
+            }
+
+    def _checkout(self, host: str, timeout: int) -> _PooledConnection:
+        """Lease the pooled connection for host, connecting only if needed"""
+        key = self._key(host)
+
+        # One handshake per key even when several threads ask at once
+        with self._key_lock(key):
+            with self._lock:
+                conn = self._connections.get(key)
+                if conn and self._is_healthy(conn.client):
+                    conn.active += 1
+                    conn.last_used = time.monotonic()
+                    return conn
+
+            if conn:
+                self._retire(key, conn)
+
+            client = self._connect(host, timeout)
+            conn = _PooledConnection(client)
+            conn.active = 1
+            with self._lock:
+                self._connections[key] = conn
+                self._leased[id(client)] = conn
+
+        self._start_reaper()
+        return conn
+
+    def _checkin(self, conn: _PooledConnection):
+        """End one lease of conn, closing it if it was retired and this was the last user"""
+        with self._lock:
+            conn.active = max(0, conn.active - 1)
+            conn.last_used = time.monotonic()
+            close = conn.retired and not conn.active
+            if close:
+                self._leased.pop(id(conn.client), None)
+        if close:
+            self._close_client(conn.client)
+
+    def _retire(self, key: Tuple[str, str], conn: _PooledConnection):
+        """
+        Take conn out of the pool if it is still the pooled connection for key.
+        Threads still using it keep it open until they check it back in.
+        """
+        with self._lock:
+            if self._connections.get(key) is conn:
+                del self._connections[key]
+            conn.retired = True
+            close = not conn.active
+            if close:
+                self._leased.pop(id(conn.client), None)
+        if close:
+            self._close_client(conn.client)
+
+    def _key(self, host: str) -> Tuple[str, str]:
+        return (host, self.credentials.get('username', ''))
+
+    @contextmanager
+    def _key_lock(self, key: Tuple[str, str]):
+        """Hold the handshake lock for key; the entry is removed once no thread needs it"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def _connect(self, host: str, timeout: int) -> paramiko.SSHClient:
+        """Open and authenticate a new client with the stored credentials"""
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+        if self.credentials.get('key_file'):
+            # Use key file authentication
+            ssh.connect(
+                host,
+                username=self.credentials['username'],
+                key_filename=self.credentials['key_file'],
+                timeout=timeout
+            )
+        else:
+            # Use password authentication with faster timeout
+            ssh.connect(
+                host,
+                username=self.credentials['username'],
+                password=self.credentials['password'],
+                timeout=5,  # Faster connection timeout
+                banner_timeout=5,  # Faster banner timeout
+                auth_timeout=5  # Faster auth timeout
+            )
+
+        transport = ssh.get_transport()
+        if transport and self.keepalive_interval:
+            transport.set_keepalive(self.keepalive_interval)
+        return ssh
+
+    def _is_healthy(self, client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return bool(transport and transport.is_active() and transport.is_authenticated())
+
+    def _close_client(self, client: paramiko.SSHClient):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def _start_reaper(self):
+        """Start the background thread that closes idle connections"""
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._closed.clear()
+            self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+            self._reaper.start()
+
+    def _reap_idle(self):
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._closed.wait(interval):
+            cutoff = time.monotonic() - self.idle_timeout
+            with self._lock:
+                idle = [key for key, conn in self._connections.items()
+                        if not conn.active and conn.last_used < cutoff]
+                evicted = [self._connections.pop(key) for key in idle]
+                for conn in evicted:
+                    self._leased.pop(id(conn.client), None)
+                finished = not self._connections
+                if finished:
+                    self._reaper = None
+            for conn in evicted:
+                self._close_client(conn.client)
+            if finished:
+                return
@@ -1,13 +1,46 @@
 import os
 import json
 import sqlite3
-from datetime import datetime
+import queue
+import time
+import atexit
+import zlib
+from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional
 import threading
 
+from .result_rows import result_summary, result_items, pack_payload, unpack_payload
+
 class ConfigManager:
     """Centralized configuration and data management"""
     
+    # Rows per history INSERT transaction; retention is enforced every HISTORY_BATCH
+    # rows written or HISTORY_TRIM_INTERVAL seconds, whichever comes first
+    HISTORY_BATCH = 500
+    HISTORY_TRIM_INTERVAL = 60
+    
+    # Outputs of at least this many bytes are zlib-compressed into command_history_output
+    OUTPUT_COMPRESS_THRESHOLD = 4096
+    OUTPUT_COMPRESS_LEVEL = 6
+    
+    # Longest a read waits for queued history rows before answering without them
+    READ_FLUSH_TIMEOUT = 2.0
+    
+    # History columns for list views (output is loaded on demand), and the full row with its blob
+    HISTORY_LIST_COLUMNS = ('id, command, parameters, timestamp, execution_time, success, '
+                            'COALESCE((SELECT size FROM command_history_output '
+                            'WHERE history_id = command_history.id), '
+                            'length(CAST(output AS BLOB))) AS output_size')
+    HISTORY_WITH_OUTPUT = '''
+        SELECT h.*, o.codec AS output_codec, o.data AS output_data
+        FROM command_history h
+        LEFT JOIN command_history_output o ON o.history_id = h.id
+    '''
+    
+    # Columns of scheduled_tasks that update_scheduled_task() may change
+    SCHEDULED_TASK_FIELDS = ('name', 'command', 'parameters', 'schedule_type', 'schedule_value',
+                             'enabled', 'last_run', 'next_run')
+    
     def __init__(self, app_dir: str = None):
         self.app_dir = app_dir or os.path.dirname(os.path.abspath(__file__))
         self.config_dir = os.path.join(self.app_dir, 'config')
@@ -16,6 +49,17 @@ class ConfigManager:
         self.config_file = os.path.join(self.config_dir, 'settings.json')
         self.lock = threading.Lock()
         
+        # One SQLite connection per thread; history rows go through a background writer
+        self._local = threading.local()
+        self._connections = []  # (thread, connection); closed once the thread has exited
+        self._connections_lock = threading.Lock()
+        self._history_queue = queue.Queue()
+        self._history_writer = None
+        self._writer_lock = threading.Lock()
+        self._exit_flush = False
+        self._last_trim = 0.0
+        self._since_trim = 0
+        
         # Ensure directories exist
         os.makedirs(self.config_dir, exist_ok=True)
         os.makedirs(self.data_dir, exist_ok=True)
@@ -26,9 +70,35 @@ class ConfigManager:
         # Load default settings
         self.settings = self._load_settings()
     
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (WAL mode, so readers never wait for the history writer)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self._close_dead_connections()
+            # Only this thread uses it; another thread closes it once this one has exited
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append((threading.current_thread(), conn))
+        return conn
+    
+    def _close_dead_connections(self):
+        """Close the connections of threads that have exited"""
+        with self._connections_lock:
+            dead = [entry for entry in self._connections if not entry[0].is_alive()]
+            self._connections = [entry for entry in self._connections if entry[0].is_alive()]
+        for _, conn in dead:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+    
     def _init_database(self):
         """Initialize SQLite database for history and favorites"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS command_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -79,7 +149,133 @@ class ConfigManager:
                 )
             ''')
             
-            conn.commit()
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_scheduled_tasks_next_run
+                ON scheduled_tasks (enabled, next_run)
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_command_history_timestamp
+                ON command_history (timestamp)
+            ''')
+            
+            # Large outputs, compressed; command_history.output is NULL for these rows
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS command_history_output (
+                    history_id INTEGER PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    data BLOB NOT NULL
+                )
+            ''')
+            
+            # Structured results: typed columns per run and one row per open port, host or record
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS command_results (
+                    history_id INTEGER PRIMARY KEY,
+                    command TEXT NOT NULL,
+                    host TEXT,
+                    success BOOLEAN,
+                    latency_ms REAL,
+                    loss_percent REAL,
+                    timestamp DATETIME NOT NULL,
+                    payload BLOB
+                )
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_command_results_host
+                ON command_results (host, timestamp)
+            ''')
+            
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS result_items (
+                    history_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    host TEXT,
+                    port INTEGER,
+                    name TEXT,
+                    latency_ms REAL,
+                    timestamp DATETIME NOT NULL
+                )
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_result_items_history
+                ON result_items (history_id)
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_result_items_host
+                ON result_items (kind, host, timestamp)
+            ''')
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_result_items_port
+                ON result_items (kind, port, timestamp)
+            ''')
+            
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS command_results_delete
+                AFTER DELETE ON command_history BEGIN
+                    DELETE FROM command_results WHERE history_id = old.id;
+                    DELETE FROM result_items WHERE history_id = old.id;
+                END
+            ''')
+            
+            conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS command_history_output_delete
+                AFTER DELETE ON command_history BEGIN
+                    DELETE FROM command_history_output WHERE history_id = old.id;
+                END
+            ''')
+        
+        self.fts_enabled = self._init_history_search()
+    
+    def _init_history_search(self) -> bool:
+        """
+        FTS5 index over command, parameters and output. The history writer maintains it,
+        since compressed outputs are not readable from SQL.
+        Returns False when this SQLite build has no FTS5 (search falls back to LIKE).
+        """
+        conn = self._connection()
+        try:
+            with conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'command_history_fts'").fetchone()
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS command_history_fts USING fts5(
+                        command, parameters, output,
+                        content='command_history', content_rowid='id'
+                    )
+                ''')
+                # Earlier versions kept the index in sync with triggers
+                for trigger in ('insert', 'delete', 'update'):
+                    conn.execute(f'DROP TRIGGER IF EXISTS command_history_fts_{trigger}')
+                if not exists:
+                    # Index the rows written before the search table existed
+                    for row in conn.execute(self.HISTORY_WITH_OUTPUT):
+                        entry = self._history_entry(row)
+                        self._index_history(conn, entry['id'], entry['command'],
+                                            entry['parameters'], entry['output'])
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  Full-text history search unavailable: {e}")
+            return False
+    
+    def _index_history(self, conn: sqlite3.Connection, entry_id: int, command: str,
+                       parameters: str, output: str, delete: bool = False):
+        """Add one entry to the search index, or remove it (FTS5 needs the indexed text back)"""
+        if delete:
+            conn.execute('''
+                INSERT INTO command_history_fts (command_history_fts, rowid, command, parameters, output)
+                VALUES ('delete', ?, ?, ?, ?)
+            ''', (entry_id, command, parameters, output))
+        else:
+            conn.execute('''
+                INSERT INTO command_history_fts (rowid, command, parameters, output)
+                VALUES (?, ?, ?, ?)
+            ''', (entry_id, command, parameters, output))
     
     def _load_settings(self) -> Dict[str, Any]:
         """Load application settings"""
@@ -154,115 +350,522 @@ class ConfigManager:
         self.save_settings()
     
     def add_to_history(self, command: str, parameters: str, execution_time: float = 0, 
-                      success: bool = True, output: str = "") -> int:
-        """Add command to history"""
+                      success: bool = True, output: str = "", result: Dict = None) -> int:
+        """
+        Add command to history
+        Rows are written in batches by a background writer, so the new row's id is not
+        known yet: returns -1 when history is disabled, 0 when the row was queued.
+        flush_history() waits for queued rows; get_history() then lists it first.
+        result: the raw NetworkTools result, stored as structured rows for query_results()
+        """
         if not self.get_setting('auto_save_history', True):
             return -1
+        
+        # Same format and clock (UTC) as the column's CURRENT_TIMESTAMP default
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self._history_queue.put((command, parameters, timestamp, execution_time, success, output, result))
+        self._ensure_history_writer()
+        return 0
+    
+    def flush_history(self, timeout: float = None) -> bool:
+        """
+        Wait until every queued history row is written, or at most timeout seconds.
+        Returns False when rows were still queued at the timeout.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if self._history_writer and self._history_writer.is_alive():
+            done = self._history_queue.all_tasks_done
+            with done:
+                while self._history_queue.unfinished_tasks:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    done.wait(remaining)
+            return True
+        while not self._history_queue.empty():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._write_history_batch()
+        return True
+    
+    def close(self):
+        """Write queued history and close this thread's connection and those of exited threads"""
+        self.flush_history()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with self._connections_lock:
+                self._connections = [entry for entry in self._connections if entry[1] is not conn]
+            conn.close()
+            self._local.conn = None
+        self._close_dead_connections()
+    
+    def _ensure_history_writer(self):
+        """Start the background history writer on first use"""
+        if self._history_writer and self._history_writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._history_writer and self._history_writer.is_alive():
+                return
+            self._history_writer = threading.Thread(target=self._run_history_writer,
+                                                    name="netpulse-history-writer", daemon=True)
+            self._history_writer.start()
+            # Once per manager, however often the writer is restarted
+            if not self._exit_flush:
+                atexit.register(self.flush_history)
+                self._exit_flush = True
+    
+    def _run_history_writer(self):
+        while True:
+            try:
+                self._write_history_batch(block=True)
+            except Exception as e:
+                # The writer must outlive any one bad batch, or every later row would wait forever
+                print(f"⚠️  History writer error: {e}")
+    
+    def _write_history_batch(self, block: bool = False):
+        """
+        Insert up to HISTORY_BATCH queued rows in one transaction, trimming old rows now and then.
+        When the batch fails it is retried row by row, so only the rows that fail are lost.
+        """
+        rows = []
+        try:
+            if block:
+                rows.append(self._history_queue.get())
+            while len(rows) < self.HISTORY_BATCH:
+                rows.append(self._history_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not rows:
+            return
+        
+        try:
+            # Compress and extract result rows before taking the write lock
+            prepared = [entry for entry in map(self._prepare_history_row, rows) if entry]
+            try:
+                with self._connection() as conn:
+                    for entry in prepared:
+                        self._insert_history_row(conn, *entry)
+            except Exception as e:
+                print(f"⚠️  Could not save {len(prepared)} history rows at once, retrying one by one: {e}")
+                for entry in prepared:
+                    try:
+                        with self._connection() as conn:
+                            self._insert_history_row(conn, *entry)
+                    except Exception as e:
+                        print(f"⚠️  Could not save command history ({entry[0][0]}): {e}")
             
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                INSERT INTO command_history 
-                (command, parameters, execution_time, success, output)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (command, parameters, execution_time, success, output))
-            
-            # Cleanup old entries
-            max_entries = self.get_setting('max_history_entries', 1000)
+            self._since_trim += len(rows)
+            if (self._since_trim >= self.HISTORY_BATCH
+                    or time.monotonic() - self._last_trim >= self.HISTORY_TRIM_INTERVAL):
+                with self._connection() as conn:
+                    self._trim_history(conn)
+        except Exception as e:
+            print(f"⚠️  Could not trim command history: {e}")
+        finally:
+            for _ in rows:
+                self._history_queue.task_done()
+    
+    def _prepare_history_row(self, row: tuple) -> Optional[tuple]:
+        """(row, packed output, structured result) for one queued row, or None if it cannot be stored"""
+        try:
+            return row, self._pack_output(row[5]), self._structure_result(row[6])
+        except Exception as e:
+            print(f"⚠️  Could not save command history ({row[0]}): {e}")
+            return None
+    
+    def _insert_history_row(self, conn: sqlite3.Connection, row: tuple, packed: tuple,
+                            structure: Optional[tuple]):
+        command, parameters, timestamp, execution_time, success, output, _ = row
+        stored, blob = packed
+        cursor = conn.execute('''
+            INSERT INTO command_history
+            (command, parameters, timestamp, execution_time, success, output)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (command, parameters, timestamp, execution_time, success, stored))
+        if blob:
             conn.execute('''
-                DELETE FROM command_history 
-                WHERE id NOT IN (
-                    SELECT id FROM command_history 
-                    ORDER BY timestamp DESC 
+                INSERT INTO command_history_output (history_id, codec, size, data)
+                VALUES (?, ?, ?, ?)
+            ''', (cursor.lastrowid,) + blob)
+        if self.fts_enabled:
+            self._index_history(conn, cursor.lastrowid, command, parameters, output)
+        if structure:
+            self._store_result(conn, cursor.lastrowid, command, timestamp, *structure)
+    
+    def _trim_history(self, conn: sqlite3.Connection):
+        """Keep the newest max_history_entries rows (ids grow with insertion order)"""
+        max_entries = self.get_setting('max_history_entries', 1000)
+        cutoff = conn.execute('''
+            SELECT id FROM command_history
+            ORDER BY id DESC
+            LIMIT 1 OFFSET ?
+        ''', (max_entries,)).fetchone()
+        if cutoff:
+            if self.fts_enabled:
+                for row in conn.execute(self.HISTORY_WITH_OUTPUT + ' WHERE h.id <= ?', (cutoff[0],)):
+                    entry = self._history_entry(row)
+                    self._index_history(conn, entry['id'], entry['command'], entry['parameters'],
+                                        entry['output'], delete=True)
+            conn.execute('DELETE FROM command_history WHERE id <= ?', (cutoff[0],))
+        self._last_trim = time.monotonic()
+        self._since_trim = 0
+    
+    def _pack_output(self, output: str) -> tuple:
+        """
+        Split an output into (text for the output column, blob row or None).
+        Outputs under OUTPUT_COMPRESS_THRESHOLD bytes, or that do not compress, stay as text.
+        """
+        if not output:
+            return output, None
+        raw = output.encode('utf-8')
+        if len(raw) < self.OUTPUT_COMPRESS_THRESHOLD:
+            return output, None
+        data = zlib.compress(raw, self.OUTPUT_COMPRESS_LEVEL)
+        if len(data) >= len(raw) * 0.9:
+            return output, None
+        return None, ('zlib', len(raw), data)
+    
+    @staticmethod
+    def _structure_result(result: Dict) -> Optional[tuple]:
+        """(summary, items, payload) of a result, or None when there is nothing to store"""
+        if not isinstance(result, dict):
+            return None
+        try:
+            return result_summary(result), result_items(result), pack_payload(result)
+        except (TypeError, ValueError, KeyError) as e:
+            print(f"⚠️  Could not store structured result: {e}")
+            return None
+    
+    @staticmethod
+    def _store_result(conn: sqlite3.Connection, entry_id: int, command: str, timestamp: str,
+                      summary: Dict, items: List[tuple], payload: bytes):
+        conn.execute('''
+            INSERT INTO command_results
+            (history_id, command, host, success, latency_ms, loss_percent, timestamp, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (entry_id, command, summary['host'], summary['success'], summary['latency_ms'],
+              summary['loss_percent'], timestamp, payload))
+        conn.executemany('''
+            INSERT INTO result_items (history_id, kind, host, port, name, latency_ms, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((entry_id,) + item + (timestamp,) for item in items))
+    
+    @staticmethod
+    def _history_entry(row: sqlite3.Row) -> Dict:
+        """History row from HISTORY_WITH_OUTPUT as a dict, with its output decompressed"""
+        entry = dict(row)
+        codec = entry.pop('output_codec')
+        data = entry.pop('output_data')
+        if codec == 'zlib':
+            entry['output'] = zlib.decompress(data).decode('utf-8')
+        elif codec is not None:
+            raise ValueError(f"Unknown history output codec: {codec}")
+        return entry
+    
+    def get_history(self, limit: int = 100, before_id: int = None,
+                    include_output: bool = True) -> List[Dict]:
+        """
+        Get command history, newest first
+        before_id: return rows older than this id (keyset pagination: pass the last id of the previous page)
+        include_output: False leaves out the output text; load it with get_history_output()
+        """
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        params = (before_id, limit) if before_id is not None else (limit,)
+        if include_output:
+            cursor = self._connection().execute(self.HISTORY_WITH_OUTPUT + f'''
+                {'WHERE h.id < ?' if before_id is not None else ''}
+                ORDER BY h.id DESC
+                LIMIT ?
+            ''', params)
+            return [self._history_entry(row) for row in cursor.fetchall()]
+        
+        cursor = self._connection().execute(f'''
+            SELECT {self.HISTORY_LIST_COLUMNS} FROM command_history
+            {'WHERE id < ?' if before_id is not None else ''}
+            ORDER BY id DESC
+            LIMIT ?
+        ''', params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def iter_history(self, batch_size: int = 500, include_output: bool = True):
+        """Yield every history entry, newest first, reading batch_size rows at a time"""
+        before_id = None
+        while True:
+            page = self.get_history(batch_size, before_id, include_output)
+            yield from page
+            if len(page) < batch_size:
+                return
+            before_id = page[-1]['id']
+    
+    def search_history(self, query: str, limit: int = 100, before_id: int = None) -> List[Dict]:
+        """
+        Search command, parameters and output, newest first, without the output text
+        query: words to match (each as a prefix); empty returns the plain history
+        before_id: as in get_history()
+        """
+        terms = query.split()
+        if not terms:
+            return self.get_history(limit, before_id, include_output=False)
+        
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        older = 'AND {} < ?'.format('rowid' if self.fts_enabled else 'id') if before_id is not None else ''
+        if self.fts_enabled:
+            match = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+            sql = f'''
+                SELECT {self.HISTORY_LIST_COLUMNS} FROM command_history
+                WHERE id IN (
+                    SELECT rowid FROM command_history_fts
+                    WHERE command_history_fts MATCH ? {older}
+                    ORDER BY rowid DESC
                     LIMIT ?
                 )
-            ''', (max_entries,))
-            
-            conn.commit()
-            return cursor.lastrowid
-    
-    def get_history(self, limit: int = 100) -> List[Dict]:
-        """Get command history"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT * FROM command_history 
-                ORDER BY timestamp DESC 
+                ORDER BY id DESC
+            '''
+            params = [match]
+        else:
+            # Compressed outputs are only searchable through the FTS index
+            like = ' AND '.join(['(command LIKE ? OR parameters LIKE ? OR output LIKE ?)'] * len(terms))
+            sql = f'''
+                SELECT {self.HISTORY_LIST_COLUMNS} FROM command_history
+                WHERE {like} {older}
+                ORDER BY id DESC
                 LIMIT ?
-            ''', (limit,))
-            
-            return [dict(row) for row in cursor.fetchall()]
+            '''
+            params = [f'%{term}%' for term in terms for _ in range(3)]
+        if before_id is not None:
+            params.append(before_id)
+        params.append(limit)
+        
+        try:
+            cursor = self._connection().execute(sql, params)
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  History search failed: {e}")
+            return []
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_history_output(self, entry_id: int) -> Optional[str]:
+        """Output text of one history entry (None if the entry no longer exists)"""
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        row = self._connection().execute(
+            self.HISTORY_WITH_OUTPUT + ' WHERE h.id = ?', (entry_id,)).fetchone()
+        return self._history_entry(row)['output'] if row else None
+    
+    def query_results(self, command: str = None, host: str = None, since=None, until=None,
+                      success: bool = None, limit: int = 1000) -> List[Dict]:
+        """
+        Structured results, newest first: history_id, command, host, success, latency_ms,
+        loss_percent and timestamp (load the full result with get_result())
+        since, until: datetime (naive means UTC) or 'YYYY-MM-DD HH:MM:SS' UTC string
+        """
+        where, params = self._result_filters(host=host, since=since, until=until)
+        if command is not None:
+            where.append('command = ?')
+            params.append(command)
+        if success is not None:
+            where.append('success = ?')
+            params.append(success)
+        
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        cursor = self._connection().execute(f'''
+            SELECT history_id, command, host, success, latency_ms, loss_percent, timestamp
+            FROM command_results
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def query_result_items(self, kind: str = 'open_port', host: str = None, port: int = None,
+                           since=None, until=None, limit: int = 1000) -> List[Dict]:
+        """
+        Per-item results, newest first, e.g. every open port seen on a host over the last month
+        kind: 'open_port', 'alive_host' or 'dns_<type>' (dns_a, dns_mx, ...)
+        since, until: as in query_results()
+        """
+        where, params = self._result_filters(host=host, since=since, until=until)
+        where.insert(0, 'kind = ?')
+        params.insert(0, kind)
+        if port is not None:
+            where.append('port = ?')
+            params.append(port)
+        
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        cursor = self._connection().execute(f'''
+            SELECT history_id, kind, host, port, name, latency_ms, timestamp
+            FROM result_items
+            WHERE {' AND '.join(where)}
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', params + [limit])
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_result(self, entry_id: int) -> Optional[Dict]:
+        """Full structured result of a history entry (None if none was stored)"""
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        row = self._connection().execute(
+            'SELECT payload FROM command_results WHERE history_id = ?', (entry_id,)).fetchone()
+        return unpack_payload(row[0]) if row and row[0] else None
+    
+    @staticmethod
+    def _result_filters(host: str = None, since=None, until=None) -> tuple:
+        """WHERE clauses and parameters shared by the result queries"""
+        def as_utc(value):
+            if isinstance(value, datetime):
+                if value.tzinfo is not None:
+                    value = value.astimezone(timezone.utc)
+                return value.strftime('%Y-%m-%d %H:%M:%S')
+            return value
+        
+        where, params = [], []
+        if host is not None:
+            where.append('host = ?')
+            params.append(host)
+        if since is not None:
+            where.append('timestamp >= ?')
+            params.append(as_utc(since))
+        if until is not None:
+            where.append('timestamp < ?')
+            params.append(as_utc(until))
+        return where, params
     
     def add_favorite(self, name: str, command: str, parameters: str, 
                     description: str = "") -> int:
         """Add command to favorites"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute('''
                 INSERT INTO favorites (name, command, parameters, description)
                 VALUES (?, ?, ?, ?)
             ''', (name, command, parameters, description))
-            conn.commit()
             return cursor.lastrowid
     
     def get_favorites(self) -> List[Dict]:
         """Get all favorites"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT * FROM favorites 
-                ORDER BY name
-            ''')
-            return [dict(row) for row in cursor.fetchall()]
+        cursor = self._connection().execute('''
+            SELECT * FROM favorites
+            ORDER BY name
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
     
     def remove_favorite(self, favorite_id: int):
         """Remove a favorite"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             conn.execute('DELETE FROM favorites WHERE id = ?', (favorite_id,))
-            conn.commit()
     
     def add_device_profile(self, name: str, host: str, device_type: str = "",
                           credentials: str = "", description: str = "") -> int:
         """Add device profile"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute('''
                 INSERT INTO device_profiles 
                 (name, host, device_type, credentials, description)
                 VALUES (?, ?, ?, ?, ?)
             ''', (name, host, device_type, credentials, description))
-            conn.commit()
             return cursor.lastrowid
     
     def get_device_profiles(self) -> List[Dict]:
         """Get all device profiles"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        cursor = self._connection().execute('''
+            SELECT * FROM device_profiles
+            ORDER BY name
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def add_scheduled_task(self, name: str, command: str, parameters: str, schedule_type: str,
+                           schedule_value: str, enabled: bool = True, next_run: str = None) -> int:
+        """Add scheduled task (next_run: UTC 'YYYY-MM-DD HH:MM:SS', None lets the scheduler decide)"""
+        with self._connection() as conn:
             cursor = conn.execute('''
-                SELECT * FROM device_profiles 
-                ORDER BY name
-            ''')
-            return [dict(row) for row in cursor.fetchall()]
+                INSERT INTO scheduled_tasks
+                (name, command, parameters, schedule_type, schedule_value, enabled, next_run)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, command, parameters, schedule_type, schedule_value, enabled, next_run))
+            return cursor.lastrowid
+    
+    def get_scheduled_tasks(self, enabled_only: bool = False) -> List[Dict]:
+        """Get scheduled tasks, soonest first"""
+        cursor = self._connection().execute(f'''
+            SELECT * FROM scheduled_tasks
+            {'WHERE enabled = 1' if enabled_only else ''}
+            ORDER BY next_run IS NULL, next_run, id
+        ''')
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def update_scheduled_task(self, task_id: int, **fields):
+        """Update columns of a scheduled task (see SCHEDULED_TASK_FIELDS)"""
+        unknown = set(fields) - set(self.SCHEDULED_TASK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown scheduled task fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        with self._connection() as conn:
+            conn.execute(f'UPDATE scheduled_tasks SET {assignments} WHERE id = ?',
+                         (*fields.values(), task_id))
+    
+    def remove_scheduled_task(self, task_id: int):
+        """Remove a scheduled task"""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM scheduled_tasks WHERE id = ?', (task_id,))
     
     def clear_history(self):
         """Clear command history"""
-        with sqlite3.connect(self.db_path) as conn:
+        self.flush_history()
+        with self._connection() as conn:
+            if self.fts_enabled:
+                conn.execute("INSERT INTO command_history_fts (command_history_fts) VALUES ('delete-all')")
+            conn.execute('DELETE FROM command_history_output')
+            conn.execute('DELETE FROM result_items')
+            conn.execute('DELETE FROM command_results')
             conn.execute('DELETE FROM command_history')
-            conn.commit()
+    
+    def compact_history(self) -> int:
+        """
+        Compress large outputs stored as plain text, then VACUUM the database
+        Returns the number of entries compressed.
+        """
+        self.flush_history()
+        conn = self._connection()
+        ids = [row[0] for row in conn.execute('''
+            SELECT id FROM command_history
+            WHERE length(CAST(output AS BLOB)) >= ?
+        ''', (self.OUTPUT_COMPRESS_THRESHOLD,))]
+        
+        compressed = 0
+        for entry_id in ids:
+            with conn:
+                row = conn.execute('SELECT output FROM command_history WHERE id = ?', (entry_id,)).fetchone()
+                stored, blob = self._pack_output(row[0]) if row else (None, None)
+                if not blob:
+                    continue
+                conn.execute('''
+                    INSERT OR REPLACE INTO command_history_output (history_id, codec, size, data)
+                    VALUES (?, ?, ?, ?)
+                ''', (entry_id,) + blob)
+                conn.execute('UPDATE command_history SET output = NULL WHERE id = ?', (entry_id,))
+                compressed += 1
+        
+        conn.execute('VACUUM')
+        # In WAL mode the file only shrinks once the vacuumed pages are checkpointed
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return compressed
     
     def get_recent_commands(self, limit: int = 10) -> List[str]:
         """Get recent unique commands"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('''
-                SELECT DISTINCT parameters FROM command_history 
-                WHERE success = 1 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (limit,))
-            
-            return [row[0] for row in cursor.fetchall()]
+        self.flush_history(self.READ_FLUSH_TIMEOUT)
+        cursor = self._connection().execute('''
+            SELECT DISTINCT parameters FROM command_history
+            WHERE success = 1
+            ORDER BY timestamp DESC
+            LIMIT ?
+        ''', (limit,))
+        
+        return [row[0] for row in cursor.fetchall()]
     
     def export_data(self, file_path: str, data_type: str = 'history'):
-        """Export data to file"""
+        """Export data to file (history is streamed, decompressing outputs as it goes)"""
         if data_type == 'history':
-            data = self.get_history(limit=10000)
+            data = self.iter_history()
         elif data_type == 'favorites':
             data = self.get_favorites()
         elif data_type == 'profiles':
@@ -272,7 +875,13 @@ class ConfigManager:
         
         try:
             with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+                # Same layout as json.dump(list, indent=2), one entry in memory at a time
+                empty = True
+                for entry in data:
+                    f.write('[\n  ' if empty else ',\n  ')
+                    f.write(json.dumps(entry, indent=2, default=str).replace('\n', '\n  '))
+                    empty = False
+                f.write('[]' if empty else '\n]')
             return True
-        except IOError:
-            return False
\ No newline at end of file
+        except (IOError, sqlite3.Error):
+            return False
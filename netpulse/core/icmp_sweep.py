@@ -0,0 +1,251 @@
+"""
+NetPulse ICMP Sweep Engine
+In-process ICMP echo sweeps over a single socket
+"""
+
+import os
+import select
+import socket
+import struct
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional, Tuple
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+
+class IcmpSweeper:
+    """Send ICMP echo requests to many hosts from one socket and match the replies"""
+
+    def __init__(self, timeout: float = 3, rate: int = 5000,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 family: int = socket.AF_INET):
+        """
+        timeout: seconds to wait for a reply after each request
+        rate: maximum echo requests sent per second
+        should_stop: polled while sweeping, the sweep ends when it returns True
+        family: AF_INET for ICMP, AF_INET6 for ICMPv6
+        """
+        self.timeout = timeout
+        self.rate = max(1, int(rate))
+        self.should_stop = should_stop or (lambda: False)
+        self.family = family
+        self.identifier = os.getpid() & 0xFFFF
+
+    def open_socket(self) -> Tuple[socket.socket, bool]:
+        """
+        Open an ICMP socket, returning (socket, is_raw).
+        Unprivileged datagram ICMP (Linux ping sockets) is tried first,
+        then a raw socket. Raises OSError when neither is permitted.
+        """
+        proto = socket.IPPROTO_ICMPV6 if self.family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        try:
+            return socket.socket(self.family, socket.SOCK_DGRAM, proto), False
+        except (OSError, AttributeError):
+            pass
+        return socket.socket(self.family, socket.SOCK_RAW, proto), True
+
+    def sweep(self, targets: Iterable, callback: Optional[Callable[[str, float], None]] = None,
+              sock: Optional[Tuple[socket.socket, bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Ping every target once and return [(ip, rtt_ms), ...] for the hosts that replied.
+        callback(ip, rtt_ms) is called as each reply arrives.
+        """
+        sock, is_raw = sock or self.open_socket()
+        try:
+            sock.setblocking(False)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            return self._run(sock, is_raw, iter(targets), callback)
+        finally:
+            sock.close()
+
+    def _run(self, sock: socket.socket, is_raw: bool, targets,
+             callback: Optional[Callable[[str, float], None]]) -> List[Tuple[str, float]]:
+        # ip -> (sequence, send time); insertion order == send order, so expiry pops from the front
+        pending = OrderedDict()
+        alive = []
+        sequence = 0
+        interval = 1.0 / self.rate
+        next_send = time.monotonic()
+        exhausted = False
+        deferred = None
+
+        while not exhausted or pending:
+            if self.should_stop():
+                break
+
+            now = time.monotonic()
+
+            # Send whatever the rate budget allows
+            while not exhausted and next_send <= now:
+                if deferred is not None:
+                    target, deferred = deferred, None
+                else:
+                    target = next(targets, None)
+                if target is None:
+                    exhausted = True
+                    break
+                ip = str(target)
+                sequence = (sequence + 1) & 0xFFFF
+                try:
+                    sock.sendto(self._build_request(sequence), self._sockaddr(ip))
+                except BlockingIOError:
+                    # Send buffer full - retry this target on the next pass
+                    deferred = ip
+                    break
+                except OSError:
+                    # Unroutable or rejected locally - treat as no reply
+                    continue
+                pending[ip] = (sequence, time.monotonic())
+                next_send += interval
+
+            # Expire requests that have waited longer than the timeout
+            now = time.monotonic()
+            while pending:
+                ip, (_, sent_at) = next(iter(pending.items()))
+                if now - sent_at < self.timeout:
+                    break
+                pending.popitem(last=False)
+
+            if exhausted and not pending:
+                break
+
+            # Wait for replies until the next send slot (or the oldest expiry)
+            if not exhausted:
+                wait = max(0.0, next_send - time.monotonic())
+            else:
+                oldest = next(iter(pending.values()))[1]
+                wait = max(0.0, oldest + self.timeout - time.monotonic())
+            readable, _, _ = select.select([sock], [], [], min(wait, 0.05))
+            if readable:
+                self._drain(sock, is_raw, pending, alive, callback)
+
+        return alive
+
+    def _drain(self, sock: socket.socket, is_raw: bool, pending: OrderedDict,
+               alive: list, callback: Optional[Callable[[str, float], None]]):
+        """Read every queued reply and match it against the pending requests"""
+        while True:
+            try:
+                packet, addr = sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            received_at = time.monotonic()
+            ip = addr[0].split("%")[0]
+            entry = pending.get(ip)
+            if entry is None:
+                continue
+
+            reply = self._parse_reply(packet, is_raw)
+            if reply is None:
+                continue
+            identifier, sequence = reply
+            # Ping sockets rewrite the identifier, the kernel already filters on it
+            if is_raw and identifier != self.identifier:
+                continue
+            if sequence != entry[0]:
+                continue
+
+            del pending[ip]
+            rtt_ms = (received_at - entry[1]) * 1000
+            alive.append((ip, rtt_ms))
+            if callback:
+                callback(ip, rtt_ms)
+
+    def multicast_echo(self, group: str = "ff02::1", interface_index: int = 0,
+                       source: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Send one echo request to a multicast group and collect every reply that
+        arrives within the timeout, returning [(ip, rtt_ms), ...].
+        source: local address to send from, so responders answer from the
+        matching (e.g. global rather than link-local) address.
+        """
+        sock, is_raw = self.open_socket()
+        try:
+            if self.family == socket.AF_INET6:
+                sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, 1)
+                if interface_index:
+                    sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, interface_index)
+            if source:
+                sock.bind(self._sockaddr(source, interface_index))
+            sock.setblocking(False)
+
+            sequence = 1
+            sent_at = time.monotonic()
+            sock.sendto(self._build_request(sequence), self._sockaddr(group, interface_index))
+
+            replies = {}
+            deadline = sent_at + self.timeout
+            while not self.should_stop():
+                wait = deadline - time.monotonic()
+                if wait <= 0:
+                    break
+                readable, _, _ = select.select([sock], [], [], min(wait, 0.05))
+                if not readable:
+                    continue
+                while True:
+                    try:
+                        packet, addr = sock.recvfrom(2048)
+                    except (BlockingIOError, InterruptedError, OSError):
+                        break
+                    reply = self._parse_reply(packet, is_raw)
+                    if reply is None or reply[1] != sequence:
+                        continue
+                    if is_raw and reply[0] != self.identifier:
+                        continue
+                    ip = addr[0].split("%")[0]
+                    replies.setdefault(ip, (time.monotonic() - sent_at) * 1000)
+            return list(replies.items())
+        finally:
+            sock.close()
+
+    def _sockaddr(self, ip: str, scope_id: int = 0) -> tuple:
+        """Socket address for the configured family"""
+        if self.family == socket.AF_INET6:
+            return (ip, 0, 0, scope_id)
+        return (ip, 0)
+
+    def _build_request(self, sequence: int) -> bytes:
+        """Build an ICMP/ICMPv6 echo request carrying the given sequence number"""
+        payload = b"NetPulse" + struct.pack("!d", time.time())
+        if self.family == socket.AF_INET6:
+            # The kernel fills in the ICMPv6 checksum (it covers a pseudo-header we can't see)
+            return struct.pack("!BBHHH", ICMPV6_ECHO_REQUEST, 0, 0, self.identifier, sequence) + payload
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self.identifier, sequence)
+        checksum = self._checksum(header + payload)
+        header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, self.identifier, sequence)
+        return header + payload
+
+    def _parse_reply(self, packet: bytes, is_raw: bool) -> Optional[Tuple[int, int]]:
+        """Return (identifier, sequence) for an echo reply, None for anything else"""
+        if is_raw and self.family == socket.AF_INET:
+            # Raw IPv4 sockets deliver the IP header as well, IPv6 ones don't
+            if len(packet) < 20:
+                return None
+            packet = packet[(packet[0] & 0x0F) * 4:]
+        if len(packet) < 8:
+            return None
+        icmp_type, _, _, identifier, sequence = struct.unpack("!BBHHH", packet[:8])
+        expected = ICMPV6_ECHO_REPLY if self.family == socket.AF_INET6 else ICMP_ECHO_REPLY
+        if icmp_type != expected:
+            return None
+        return identifier, sequence
+
+    @staticmethod
+    def _checksum(data: bytes) -> int:
+        """RFC 1071 internet checksum"""
+        if len(data) % 2:
+            data += b"\x00"
+        total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        return ~total & 0xFFFF
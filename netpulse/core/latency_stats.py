@@ -0,0 +1,148 @@
+"""
+NetPulse Latency Statistics
+Constant-memory running statistics for RTT samples
+"""
+
+import math
+from typing import Dict, List, Optional
+
+
+class P2Quantile:
+    """
+    Streaming estimate of one quantile with the P-square algorithm
+    (Jain & Chlamtac, 1985): five markers, no stored samples.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self._initial: List[float] = []
+        self._heights: List[float] = []
+        self._positions: List[int] = []
+        self._desired: List[float] = []
+        self._increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, value: float):
+        if len(self._initial) < 5 and not self._heights:
+            self._initial.append(value)
+            if len(self._initial) == 5:
+                self._heights = sorted(self._initial)
+                self._positions = [1, 2, 3, 4, 5]
+                self._desired = [1, 1 + 2 * self.p, 1 + 4 * self.p, 3 + 2 * self.p, 5]
+            return
+
+        q, n = self._heights, self._positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= value < q[i + 1])
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Move the three middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                height = self._parabolic(i, step)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                q[i] = height
+                n[i] += step
+
+    def value(self) -> Optional[float]:
+        if self._heights:
+            return self._heights[2]
+        if not self._initial:
+            return None
+        # Fewer than five samples: exact quantile of what we have
+        ordered = sorted(self._initial)
+        return ordered[min(len(ordered) - 1, int(round(self.p * (len(ordered) - 1))))]
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+
+class LatencyStats:
+    """
+    Running RTT statistics in constant memory: min/max, mean and standard
+    deviation (Welford), interarrival jitter as in RFC 3550 and p50/p95/p99.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self.received = 0
+        self.lost = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.jitter = 0.0
+        self._last_rtt = None
+        self._quantiles = {p: P2Quantile(p) for p in self.QUANTILES}
+
+    def add(self, rtt_ms: float):
+        """Account one reply"""
+        self.received += 1
+        self.min = rtt_ms if self.min is None else min(self.min, rtt_ms)
+        self.max = rtt_ms if self.max is None else max(self.max, rtt_ms)
+
+        delta = rtt_ms - self.mean
+        self.mean += delta / self.received
+        self._m2 += delta * (rtt_ms - self.mean)
+
+        # RFC 3550 section 6.4.1: J += (|D| - J) / 16 over consecutive replies
+        if self._last_rtt is not None:
+            self.jitter += (abs(rtt_ms - self._last_rtt) - self.jitter) / 16
+        self._last_rtt = rtt_ms
+
+        for estimator in self._quantiles.values():
+            estimator.add(rtt_ms)
+
+    def add_loss(self, count: int = 1):
+        """Account lost requests"""
+        self.lost += max(0, count)
+
+    @property
+    def sent(self) -> int:
+        return self.received + self.lost
+
+    @property
+    def stddev(self) -> Optional[float]:
+        if self.received < 2:
+            return 0.0 if self.received else None
+        return math.sqrt(self._m2 / (self.received - 1))
+
+    def quantile(self, p: float) -> Optional[float]:
+        """Estimated quantile p; only the ones in QUANTILES are tracked"""
+        return self._quantiles[p].value()
+
+    def snapshot(self) -> Dict:
+        """Current statistics, rounded for display"""
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        return {
+            "received": self.received,
+            "lost": self.lost,
+            "loss_percent": round(self.lost / self.sent * 100, 2) if self.sent else 0.0,
+            "min": rounded(self.min),
+            "max": rounded(self.max),
+            "avg": rounded(self.mean) if self.received else None,
+            "stddev": rounded(self.stddev),
+            "jitter": rounded(self.jitter) if self.received > 1 else None,
+            "p50": rounded(self.quantile(0.5)),
+            "p95": rounded(self.quantile(0.95)),
+            "p99": rounded(self.quantile(0.99))
+        }
@@ -1,23 +1,40 @@
+import asyncio
+import re
 import subprocess
 import socket
 import ipaddress
 import threading
 import time
 import json
+import queue
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional, Callable
 import psutil
 import platform
 
+from .port_scanner import AsyncPortScanner, parse_ports, run_coroutine
+from .icmp_sweep import IcmpSweeper
+from .timeseries import TimeSeriesStore
+from .latency_stats import LatencyStats
+
 class NetworkTools:
     """Enhanced network tools with modern features"""
     
-    def __init__(self):
+    # IPv6 prefixes with more addresses than this are discovered via neighbours, not enumeration
+    IPV6_SWEEP_LIMIT = 1 << 16
+    
+    # Output lines kept for the result of a continuous ping
+    PING_OUTPUT_LINES = 1000
+    
+    def __init__(self, timeseries: TimeSeriesStore = None):
+        """timeseries: store RTT samples are recorded in (default: samples are not recorded)"""
         self.ping_process = None
         self.lock = threading.Lock()
         self.scan_active = False
         self.stop_scan = False
+        self.timeseries = timeseries
+        self.ping_stats = LatencyStats()
     
     def stop_ping(self):
         """Stop active ping process"""
@@ -53,8 +70,12 @@ class NetworkTools:
         return "\n".join(lines)
     
     def ping(self, host: str, count: int = 4, continuous: bool = False, 
-             callback: Optional[Callable] = None) -> Dict:
-        """Enhanced ping with better output parsing"""
+             callback: Optional[Callable] = None, stats_every: int = 0) -> Dict:
+        """
+        Enhanced ping with better output parsing
+        Statistics are updated per reply line (live in self.ping_stats) in constant memory.
+        stats_every: also send a statistics line to callback every N replies (0 = never)
+        """
         try:
             if continuous:
                 cmd = ["ping", "-t", host] if platform.system().lower() == "windows" else ["ping", host]
@@ -70,36 +91,68 @@ class NetworkTools:
                 )
             
             output_lines = []
-            stats = {'sent': 0, 'received': 0, 'lost': 0, 'min_time': None, 'max_time': None, 'avg_time': None}
+            live = self.ping_stats = LatencyStats()
+            last_seq = 0
             
             for raw in self.ping_process.stdout:
                 line = raw.rstrip()
                 if line:
+                    # Continuous runs keep only the tail of the output, never every line
                     output_lines.append(line)
+                    if continuous and len(output_lines) > self.PING_OUTPUT_LINES:
+                        del output_lines[:len(output_lines) - self.PING_OUTPUT_LINES]
                     
-                    # Parse statistics
-                    if "time=" in line.lower():
-                        stats['received'] += 1
-                        try:
-                            time_part = line.split("time=")[1].split()[0]
-                            time_ms = float(time_part.replace("ms", ""))
-                            if stats['min_time'] is None or time_ms < stats['min_time']:
-                                stats['min_time'] = time_ms
-                            if stats['max_time'] is None or time_ms > stats['max_time']:
-                                stats['max_time'] = time_ms
-                        except:
-                            pass
+                    lower = line.lower()
+                    # "time=12.3 ms" (Unix) or "time=12ms" / "time<1ms" (Windows)
+                    rtt = re.search(r"time[=<]+\s*([\d.]+)", lower)
+                    time_ms = float(rtt.group(1)) if rtt else None
+                    failed = time_ms is None and ("timed out" in lower or "unreachable" in lower)
+                    
+                    # A jump in icmp_seq means the requests in between got no reply
+                    seq = re.search(r"icmp_seq=(\d+)", line)
+                    if seq and (time_ms is not None or failed):
+                        gap = int(seq.group(1)) - last_seq - 1
+                        if gap > 0:
+                            live.add_loss(gap)
+                            self.record_samples([(host, None)] * gap)
+                        last_seq = max(last_seq, int(seq.group(1)))
+                    
+                    if time_ms is not None:
+                        live.add(time_ms)
+                        self.record_samples([(host, time_ms)])
+                    elif failed:
+                        live.add_loss()
+                        self.record_samples([(host, None)])
                     
                     if callback:
                         callback(line)
+                        if stats_every and time_ms is not None and live.received % stats_every == 0:
+                            callback(self._format_ping_stats(live.snapshot()))
             
             self.ping_process.wait()
             
-            # Calculate packet loss
             if not continuous:
-                stats['sent'] = count
-                stats['lost'] = stats['sent'] - stats['received']
-                stats['loss_percent'] = (stats['lost'] / stats['sent']) * 100 if stats['sent'] > 0 else 0
+                # Requests still unanswered when ping exited
+                missing = count - live.sent
+                if missing > 0:
+                    live.add_loss(missing)
+                    self.record_samples([(host, None)] * missing)
+            
+            snapshot = live.snapshot()
+            stats = {
+                'sent': live.sent,
+                'received': live.received,
+                'lost': live.lost,
+                'loss_percent': snapshot['loss_percent'],
+                'min_time': snapshot['min'],
+                'max_time': snapshot['max'],
+                'avg_time': snapshot['avg'],
+                'stddev': snapshot['stddev'],
+                'jitter': snapshot['jitter'],
+                'p50': snapshot['p50'],
+                'p95': snapshot['p95'],
+                'p99': snapshot['p99']
+            }
             
             return {
                 "host": host,
@@ -111,6 +164,12 @@ class NetworkTools:
         except Exception as e:
             return {"host": host, "success": False, "error": str(e)}
     
+    def _format_ping_stats(self, snapshot: Dict) -> str:
+        """One-line summary of running ping statistics"""
+        return (f"Stats: {snapshot['received']} received, {snapshot['loss_percent']}% loss, "
+                f"avg {snapshot['avg']} ms, p50 {snapshot['p50']} / p95 {snapshot['p95']} / "
+                f"p99 {snapshot['p99']} ms, jitter {snapshot['jitter']} ms")
+    
     def traceroute(self, host: str, max_hops: int = 30) -> Dict:
         """Enhanced traceroute with hop analysis"""
         try:
@@ -191,133 +250,92 @@ class NetworkTools:
             return {"domain": domain, "error": str(e), "success": False}
     
     def port_scan(self, host: str, ports: str = "1-1000", timeout: int = 3, 
-                 callback: Optional[Callable] = None) -> Dict:
-        """Advanced port scanner with multi-threading"""
+                 callback: Optional[Callable] = None, concurrency: int = 500,
+                 rate_limit: Optional[float] = None) -> Dict:
+        """Advanced port scanner using non-blocking asyncio connects
+        
+        concurrency: maximum connects in flight at once
+        rate_limit: maximum new connects per second against the host (None = unlimited)
+        """
         try:
-            # Parse port range
-            open_ports = []
-            closed_ports = []
-            
-            if '-' in ports:
-                start, end = map(int, ports.split('-'))
-                port_list = range(start, end + 1)
-            else:
-                port_list = [int(p.strip()) for p in ports.split(',')]
+            port_list = parse_ports(ports)
             
             self.stop_scan = False
             
-            def scan_port(port):
-                if self.stop_scan:
-                    return None
-                    
-                try:
-                    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                        sock.settimeout(timeout)
-                        result = sock.connect_ex((host, port))
-                        
-                        if result == 0:
-                            # Try to get service name
-                            try:
-                                service = socket.getservbyport(port)
-                            except:
-                                service = "unknown"
-                            
-                            port_info = {"port": port, "service": service, "status": "open"}
-                            open_ports.append(port_info)
-                            
-                            if callback:
-                                callback(f"Port {port} is open ({service})")
-                            
-                            return port_info
-                        else:
-                            closed_ports.append(port)
-                            return None
-                            
-                except Exception as e:
-                    return None
+            def on_port(port, state):
+                if state == "open" and callback:
+                    callback(f"Port {port} is open ({self._get_service_name(port)})")
             
-            # Multi-threaded scanning
-            with ThreadPoolExecutor(max_workers=50) as executor:
-                futures = {executor.submit(scan_port, port): port for port in port_list}
-                
-                for future in as_completed(futures):
-                    if self.stop_scan:
-                        break
-                    
-                    try:
-                        result = future.result()
-                    except Exception as e:
-                        continue
+            scanner = AsyncPortScanner(timeout=timeout, concurrency=concurrency,
+                                       rate_limit=rate_limit,
+                                       should_stop=lambda: self.stop_scan)
+            scan_result = scanner.scan(host, port_list, on_port)
+            
+            open_ports = [
+                {"port": port, "service": self._get_service_name(port), "status": "open"}
+                for port in scan_result["open"]
+            ]
             
             return {
                 "host": host,
                 "ports_scanned": len(port_list),
                 "open_ports": open_ports,
                 "open_count": len(open_ports),
-                "closed_count": len(closed_ports),
+                "closed_count": len(scan_result["closed"]) + len(scan_result["filtered"]),
                 "success": True
             }
             
         except Exception as e:
             return {"host": host, "error": str(e), "success": False}
     
+    def _get_service_name(self, port: int) -> str:
+        """Get well-known service name for a TCP port"""
+        try:
+            return socket.getservbyport(port)
+        except:
+            return "unknown"
+    
     def network_discovery(self, network: str, timeout: int = 3,
-                         callback: Optional[Callable] = None) -> Dict:
-        """Network discovery with host detection"""
+                         callback: Optional[Callable] = None, method: str = "auto") -> Dict:
+        """Network discovery with host detection (IPv4 and IPv6)
+        
+        method: "icmp" sweeps from a single in-process ICMP socket, "ping" runs one
+        ping subprocess per host, "auto" uses ICMP when a socket can be opened.
+        IPv6 prefixes too large to enumerate (e.g. a /64) are discovered from
+        multicast echo replies and the neighbour cache instead.
+        """
         try:
-            net = ipaddress.IPv4Network(network, strict=False)
-            alive_hosts = []
+            net = ipaddress.ip_network(network, strict=False)
             
             self.stop_scan = False
             
-            def ping_host(ip):
-                if self.stop_scan:
-                    return None
-                    
+            if net.version == 6 and net.num_addresses > self.IPV6_SWEEP_LIMIT:
+                if callback:
+                    callback(f"Querying IPv6 neighbours on {net}...")
+                targets = self._ipv6_neighbor_candidates(net, timeout)
+                hosts_scanned = len(targets)
+            else:
+                targets = net.hosts()
+                hosts_scanned = self._usable_host_count(net)
+            
+            alive_hosts = None
+            if method in ("auto", "icmp"):
                 try:
-                    if platform.system().lower() == "windows":
-                        cmd = ["ping", "-n", "1", "-w", str(timeout * 1000), str(ip)]
-                    else:
-                        cmd = ["ping", "-c", "1", "-W", str(timeout), str(ip)]
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 1)
-                    
-                    if result.returncode == 0:
-                        # Try to get hostname
-                        try:
-                            hostname = socket.gethostbyaddr(str(ip))[0]
-                        except:
-                            hostname = "unknown"
-                        
-                        host_info = {"ip": str(ip), "hostname": hostname, "status": "alive"}
-                        alive_hosts.append(host_info)
-                        
-                        if callback:
-                            callback(f"Found host: {ip} ({hostname})")
-                        
-                        return host_info
-                    
-                except Exception as e:
-                    pass
-                
-                return None
+                    alive_hosts = self._discover_with_icmp(targets, net.version, timeout, callback)
+                except OSError as e:
+                    if method == "icmp":
+                        raise
+                    if callback:
+                        callback(f"ICMP socket unavailable ({e}), falling back to ping")
+                    if not isinstance(targets, list):
+                        targets = net.hosts()
             
-            # Multi-threaded host discovery
-            with ThreadPoolExecutor(max_workers=50) as executor:
-                futures = {executor.submit(ping_host, ip): ip for ip in net.hosts()}
-                
-                for future in as_completed(futures):
-                    if self.stop_scan:
-                        break
-                    
-                    try:
-                        result = future.result()
-                    except Exception as e:
-                        continue
+            if alive_hosts is None:
+                alive_hosts = self._discover_with_ping(targets, timeout, callback)
             
             return {
                 "network": str(net),
-                "hosts_scanned": len(list(net.hosts())),
+                "hosts_scanned": hosts_scanned,
                 "alive_hosts": alive_hosts,
                 "alive_count": len(alive_hosts),
                 "success": True
@@ -326,6 +344,192 @@ class NetworkTools:
         except Exception as e:
             return {"network": network, "error": str(e), "success": False}
     
+    def _discover_with_icmp(self, targets, version: int, timeout: int,
+                            callback: Optional[Callable] = None) -> List[Dict]:
+        """Sweep the targets with one ICMP socket, then resolve names of the hosts that answered"""
+        family = socket.AF_INET6 if version == 6 else socket.AF_INET
+        sweeper = IcmpSweeper(timeout=timeout, should_stop=lambda: self.stop_scan, family=family)
+        sock = sweeper.open_socket()
+        replies = sweeper.sweep(targets, sock=sock)
+        self.record_samples(replies)
+        
+        alive_hosts = []
+        
+        def resolve(reply):
+            ip, rtt_ms = reply
+            try:
+                hostname = socket.gethostbyaddr(ip)[0]
+            except:
+                hostname = "unknown"
+            return {"ip": ip, "hostname": hostname, "status": "alive", "rtt_ms": round(rtt_ms, 2)}
+        
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            for host_info in executor.map(resolve, replies):
+                alive_hosts.append(host_info)
+                if callback:
+                    callback(f"Found host: {host_info['ip']} ({host_info['hostname']})")
+        
+        return alive_hosts
+    
+    def _ipv6_neighbor_candidates(self, net: ipaddress.IPv6Network, timeout: int) -> List[str]:
+        """
+        Collect addresses in an IPv6 prefix without enumerating it: echo to the
+        all-nodes group from each local address inside the prefix, then add
+        whatever the OS neighbour cache already knows about
+        """
+        candidates = set()
+        
+        for interface, addresses in psutil.net_if_addrs().items():
+            for addr in addresses:
+                if addr.family != socket.AF_INET6:
+                    continue
+                local = addr.address.split("%")[0]
+                try:
+                    if ipaddress.ip_address(local) not in net:
+                        continue
+                except ValueError:
+                    continue
+                
+                try:
+                    index = socket.if_nametoindex(interface)
+                except (OSError, AttributeError):
+                    index = 0
+                
+                try:
+                    sweeper = IcmpSweeper(timeout=timeout, should_stop=lambda: self.stop_scan,
+                                          family=socket.AF_INET6)
+                    for ip, _ in sweeper.multicast_echo("ff02::1", index, source=local):
+                        if ipaddress.ip_address(ip) in net:
+                            candidates.add(ip)
+                except OSError:
+                    # No ICMP socket - the neighbour cache is all we have
+                    continue
+        
+        candidates.update(self._read_neighbor_cache(net))
+        return sorted(candidates, key=lambda ip: int(ipaddress.ip_address(ip)))
+    
+    def _read_neighbor_cache(self, net) -> List[str]:
+        """Addresses in net that the OS neighbour cache lists as (possibly) reachable"""
+        system = platform.system().lower()
+        if system == "windows":
+            cmd = ["netsh", "interface", "ipv6", "show", "neighbors"]
+        elif system == "darwin":
+            cmd = ["ndp", "-an"]
+        else:
+            cmd = ["ip", "-6", "neigh", "show"]
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        except Exception:
+            return []
+        
+        neighbors = []
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if not parts:
+                continue
+            lower = line.lower()
+            if "failed" in lower or "incomplete" in lower or "unreachable" in lower:
+                continue
+            try:
+                ip = ipaddress.ip_address(parts[0].split("%")[0])
+            except ValueError:
+                continue
+            if ip.version == net.version and ip in net:
+                neighbors.append(str(ip))
+        return neighbors
+    
+    def _discover_with_ping(self, targets, timeout: int,
+                            callback: Optional[Callable] = None) -> List[Dict]:
+        """Discover hosts by running one ping subprocess per target address"""
+        alive_hosts = []
+        
+        def ping_host(ip):
+            if self.stop_scan:
+                return None
+                
+            try:
+                if platform.system().lower() == "windows":
+                    cmd = ["ping", "-n", "1", "-w", str(timeout * 1000), str(ip)]
+                else:
+                    cmd = ["ping", "-c", "1", "-W", str(timeout), str(ip)]
+                
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout + 1)
+                
+                if result.returncode == 0:
+                    if "time=" in result.stdout:
+                        try:
+                            rtt = result.stdout.split("time=")[1].split()[0]
+                            self.record_samples([(str(ip), float(rtt.replace("ms", "")))])
+                        except (IndexError, ValueError):
+                            pass
+                    
+                    # Try to get hostname
+                    try:
+                        hostname = socket.gethostbyaddr(str(ip))[0]
+                    except:
+                        hostname = "unknown"
+                    
+                    host_info = {"ip": str(ip), "hostname": hostname, "status": "alive"}
+                    alive_hosts.append(host_info)
+                    
+                    if callback:
+                        callback(f"Found host: {ip} ({hostname})")
+                    
+                    return host_info
+                
+            except Exception as e:
+                pass
+            
+            return None
+        
+        # Bounded producer/consumer: hosts are generated lazily and at most
+        # a couple of addresses per worker are queued at any time
+        workers = 50
+        work_queue = queue.Queue(maxsize=workers * 2)
+        
+        def consumer():
+            while True:
+                ip = work_queue.get()
+                if ip is None:
+                    return
+                ping_host(ip)
+        
+        threads = [threading.Thread(target=consumer, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        
+        for ip in targets:
+            if self.stop_scan:
+                break
+            work_queue.put(ip)
+        
+        for _ in threads:
+            work_queue.put(None)
+        for thread in threads:
+            thread.join()
+        
+        return alive_hosts
+    
+    def _usable_host_count(self, net) -> int:
+        """Number of addresses net.hosts() yields, computed without iterating it"""
+        return self._usable_range(net)[2]
+    
+    def _usable_range(self, net) -> Tuple[int, int, int]:
+        """
+        First usable address, last usable address and usable count as integers,
+        using the same rules as net.hosts(): /31, /32, /127 and /128 use every
+        address, other IPv4 networks drop network and broadcast, other IPv6
+        networks drop the subnet-router anycast address
+        """
+        first = int(net.network_address)
+        last = int(net.broadcast_address)
+        if net.prefixlen >= net.max_prefixlen - 1:
+            return first, last, net.num_addresses
+        if net.version == 4:
+            return first + 1, last - 1, net.num_addresses - 2
+        return first + 1, last, net.num_addresses - 1
+    
     def bandwidth_test(self, host: str = "8.8.8.8", duration: int = 10,
                       callback: Optional[Callable] = None) -> Dict:
         """Basic bandwidth test using ping statistics"""
@@ -334,7 +538,7 @@ class NetworkTools:
                 callback("Starting bandwidth test...")
             
             # Use ping to estimate bandwidth
-            ping_results = []
+            latency = LatencyStats()
             start_time = time.time()
             
             while time.time() - start_time < duration:
@@ -342,18 +546,18 @@ class NetworkTools:
                 if result.get('success') and result.get('statistics'):
                     stats = result['statistics']
                     if stats['min_time'] is not None:
-                        ping_results.append(stats['min_time'])
+                        latency.add(stats['min_time'])
+                    else:
+                        latency.add_loss()
                 
                 if callback:
                     callback(f"Testing... {int(time.time() - start_time)}/{duration}s")
                 
                 time.sleep(1)
             
-            if ping_results:
-                avg_latency = sum(ping_results) / len(ping_results)
-                min_latency = min(ping_results)
-                max_latency = max(ping_results)
-                jitter = max_latency - min_latency
+            if latency.received:
+                summary = latency.snapshot()
+                avg_latency = summary['avg']
                 
                 # Basic quality assessment
                 if avg_latency < 50:
@@ -369,11 +573,14 @@ class NetworkTools:
                     "host": host,
                     "duration": duration,
                     "avg_latency": avg_latency,
-                    "min_latency": min_latency,
-                    "max_latency": max_latency,
-                    "jitter": jitter,
+                    "min_latency": summary['min'],
+                    "max_latency": summary['max'],
+                    "jitter": summary['jitter'],
+                    "stddev": summary['stddev'],
+                    "p95_latency": summary['p95'],
+                    "packet_loss": summary['loss_percent'],
                     "quality": quality,
-                    "samples": len(ping_results),
+                    "samples": latency.received,
                     "success": True
                 }
             else:
@@ -428,6 +635,92 @@ class NetworkTools:
         except Exception as e:
             return {"error": str(e), "success": False}
     
+    def check_reachability(self, hosts: List[str], tcp_ports: Tuple[int, ...] = (22, 80),
+                           timeout: float = 2, use_icmp: bool = True,
+                           concurrency: int = 500,
+                           fallback: Optional[Callable[[List[str]], Dict[str, Dict]]] = None) -> Dict[str, Dict]:
+        """
+        Check many hosts at once, cheapest probe first.
+        IPv4 hosts get one ICMP sweep over a single socket (when permitted); hosts that
+        didn't answer are tried with TCP connects to tcp_ports, where a refused
+        connection also proves the host is up.
+        fallback(hosts) probes the hosts still down after that and returns
+        {host: result} for the ones it found up.
+        An ICMP loss is only recorded for hosts that end up down, so a host that
+        filters ICMP doesn't show as losing every ping.
+        Safe to call from a thread running an event loop (the TCP checks then use a worker thread).
+        Returns {host: {"up", "via", "rtt_ms"}}
+        """
+        results = {host: {"up": False, "via": None, "rtt_ms": None} for host in hosts}
+        remaining = list(results)
+        icmp_probed = []
+        
+        if use_icmp:
+            ipv4 = [host for host in remaining if self._is_ipv4(host)]
+            if ipv4:
+                sweeper = IcmpSweeper(timeout=timeout, should_stop=lambda: self.stop_scan)
+                try:
+                    replies = sweeper.sweep(ipv4)
+                    icmp_probed = ipv4
+                except OSError:
+                    # No ICMP socket permission - TCP covers every host instead
+                    replies = []
+                for ip, rtt_ms in replies:
+                    results[ip] = {"up": True, "via": "icmp", "rtt_ms": round(rtt_ms, 2)}
+                self.record_samples((ip, results[ip]["rtt_ms"]) for ip, _ in replies)
+                remaining = [host for host in remaining if not results[host]["up"]]
+        
+        if remaining and tcp_ports:
+            for host, rtt_ms in run_coroutine(self._tcp_reachability(remaining, tcp_ports, timeout, concurrency)):
+                results[host] = {"up": True, "via": "tcp", "rtt_ms": round(rtt_ms, 2)}
+            self.record_samples(((host, results[host]["rtt_ms"]) for host in remaining), metric="tcp")
+            remaining = [host for host in remaining if not results[host]["up"]]
+        
+        if remaining and fallback:
+            results.update(fallback(remaining))
+        
+        self.record_samples((ip, None) for ip in icmp_probed if not results[ip]["up"])
+        return results
+    
+    async def _tcp_reachability(self, hosts: List[str], ports: Tuple[int, ...], timeout: float,
+                                concurrency: int) -> List[Tuple[str, float]]:
+        """Connect to each host's ports in turn; the first answer (accept or refuse) wins"""
+        limit = asyncio.Semaphore(max(1, concurrency))
+        
+        async def check(host):
+            async with limit:
+                for port in ports:
+                    if self.stop_scan:
+                        return None
+                    start = time.perf_counter()
+                    try:
+                        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                        writer.close()
+                    except ConnectionRefusedError:
+                        pass
+                    except (OSError, asyncio.TimeoutError):
+                        continue
+                    return host, (time.perf_counter() - start) * 1000
+                return None
+        
+        replies = await asyncio.gather(*(check(host) for host in hosts))
+        return [reply for reply in replies if reply]
+    
+    def record_samples(self, samples, metric: str = "rtt"):
+        """Keep (host, value_ms) samples in the time series store; None marks a loss"""
+        if self.timeseries is None:
+            return
+        try:
+            self.timeseries.record_many(samples, metric)
+        except Exception as e:
+            print(f"⚠️  Could not record {metric} samples: {e}")
+    
+    def _is_ipv4(self, text: str) -> bool:
+        try:
+            return ipaddress.ip_address(text).version == 4
+        except ValueError:
+            return False
+    
     def stop_all_scans(self):
         """Stop all active scans"""
         self.stop_scan = True
@@ -442,29 +735,22 @@ class NetworkTools:
             return False
     
     def calc_subnet_info(self, input_str: str) -> Dict:
-        """Calculate subnet information with enhanced details"""
+        """Calculate subnet information with enhanced details (IPv4 and IPv6)"""
         try:
-            if "/" in input_str:
-                net = ipaddress.IPv4Network(input_str, strict=False)
-                ip = net.network_address
-            else:
-                ip_str, mask_str = input_str.split()
-                net = ipaddress.IPv4Network(f"{ip_str}/{mask_str}", strict=False)
-                ip = ipaddress.IPv4Address(ip_str)
-            
-            wildcard = ipaddress.IPv4Address(int(net.hostmask))
-            hosts = list(net.hosts())
+            net, ip = self._parse_subnet(input_str)
+            first, last, usable = self._usable_range(net)
+            address_cls = type(net.network_address)
             
             return {
                 "ip_address": str(ip),
                 "subnet_mask": str(net.netmask),
-                "wildcard_mask": str(wildcard),
+                "wildcard_mask": str(net.hostmask),
                 "cidr_notation": str(net),
                 "network_address": str(net.network_address),
                 "broadcast_address": str(net.broadcast_address),
-                "first_usable": str(hosts[0]) if hosts else "N/A",
-                "last_usable": str(hosts[-1]) if hosts else "N/A",
-                "usable_host_count": len(hosts),
+                "first_usable": str(address_cls(first)) if usable else "N/A",
+                "last_usable": str(address_cls(last)) if usable else "N/A",
+                "usable_host_count": usable,
                 "total_addresses": net.num_addresses,
                 "ip_class": self._get_ip_class(ip),
                 "is_private": ip.is_private,
@@ -476,8 +762,88 @@ class NetworkTools:
         except Exception as e:
             return {"error": str(e), "success": False}
     
-    def _get_ip_class(self, ip: ipaddress.IPv4Address) -> str:
+    def calc_subnet_batch(self, subnets) -> Dict:
+        """
+        Calculate many subnets at once and return a compact table.
+        subnets: iterable of "a.b.c.d/nn" / "a.b.c.d mask" / IPv6 prefix strings,
+        or one string with entries separated by newlines or commas.
+        Overlapping subnets are reported so an addressing plan can be validated.
+        """
+        try:
+            if isinstance(subnets, str):
+                subnets = [part for line in subnets.splitlines() for part in line.split(",")]
+            
+            columns = ["input", "cidr", "version", "prefix_length", "network_address",
+                       "broadcast_address", "first_usable", "last_usable",
+                       "usable_host_count", "total_addresses"]
+            rows = []
+            errors = []
+            spans = []
+            
+            for entry in subnets:
+                entry = entry.strip()
+                if not entry:
+                    continue
+                try:
+                    net, _ = self._parse_subnet(entry)
+                except Exception as e:
+                    errors.append({"input": entry, "error": str(e)})
+                    continue
+                
+                first, last, usable = self._usable_range(net)
+                address_cls = type(net.network_address)
+                rows.append([
+                    entry, str(net), net.version, net.prefixlen,
+                    str(net.network_address), str(net.broadcast_address),
+                    str(address_cls(first)) if usable else "N/A",
+                    str(address_cls(last)) if usable else "N/A",
+                    usable, net.num_addresses
+                ])
+                spans.append((net.version, int(net.network_address), int(net.broadcast_address), str(net)))
+            
+            # Sort once and sweep: each range only needs comparing with the
+            # furthest-reaching range seen so far in the same address family
+            overlaps = []
+            spans.sort()
+            widest = None
+            for version, start, end, cidr in spans:
+                if widest and widest[0] == version and start <= widest[2]:
+                    overlaps.append([widest[3], cidr])
+                if not widest or widest[0] != version or end > widest[2]:
+                    widest = (version, start, end, cidr)
+            
+            return {
+                "columns": columns,
+                "rows": rows,
+                "subnet_count": len(rows),
+                "errors": errors,
+                "overlaps": overlaps,
+                "success": True
+            }
+            
+        except Exception as e:
+            return {"error": str(e), "success": False}
+    
+    def _parse_subnet(self, input_str: str):
+        """Parse "addr/prefix" or "addr mask" into (network, address)"""
+        input_str = input_str.strip()
+        if "/" in input_str:
+            net = ipaddress.ip_network(input_str, strict=False)
+            ip = net.network_address
+        else:
+            parts = input_str.split()
+            if len(parts) != 2:
+                raise ValueError(f"Expected 'address/prefix' or 'address mask', got '{input_str}'")
+            ip_str, mask_str = parts
+            net = ipaddress.ip_network(f"{ip_str}/{mask_str}", strict=False)
+            ip = ipaddress.ip_address(ip_str)
+        return net, ip
+    
+    def _get_ip_class(self, ip) -> str:
         """Get IP address class"""
+        if ip.version == 6:
+            return "N/A (IPv6)"
+        
         first_octet = int(str(ip).split(".")[0])
         
         if 1 <= first_octet <= 126:
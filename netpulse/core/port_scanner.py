@@ -0,0 +1,155 @@
+"""
+NetPulse Async Port Scanner
+Non-blocking TCP connect scanner built on asyncio
+"""
+
+import asyncio
+import errno
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# Errors that mean "we ran out of local resources", not "the port is filtered"
+_RESOURCE_ERRNOS = {errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.EAGAIN}
+
+MAX_PORT = 65535
+
+
+def parse_ports(ports: str) -> Sequence[int]:
+    """
+    Ports from a range ("1-1000") or a comma separated list ("22,80,443").
+    Raises ValueError for ports outside 1-65535 or a reversed range.
+    """
+    if '-' in ports:
+        start, end = map(int, ports.split('-'))
+        if start > end:
+            raise ValueError(f"Invalid port range: {ports}")
+        port_list = range(start, end + 1)
+        bounds = (start, end)
+    else:
+        port_list = [int(p.strip()) for p in ports.split(',')]
+        bounds = (min(port_list), max(port_list))
+
+    for port in bounds:
+        if not 1 <= port <= MAX_PORT:
+            raise ValueError(f"Port {port} outside 1-{MAX_PORT}")
+    return port_list
+
+
+def run_coroutine(coro):
+    """
+    Run a coroutine to completion from synchronous code. When the calling thread
+    already runs an event loop (asyncio.run would refuse), it runs on a fresh
+    loop in a worker thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class AsyncPortScanner:
+    """TCP connect scanner keeping many non-blocking connects in flight"""
+
+    def __init__(self, timeout: float = 3, concurrency: int = 500,
+                 rate_limit: Optional[float] = None,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 family: int = socket.AF_UNSPEC):
+        """
+        timeout: seconds to wait for each connect
+        concurrency: maximum number of connects in flight at once
+        rate_limit: maximum new connects per second against the host (None = unlimited)
+        should_stop: polled before each connect, scanning ends when it returns True
+        family: address family to resolve the host with (AF_UNSPEC = IPv4 or IPv6)
+        """
+        self.timeout = timeout
+        self.concurrency = max(1, int(concurrency))
+        self.rate_limit = rate_limit if rate_limit and rate_limit > 0 else None
+        self.should_stop = should_stop or (lambda: False)
+        self.family = family
+        self._next_slot = 0.0
+
+    def scan(self, host: str, ports: Iterable[int],
+             callback: Optional[Callable[[int, str], None]] = None) -> Dict[str, List[int]]:
+        """
+        Scan ports on host and classify them as open, closed or filtered.
+        callback(port, state) is called as each port completes.
+        From async code, await scan_async() instead.
+        """
+        return run_coroutine(self.scan_async(host, ports, callback))
+
+    async def scan_async(self, host: str, ports: Iterable[int],
+                         callback: Optional[Callable[[int, str], None]] = None) -> Dict[str, List[int]]:
+        """scan() for callers already inside an event loop"""
+        loop = asyncio.get_running_loop()
+
+        # Resolve once instead of once per port; IPv4 and IPv6 targets both work
+        infos = await loop.getaddrinfo(host, None, family=self.family, type=socket.SOCK_STREAM)
+        if not infos:
+            raise socket.gaierror(f"Could not resolve {host}")
+        family, _, _, _, sockaddr = infos[0]
+
+        results = {"open": [], "closed": [], "filtered": []}
+        port_iter = iter(ports)
+        self._next_slot = loop.time()
+
+        async def worker():
+            # Workers share one iterator, so the port list is never materialized
+            for port in port_iter:
+                if self.should_stop():
+                    return
+                await self._throttle(loop)
+                state = await self._probe(loop, family, sockaddr, port)
+                results[state].append(port)
+                if callback:
+                    callback(port, state)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        await asyncio.gather(*workers)
+
+        for state_ports in results.values():
+            state_ports.sort()
+        return results
+
+    async def _throttle(self, loop: asyncio.AbstractEventLoop):
+        """Space connects out so the host sees at most rate_limit per second"""
+        if not self.rate_limit:
+            return
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1.0 / self.rate_limit
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _probe(self, loop: asyncio.AbstractEventLoop, family: int,
+                     sockaddr: tuple, port: int) -> str:
+        """Attempt a single non-blocking connect and classify the result"""
+        while True:
+            try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+            except OSError as e:
+                if e.errno in _RESOURCE_ERRNOS:
+                    # Out of descriptors - let other connects finish first
+                    await asyncio.sleep(0.05)
+                    continue
+                raise
+
+            sock.setblocking(False)
+            try:
+                # IPv6 sockaddrs carry flow info and scope id after the port
+                target = (sockaddr[0], port) + tuple(sockaddr[2:])
+                await asyncio.wait_for(loop.sock_connect(sock, target), self.timeout)
+                return "open"
+            except ConnectionRefusedError:
+                return "closed"
+            except asyncio.TimeoutError:
+                return "filtered"
+            except OSError as e:
+                if e.errno in _RESOURCE_ERRNOS:
+                    await asyncio.sleep(0.05)
+                    continue
+                return "filtered"
+            finally:
+                sock.close()
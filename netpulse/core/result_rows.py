@@ -0,0 +1,59 @@
+"""
+NetPulse Result Rows
+Split NetworkTools results into typed columns for SQL queries plus a compact payload
+"""
+
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+
+def result_summary(result: Dict) -> Dict:
+    """
+    Common fields of a result: target host, success, latency (ms) and packet loss (%).
+    Fields a command does not report are None.
+    """
+    stats = result.get("statistics") or {}
+    latency = stats.get("avg_time", result.get("avg_latency"))
+    loss = stats.get("loss_percent", result.get("packet_loss"))
+    host = (result.get("host") or result.get("domain") or result.get("network")
+            or result.get("cidr_notation"))
+    return {
+        "host": str(host) if host is not None else None,
+        "success": bool(result.get("success", False)),
+        "latency_ms": float(latency) if latency is not None else None,
+        "loss_percent": float(loss) if loss is not None else None
+    }
+
+
+def result_items(result: Dict) -> List[Tuple[str, Optional[str], Optional[int], Optional[str], Optional[float]]]:
+    """
+    Per-item rows of a result as (kind, host, port, name, latency_ms):
+    open ports of a port scan, alive hosts of a discovery and DNS records of a lookup.
+    """
+    items = []
+    host = result_summary(result)["host"]
+
+    for port in result.get("open_ports") or []:
+        items.append(("open_port", host, int(port["port"]), port.get("service"), None))
+
+    for alive in result.get("alive_hosts") or []:
+        items.append(("alive_host", alive.get("ip"), None, alive.get("hostname"), alive.get("rtt_ms")))
+
+    for record_type, values in (result.get("records") or {}).items():
+        if not record_type.endswith("_records"):
+            continue
+        for value in values:
+            items.append(("dns_" + record_type[:-len("_records")].lower(), host, None, str(value), None))
+
+    return items
+
+
+def pack_payload(result: Dict) -> bytes:
+    """Whole result as compressed JSON, without the formatted output (history keeps that)"""
+    data = {key: value for key, value in result.items() if key != "output"}
+    return zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def unpack_payload(payload: bytes) -> Dict:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
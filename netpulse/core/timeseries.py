@@ -0,0 +1,355 @@
+"""
+NetPulse Time Series Store
+Append-only per-target sample files with downsampled rollups
+"""
+
+import atexit
+import math
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+# One raw sample: timestamp, value (NaN marks a lost packet / failed probe)
+RAW_RECORD = struct.Struct('<df')
+# One rollup bucket: start, samples, lost, min, max, sum of the received values
+ROLLUP_RECORD = struct.Struct('<dIIffd')
+
+RESOLUTIONS = {"1m": 60, "1h": 3600}
+
+
+class _Bucket:
+    """Aggregate of the samples in one rollup interval"""
+
+    __slots__ = ("start", "count", "lost", "min", "max", "sum")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.lost = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        if math.isnan(value):
+            self.lost += 1
+        else:
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+            self.sum += value
+
+    def pack(self) -> bytes:
+        received = self.count > self.lost
+        return ROLLUP_RECORD.pack(self.start, self.count, self.lost,
+                                  self.min if received else math.nan,
+                                  self.max if received else math.nan, self.sum)
+
+    def as_dict(self) -> Dict:
+        return TimeSeriesStore._rollup_point((self.start, self.count, self.lost,
+                                              self.min, self.max, self.sum))
+
+
+class TimeSeriesStore:
+    """
+    Compact latency / packet-loss history per target and metric.
+
+    Raw samples are 12-byte records appended to one file per series, so a
+    range query is a binary search plus one sequential read. Every sample is
+    also folded into 1-minute and 1-hour rollups, which keep months of
+    history chartable without touching the raw data.
+    """
+
+    def __init__(self, root: str = None, flush_every: int = 512, flush_interval: float = 5.0):
+        """
+        root: directory holding the series files (default: the app's data/timeseries)
+        flush_every: buffered samples that trigger a write
+        flush_interval: seconds after which buffered samples are written on the next record
+        """
+        self.root = root or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'timeseries')
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._pending: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        # (target, metric) -> {"last": last timestamp, "buckets": {resolution: open _Bucket}}
+        self._state: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.RLock()
+        # The directory and the exit-time flush are only set up once something is recorded
+        self._exit_flush = False
+
+    def record(self, target: str, value: Optional[float], metric: str = "rtt",
+               timestamp: float = None):
+        """Buffer one sample; value None records a loss"""
+        self.record_many([(target, value)], metric, timestamp)
+
+    def record_many(self, samples: Iterable[Tuple[str, Optional[float]]], metric: str = "rtt",
+                    timestamp: float = None):
+        """Buffer (target, value) samples taken at the same time; value None records a loss"""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            if not self._exit_flush:
+                atexit.register(self.flush)
+                self._exit_flush = True
+            for target, value in samples:
+                value = math.nan if value is None else float(value)
+                self._pending.setdefault((str(target), metric), []).append((timestamp, value))
+                self._pending_count += 1
+            if (self._pending_count >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+
+    def flush(self):
+        """Write buffered samples and finished rollup buckets to disk"""
+        with self._lock:
+            pending, self._pending, self._pending_count = self._pending, {}, 0
+            self._last_flush = time.monotonic()
+            for series, samples in pending.items():
+                try:
+                    self._append(series, samples)
+                except OSError as e:
+                    print(f"⚠️  Could not write time series {series[0]} {series[1]}: {e}")
+
+    def query(self, target: str, start: float = None, end: float = None, metric: str = "rtt",
+              resolution: str = None, max_points: int = 2000) -> Dict:
+        """
+        Samples of target between start and end (epoch seconds, default: everything).
+        resolution: "raw", "1m" or "1h"; by default the finest one that fits max_points
+        Raw points are {"time", "value"} (value None = lost); rollup points are
+        {"time", "count", "lost", "loss_percent", "min", "max", "avg"}.
+        """
+        series = (str(target), metric)
+        start = start if start is not None else 0.0
+        end = end if end is not None else math.inf
+        with self._lock:
+            self.flush()
+            state = self._load_state(series)
+
+            if resolution is None:
+                resolution = self._pick_resolution(series, start, end, max_points)
+
+            if resolution == "raw":
+                points = [{"time": ts, "value": None if math.isnan(value) else round(value, 3)}
+                          for ts, value in self._read_range(self._path(series, "raw"), RAW_RECORD,
+                                                            start, end)]
+            elif resolution in RESOLUTIONS:
+                points = [self._rollup_point(record) for record in
+                          self._read_range(self._path(series, resolution), ROLLUP_RECORD,
+                                           start - RESOLUTIONS[resolution], end)
+                          if record[0] + RESOLUTIONS[resolution] > start]
+                bucket = state["buckets"].get(resolution)
+                if bucket is not None and bucket.count and bucket.start < end and \
+                        bucket.start + RESOLUTIONS[resolution] > start:
+                    points.append(bucket.as_dict())
+            else:
+                raise ValueError(f"Unknown resolution: {resolution}")
+
+        return {"target": target, "metric": metric, "resolution": resolution, "points": points}
+
+    def summary(self, target: str, start: float = None, end: float = None,
+                metric: str = "rtt") -> Dict:
+        """Sample count, loss and min/max/avg over a range (rollups are used for long ranges)"""
+        points = self.query(target, start, end, metric, max_points=10 ** 6)
+        if points["resolution"] == "raw":
+            total = _Bucket(0.0)
+            for point in points["points"]:
+                total.add(math.nan if point["value"] is None else point["value"])
+        else:
+            total = _Bucket(0.0)
+            for point in points["points"]:
+                total.count += point["count"]
+                total.lost += point["lost"]
+                if point["min"] is not None:
+                    total.min = min(total.min, point["min"])
+                    total.max = max(total.max, point["max"])
+                    total.sum += point["avg"] * (point["count"] - point["lost"])
+        result = total.as_dict()
+        result.pop("time")
+        return {"target": target, "metric": metric, **result}
+
+    def targets(self, metric: str = None) -> List[Dict]:
+        """Every stored series as {"target", "metric"}"""
+        self.flush()
+        series = []
+        if not os.path.isdir(self.root):
+            return series
+        for name in sorted(os.listdir(self.root)):
+            if name.endswith(".raw"):
+                target, _, series_metric = name[:-4].rpartition(".")
+                if metric is None or series_metric == metric:
+                    series.append({"target": unquote(target), "metric": series_metric})
+        return series
+
+    def prune_raw(self, before: float) -> int:
+        """
+        Drop raw samples older than before from every series; rollups are kept.
+        Returns the number of samples removed.
+        """
+        removed = 0
+        with self._lock:
+            self.flush()
+            for entry in self.targets():
+                path = self._path((entry["target"], entry["metric"]), "raw")
+                with open(path, 'rb') as f:
+                    cut = self._bisect(f, RAW_RECORD.size, os.path.getsize(path) // RAW_RECORD.size, before)
+                    if not cut:
+                        continue
+                    f.seek(cut * RAW_RECORD.size)
+                    partial = path + '.part'
+                    with open(partial, 'wb') as target:
+                        for chunk in iter(lambda: f.read(1 << 16), b''):
+                            target.write(chunk)
+                os.replace(partial, path)
+                removed += cut
+        return removed
+
+    def _append(self, series: Tuple[str, str], samples: List[Tuple[float, float]]):
+        """Append raw samples and fold them into the rollups (caller holds the lock)"""
+        os.makedirs(self.root, exist_ok=True)
+        state = self._load_state(series)
+        raw = bytearray()
+        finished = {resolution: bytearray() for resolution in RESOLUTIONS}
+
+        for timestamp, value in samples:
+            # Files must stay sorted for binary search; a clock step back is clamped
+            timestamp = max(timestamp, state["last"])
+            state["last"] = timestamp
+            raw += RAW_RECORD.pack(timestamp, value)
+
+            for resolution, seconds in RESOLUTIONS.items():
+                bucket_start = timestamp - timestamp % seconds
+                bucket = state["buckets"].get(resolution)
+                if bucket is not None and bucket.start != bucket_start:
+                    finished[resolution] += bucket.pack()
+                    bucket = None
+                if bucket is None:
+                    bucket = state["buckets"][resolution] = _Bucket(bucket_start)
+                bucket.add(value)
+
+        with open(self._path(series, "raw"), 'ab') as f:
+            f.write(raw)
+        for resolution, data in finished.items():
+            if data:
+                with open(self._path(series, resolution), 'ab') as f:
+                    f.write(data)
+
+    def _load_state(self, series: Tuple[str, str]) -> Dict:
+        """
+        Last timestamp and open rollup buckets of a series. After a restart the
+        open buckets are rebuilt from the raw samples past the last finished one.
+        """
+        state = self._state.get(series)
+        if state is not None:
+            return state
+
+        state = {"last": 0.0, "buckets": {}}
+        raw_path = self._path(series, "raw")
+        # A write cut short by a crash leaves a partial record that would misalign every later one
+        for kind, record in (("raw", RAW_RECORD), *((r, ROLLUP_RECORD) for r in RESOLUTIONS)):
+            path = self._path(series, kind)
+            if os.path.exists(path) and os.path.getsize(path) % record.size:
+                with open(path, 'r+b') as f:
+                    f.truncate(os.path.getsize(path) - os.path.getsize(path) % record.size)
+
+        if os.path.exists(raw_path):
+            for resolution, seconds in RESOLUTIONS.items():
+                rollup_path = self._path(series, resolution)
+                finished_until = 0.0
+                if os.path.exists(rollup_path) and os.path.getsize(rollup_path) >= ROLLUP_RECORD.size:
+                    with open(rollup_path, 'rb') as f:
+                        f.seek(-ROLLUP_RECORD.size, os.SEEK_END)
+                        finished_until = ROLLUP_RECORD.unpack(f.read(ROLLUP_RECORD.size))[0] + seconds
+
+                tail = bytearray()
+                bucket = None
+                for timestamp, value in self._read_range(raw_path, RAW_RECORD, finished_until, math.inf):
+                    state["last"] = max(state["last"], timestamp)
+                    bucket_start = timestamp - timestamp % seconds
+                    if bucket is not None and bucket.start != bucket_start:
+                        # Buckets a crash left unfinished
+                        tail += bucket.pack()
+                        bucket = None
+                    if bucket is None:
+                        bucket = _Bucket(bucket_start)
+                    bucket.add(value)
+                if tail:
+                    with open(rollup_path, 'ab') as f:
+                        f.write(tail)
+                if bucket is not None:
+                    state["buckets"][resolution] = bucket
+
+            size = os.path.getsize(raw_path)
+            if size >= RAW_RECORD.size:
+                with open(raw_path, 'rb') as f:
+                    f.seek((size // RAW_RECORD.size - 1) * RAW_RECORD.size)
+                    state["last"] = max(state["last"], RAW_RECORD.unpack(f.read(RAW_RECORD.size))[0])
+
+        self._state[series] = state
+        return state
+
+    def _pick_resolution(self, series: Tuple[str, str], start: float, end: float,
+                         max_points: int) -> str:
+        """Finest resolution whose point count over the range fits max_points"""
+        path = self._path(series, "raw")
+        if os.path.exists(path):
+            count = os.path.getsize(path) // RAW_RECORD.size
+            with open(path, 'rb') as f:
+                lo = self._bisect(f, RAW_RECORD.size, count, start)
+                hi = self._bisect(f, RAW_RECORD.size, count, end)
+            if hi - lo <= max_points:
+                return "raw"
+        else:
+            return "raw"
+
+        span = min(end, self._state[series]["last"] + 1) - max(start, 0.0)
+        if span / RESOLUTIONS["1m"] <= max_points:
+            return "1m"
+        return "1h"
+
+    def _read_range(self, path: str, record: struct.Struct, start: float, end: float) -> List[tuple]:
+        """Records with start <= timestamp < end from a sorted record file"""
+        if not os.path.exists(path):
+            return []
+        count = os.path.getsize(path) // record.size
+        with open(path, 'rb') as f:
+            lo = self._bisect(f, record.size, count, start)
+            hi = self._bisect(f, record.size, count, end) if end != math.inf else count
+            if hi <= lo:
+                return []
+            f.seek(lo * record.size)
+            return list(record.iter_unpack(f.read((hi - lo) * record.size)))
+
+    @staticmethod
+    def _bisect(f, size: int, count: int, timestamp: float) -> int:
+        """Index of the first record with a timestamp >= the given one"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid * size)
+            if struct.unpack('<d', f.read(8))[0] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @staticmethod
+    def _rollup_point(record: tuple) -> Dict:
+        start, count, lost, low, high, total = record
+        received = count - lost
+        return {
+            "time": start,
+            "count": count,
+            "lost": lost,
+            "loss_percent": round(lost / count * 100, 2) if count else 0.0,
+            "min": round(low, 3) if received else None,
+            "max": round(high, 3) if received else None,
+            "avg": round(total / received, 3) if received else None
+        }
+
+    def _path(self, series: Tuple[str, str], kind: str) -> str:
+        target, metric = series
+        return os.path.join(self.root, f"{quote(target, safe='')}.{metric}.{kind}")
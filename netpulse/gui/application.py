@@ -12,6 +12,7 @@ from netpulse.core.network_tools import NetworkTools
 from netpulse.gui.theme import apply_modern_theme, ModernTheme
 from netpulse.automation.device_manager import DeviceManager
 from netpulse.core.config_manager import ConfigManager
+from netpulse.core.timeseries import TimeSeriesStore
 
 class NetPulseApplication:
     """Modern NetPulse GUI with tabbed interface and enhanced features"""
@@ -19,7 +20,8 @@ class NetPulseApplication:
     def __init__(self, root):
         self.root = root
         self.config = ConfigManager()
-        self.network_tools = NetworkTools()
+        self.network_tools = NetworkTools(
+            timeseries=TimeSeriesStore(os.path.join(self.config.data_dir, 'timeseries')))
         self.automate = None
         
         # Initialize automation if DB config exists OR credentials are available
@@ -121,6 +123,7 @@ class NetPulseApplication:
         menubar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="Network Interfaces", command=self._show_network_interfaces)
         tools_menu.add_command(label="Clear History", command=self._clear_history)
+        tools_menu.add_command(label="Compact History", command=self._compact_history)
         tools_menu.add_command(label="Clear Output", command=self._clear_output)
         
         # Help menu
@@ -475,6 +478,9 @@ Your credentials will be stored securely and encrypted."""
                                       values=["running", "startup", "mcu", "full"], 
                                       state="readonly", width=15)
             backup_combo.grid(row=0, column=1)
+            self.backup_incremental_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(self.automation_params_frame, text="Only changed files",
+                           variable=self.backup_incremental_var).grid(row=0, column=2, padx=(10, 0))
     
     def _on_automation_command_change(self, event=None):
         """Handle automation command selection change"""
@@ -493,6 +499,20 @@ Your credentials will be stored securely and encrypted."""
         ttk.Button(control_frame, text="Clear History", style="Danger.TButton",
                   command=self._clear_history).pack(side="left", padx=(0, 10))
         ttk.Button(control_frame, text="Export History", command=self._export_history).pack(side="left", padx=(0, 10))
+        ttk.Button(control_frame, text="View Output", command=self._view_history_output).pack(side="left", padx=(0, 10))
+        
+        # Full-text search over command, parameters and output
+        self.history_search_var = tk.StringVar()
+        search_entry = ttk.Entry(control_frame, textvariable=self.history_search_var, width=30)
+        search_entry.pack(side="right")
+        ttk.Label(control_frame, text="Search:").pack(side="right", padx=(0, 5))
+        search_entry.bind("<KeyRelease>", self._on_history_search)
+        
+        # Rows are loaded a page at a time as the list is scrolled
+        self.history_page_size = 200
+        self._history_last_id = None
+        self._history_exhausted = False
+        self._history_search_job = None
         
         # History treeview
         tree_frame = ttk.Frame(history_frame)
@@ -515,14 +535,15 @@ Your credentials will be stored securely and encrypted."""
         self.history_tree.column("duration", width=80)
         
         # Scrollbar for history tree
-        history_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=history_scrollbar.set)
+        self.history_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=self._on_history_scroll)
         
         self.history_tree.pack(side="left", fill="both", expand=True)
-        history_scrollbar.pack(side="right", fill="y")
+        self.history_scrollbar.pack(side="right", fill="y")
         
-        # Bind double-click to execute command
+        # Bind double-click to execute command, Enter to show the stored output
         self.history_tree.bind("<Double-1>", self._on_history_double_click)
+        self.history_tree.bind("<Return>", lambda event: self._view_history_output())
         
         # Load initial history
         self._refresh_history()
@@ -686,7 +707,8 @@ Your credentials will be stored securely and encrypted."""
                 count = int(self.ping_count_var.get()) if not continuous else 4
                 
                 if continuous:
-                    result = self.network_tools.ping(params, continuous=True, callback=self._live_output_basic)
+                    result = self.network_tools.ping(params, continuous=True, callback=self._live_output_basic,
+                                                     stats_every=10)
                 else:
                     result = self.network_tools.ping(params, count=count)
                     
@@ -720,7 +742,7 @@ Your credentials will be stored securely and encrypted."""
             # Add to history (if not stopped)
             if not self.stop_requested and result.get('success', False):
                 self.config.add_to_history(command, params, execution_time, result.get('success', False), 
-                                         self.network_tools.format_output(result))
+                                         self.network_tools.format_output(result), result=result)
             
         except Exception as e:
             error_result = {"error": str(e), "success": False}
@@ -812,6 +834,7 @@ Your credentials will be stored securely and encrypted."""
                     raise ValueError("Target is required for port scan")
                 
                 result = self.network_tools.port_scan(target, ports, timeout, self._live_output_advanced)
+                params = f"{target} {ports}"
                 
             elif command == "Network Discovery":
                 network = self.network_discovery_target_var.get().strip()
@@ -821,6 +844,7 @@ Your credentials will be stored securely and encrypted."""
                     raise ValueError("Network is required for discovery")
                 
                 result = self.network_tools.network_discovery(network, timeout, self._live_output_advanced)
+                params = network
                 
             elif command == "Bandwidth Test":
                 target = self.bandwidth_test_target_var.get().strip()
@@ -830,18 +854,26 @@ Your credentials will be stored securely and encrypted."""
                     raise ValueError("Target is required for bandwidth test")
                 
                 result = self.network_tools.bandwidth_test(target, duration, self._live_output_advanced)
+                params = target
                 
             elif command == "Network Interfaces":
                 result = self.network_tools.get_network_interfaces()
+                params = None
                 
             else:
                 result = {"error": "Unknown command"}
+                params = None
             
             execution_time = time.time() - start_time
             
             # Update UI in main thread
             self.root.after(0, self._display_advanced_result, result, execution_time)
             
+            # Add scans and tests to history with their structured results
+            if params is not None and result.get('success', False):
+                self.config.add_to_history(command.lower(), params, execution_time, True,
+                                           self.network_tools.format_output(result), result=result)
+            
         except Exception as e:
             error_result = {"error": str(e), "success": False}
             execution_time = time.time() - start_time
@@ -911,7 +943,8 @@ Your credentials will be stored securely and encrypted."""
                 result = self.automate.connect_devices(marker)
             elif command == "backup config":
                 backup_type = getattr(self, 'backup_type_var', tk.StringVar(value="running")).get()
-                result = self.automate.backup_config(marker, backup_type)
+                incremental = getattr(self, 'backup_incremental_var', tk.BooleanVar(value=False)).get()
+                result = self.automate.backup_config(marker, backup_type, incremental)
             elif command == "pai-pl version":
                 result = self.automate.show_pai_version(marker)
             elif command == "data management":
@@ -1145,8 +1178,18 @@ Your credentials will be stored securely and encrypted."""
         for item in self.history_tree.get_children():
             self.history_tree.delete(item)
         
-        # Load history from database
-        history = self.config.get_history()
+        self._history_last_id = None
+        self._history_exhausted = False
+        self._load_history_page()
+    
+    def _load_history_page(self):
+        """Append the next page of history (or search results) to the tree"""
+        if self._history_exhausted:
+            return
+        
+        query = self.history_search_var.get().strip()
+        history = self.config.search_history(query, limit=self.history_page_size,
+                                             before_id=self._history_last_id)
         
         for entry in history:
             timestamp = entry['timestamp']
@@ -1155,7 +1198,66 @@ Your credentials will be stored securely and encrypted."""
             status = "Success" if entry['success'] else "Failed"
             duration = f"{entry['execution_time']:.2f}" if entry['execution_time'] else "N/A"
             
-            self.history_tree.insert("", "end", values=(timestamp, command, parameters, status, duration))
+            self.history_tree.insert("", "end", iid=str(entry['id']),
+                                     values=(timestamp, command, parameters, status, duration))
+        
+        if history:
+            self._history_last_id = history[-1]['id']
+        self._history_exhausted = len(history) < self.history_page_size
+    
+    def _on_history_scroll(self, first, last):
+        """Update the scrollbar and load more rows when the end of the list comes into view"""
+        self.history_scrollbar.set(first, last)
+        if float(last) >= 0.95 and not self._history_exhausted:
+            self.root.after_idle(self._load_history_page)
+    
+    def _on_history_search(self, event=None):
+        """Re-run the history query shortly after the user stops typing"""
+        if self._history_search_job:
+            self.root.after_cancel(self._history_search_job)
+        self._history_search_job = self.root.after(250, self._run_history_search)
+    
+    def _run_history_search(self):
+        self._history_search_job = None
+        self._refresh_history()
+    
+    def _view_history_output(self):
+        """Show the stored output of the selected history entry"""
+        selection = self.history_tree.selection()
+        if not selection:
+            messagebox.showwarning("Warning", "Please select a history entry.")
+            return
+        
+        item = self.history_tree.item(selection[0])
+        output = self.config.get_history_output(int(selection[0]))
+        if output is None:
+            messagebox.showwarning("Warning", "This history entry no longer exists.")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"{item['values'][1]} {item['values'][2]} - {item['values'][0]}")
+        dialog.geometry("800x500")
+        dialog.configure(bg=ModernTheme.COLORS['bg_primary'])
+        dialog.transient(self.root)
+        
+        output_text = tk.Text(
+            dialog,
+            wrap="word",
+            bg=ModernTheme.COLORS['bg_secondary'],
+            fg=ModernTheme.COLORS['text_primary'],
+            font=ModernTheme.FONTS['mono'],
+            relief="flat",
+            borderwidth=0,
+            padx=10,
+            pady=10
+        )
+        scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=output_text.yview)
+        output_text.configure(yscrollcommand=scrollbar.set)
+        output_text.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        output_text.insert(tk.END, output or "(no output recorded)")
+        output_text.configure(state="disabled")
     
     def _refresh_favorites(self):
         """Refresh favorites list"""
@@ -1176,6 +1278,14 @@ Your credentials will be stored securely and encrypted."""
             self._refresh_history()
             messagebox.showinfo("Success", "Command history cleared.")
     
+    def _compact_history(self):
+        """Compress large stored outputs and shrink the history database"""
+        try:
+            compressed = self.config.compact_history()
+            messagebox.showinfo("Success", f"History compacted ({compressed} outputs compressed).")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to compact history: {str(e)}")
+    
     def _export_history(self):
         """Export command history"""
         file_path = filedialog.asksaveasfilename(
@@ -1211,7 +1321,7 @@ Your credentials will be stored securely and encrypted."""
     def _export_history_csv(self, file_path: str):
         """Export history to CSV"""
         try:
-            history = self.config.get_history()
+            history = self.config.iter_history(include_output=False)
             with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
                 fieldnames = ['timestamp', 'command', 'parameters', 'success', 'execution_time']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
@@ -1242,7 +1352,11 @@ Your credentials will be stored securely and encrypted."""
         if selection:
             item = self.history_tree.item(selection[0])
             command = item['values'][1]
-            parameters = item['values'][2]
+            parameters = str(item['values'][2])
+            
+            if command.title() in ("Port Scan", "Network Discovery", "Bandwidth Test"):
+                self._load_advanced_command(command.title(), parameters)
+                return
             
             # Set the command in basic tools
             self.basic_command_var.set(command.title())
@@ -1251,6 +1365,24 @@ Your credentials will be stored securely and encrypted."""
             # Switch to basic tools tab
             self.notebook.select(0)
     
+    def _load_advanced_command(self, command: str, parameters: str):
+        """Fill the advanced tools tab with a command from history"""
+        self.advanced_command_var.set(command)
+        self._on_advanced_command_change()
+        
+        if command == "Port Scan":
+            target, _, ports = parameters.partition(" ")
+            self.port_scan_target_var.set(target)
+            if ports:
+                self.port_scan_ports_var.set(ports)
+        elif command == "Network Discovery":
+            self.network_discovery_target_var.set(parameters)
+        else:
+            self.bandwidth_test_target_var.set(parameters)
+        
+        # Switch to advanced tools tab
+        self.notebook.select(1)
+    
     def _on_favorites_double_click(self, event):
         """Handle double-click on favorites item"""
         selection = self.favorites_tree.selection()
@@ -0,0 +1,20 @@
+"""
+Shared fixtures for the NetPulse tests
+"""
+
+import pytest
+
+from netpulse.core.network_tools import NetworkTools
+from netpulse.core.timeseries import TimeSeriesStore
+
+
+@pytest.fixture
+def timeseries(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / "timeseries"), flush_every=1)
+    yield store
+    store.flush()
+
+
+@pytest.fixture
+def tools(timeseries):
+    return NetworkTools(timeseries=timeseries)
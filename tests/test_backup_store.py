@@ -0,0 +1,69 @@
+"""
+Tests for the content-addressed backup store
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from netpulse.automation.backup_store import BackupStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(root=str(tmp_path / "backups"), db_path=str(tmp_path / "netpulse.db"))
+
+
+def test_identical_content_is_stored_once(store, tmp_path):
+    config = b"MCU_ENABLE=true\nMCU_TIMEOUT=30\n" * 100
+    path = tmp_path / "CONFIGURATION"
+    path.write_bytes(config)
+
+    first = store.add_file(str(path), "PL01", "Mcu", "mcu_config")
+    second = store.add_bytes(config, "PL02", "Mcu", "mcu_config")
+
+    assert first["sha256"] == second["sha256"] == hashlib.sha256(config).hexdigest()
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert store.read(first["sha256"]) == config
+
+    stats = store.stats()
+    assert stats["entries"] == 2 and stats["blobs"] == 1
+    assert stats["logical_bytes"] == 2 * len(config)
+    assert stats["stored_bytes"] < len(config)
+
+
+def test_latest_and_history_order(store):
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    for day, content in enumerate([b"v1", b"v2", b"v3"]):
+        store.add_bytes(content, "PL01", "Mcu", "mcu_config", backup_time=base + timedelta(days=day))
+    store.add_bytes(b"other", "PL02", "Mcu", "mcu_config", backup_time=base)
+
+    latest = store.latest("PL01", "Mcu", "mcu_config")
+    assert store.read(latest["sha256"]) == b"v3"
+    assert [store.read(e["sha256"]) for e in store.history(marker="PL01")] == [b"v3", b"v2", b"v1"]
+    assert len(store.history(since=base + timedelta(days=1))) == 2
+
+    per_device = store.latest_per_device("mcu_config")
+    assert [(e["marker"], store.read(e["sha256"])) for e in per_device] == [("PL01", b"v3"), ("PL02", b"other")]
+
+
+def test_prune_removes_orphaned_blobs(store):
+    old = datetime(2020, 1, 1)
+    kept = store.add_bytes(b"keep", "PL01", "Mcu", "mcu_config")
+    dropped = store.add_bytes(b"drop", "PL01", "Mcu", "running_config", backup_time=old)
+
+    result = store.prune(keep_after=datetime(2021, 1, 1))
+
+    assert result == {"entries": 1, "blobs": 1}
+    assert store.has_blob(kept["sha256"])
+    assert not store.has_blob(dropped["sha256"])
+    with pytest.raises(FileNotFoundError):
+        store.read(dropped["sha256"])
+def test_add_existing_records_without_data(store):
+    stored = store.add_bytes(b"unchanged", "PL01", "Mcu", "mcu_config")
+
+    again = store.add_existing(stored["sha256"], "PL01", "Mcu", "mcu_config")
+    assert again["deduplicated"] and again["bytes"] == len(b"unchanged")
+    assert store.stats()["entries"] == 2
+    assert store.add_existing("0" * 64, "PL01", "Mcu", "mcu_config") is None
@@ -0,0 +1,66 @@
+"""
+Tests for the key=value config diff engine and fleet index
+"""
+
+from netpulse.automation.config_diff import (ConfigIndex, apply_config_updates, diff_configs,
+                                             diff_keys, parse_config)
+
+OLD = "# MCU config\nMCU_ENABLE=true\nMCU_TIMEOUT = 30\n; legacy\nMCU_DEBUG=false\nnot a setting\n"
+NEW = "# MCU config\nMCU_ENABLE=true\nMCU_TIMEOUT=60\nMCU_LOG_LEVEL=INFO\n"
+
+
+def test_parse_config_skips_comments_and_keeps_last_value():
+    assert parse_config(OLD) == {"MCU_ENABLE": "true", "MCU_TIMEOUT": "30", "MCU_DEBUG": "false"}
+    assert parse_config("A=1\nA=2\n") == {"A": "2"}
+    assert parse_config("URL=http://x/?a=b") == {"URL": "http://x/?a=b"}
+
+
+def test_diff_keys_and_configs():
+    keys = diff_keys(parse_config(OLD), parse_config(NEW))
+    assert keys == {"added": {"MCU_LOG_LEVEL": "INFO"},
+                    "removed": {"MCU_DEBUG": "false"},
+                    "changed": {"MCU_TIMEOUT": ("30", "60")}}
+
+    diff = diff_configs(OLD, NEW, "old", "new")
+    assert not diff["identical"]
+    assert "-MCU_TIMEOUT = 30" in diff["line_diff"]
+    assert "+MCU_TIMEOUT=60" in diff["line_diff"]
+    assert diff_configs(OLD, OLD)["line_diff"] == ""
+
+
+def test_apply_config_updates_keeps_other_lines_and_endings():
+    text = "A=1\r\nB=2\r\n# A=comment\r\nC=3"
+    updated, found = apply_config_updates(text, {"A": "10", "C": "30", "D": "4"})
+    assert updated == "A=10\r\nB=2\r\n# A=comment\r\nC=30"
+    assert found == {"A": True, "C": True, "D": False}
+
+
+def test_config_index_reports_drift():
+    index = ConfigIndex()
+    index.add(("PL01", "Mcu"), {"A": "1", "B": "2"})
+    index.add(("PL02", "Mcu"), {"A": "1", "B": "3"})
+    index.add(("PL03", "Mcu"), {"A": "1", "C": "9"})
+
+    assert index.devices_with("A", "1") == {("PL01", "Mcu"), ("PL02", "Mcu"), ("PL03", "Mcu")}
+    assert index.value_counts("B") == {"2": 1, "3": 1}
+
+    baseline = {"A": "1", "B": "2"}
+    assert index.differing_from(baseline) == {
+        ("PL02", "Mcu"): {"B": ("2", "3")},
+        ("PL03", "Mcu"): {"B": ("2", None)},
+    }
+    extra = index.differing_from(baseline, include_extra=True)
+    assert extra[("PL03", "Mcu")]["C"] == (None, "9")
+    assert index.differing_from(baseline, keys=["A"]) == {}
+
+
+def test_config_index_replace_and_remove():
+    index = ConfigIndex()
+    index.add("dev", {"A": "1"})
+    index.add("dev", {"A": "2"})
+    assert index.devices_with("A", "1") == set()
+    assert index.devices_with("A", "2") == {"dev"}
+
+    index.remove("dev")
+    assert index.value_counts("A") == {}
+    assert index._by_key == {}
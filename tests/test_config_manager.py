@@ -0,0 +1,268 @@
+"""
+Tests for ConfigManager's history storage
+"""
+
+import json
+import threading
+
+import pytest
+
+from netpulse.core.config_manager import ConfigManager
+
+
+@pytest.fixture
+def config(tmp_path):
+    manager = ConfigManager(str(tmp_path))
+    yield manager
+    manager.close()
+
+
+def _add(config, count, prefix="ping"):
+    for i in range(count):
+        config.add_to_history(prefix, f"10.0.0.{i}", execution_time=0.1, output=f"reply {i}")
+    config.flush_history()
+
+
+def test_history_is_written_in_the_background(config):
+    _add(config, 25)
+    history = config.get_history(limit=100)
+    assert len(history) == 25
+    assert history[0]["parameters"] == "10.0.0.24"
+    assert config._history_writer.is_alive()
+
+
+def test_connection_is_wal_mode(config):
+    assert config._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_retention_is_enforced(config):
+    config.settings["max_history_entries"] = 10
+    config.HISTORY_TRIM_INTERVAL = 0
+    _add(config, 30)
+    assert len(config.get_history(limit=100)) == 10
+
+
+def test_failed_batch_is_retried_row_by_row(config, monkeypatch):
+    original = config._insert_history_row
+
+    def insert(conn, row, packed, structure):
+        if row[1] == "bad":
+            raise ValueError("broken row")
+        original(conn, row, packed, structure)
+
+    monkeypatch.setattr(config, "_insert_history_row", insert)
+    for parameters in ("a", "bad", "b"):
+        config.add_to_history("ping", parameters)
+    config.flush_history()
+    assert sorted(entry["parameters"] for entry in config.get_history()) == ["a", "b"]
+
+
+def test_writer_survives_unexpected_errors(config, monkeypatch):
+    def explode(output):
+        raise RuntimeError("codec failure")
+
+    monkeypatch.setattr(config, "_pack_output", explode)
+    config.add_to_history("ping", "lost")
+    config.flush_history()
+    monkeypatch.undo()
+
+    writer = config._history_writer
+    config.add_to_history("ping", "kept")
+    config.flush_history()
+    assert config._history_writer is writer and writer.is_alive()
+    assert [entry["parameters"] for entry in config.get_history()] == ["kept"]
+
+
+def test_exit_flush_is_registered_once(config, monkeypatch):
+    from netpulse.core import config_manager
+
+    registered = []
+    monkeypatch.setattr(config_manager.atexit, "register", registered.append)
+    config.add_to_history("ping", "first")
+    config.flush_history()
+    # A writer that died is replaced on the next row
+    config._history_writer = None
+    config.add_to_history("ping", "second")
+    config.flush_history()
+    assert registered == [config.flush_history]
+
+
+def test_reads_wait_for_the_writer_only_briefly(config, monkeypatch):
+    release = threading.Event()
+    original = config._insert_history_row
+
+    def slow_insert(*args):
+        release.wait(5)
+        original(*args)
+
+    monkeypatch.setattr(config, "_insert_history_row", slow_insert)
+    config.READ_FLUSH_TIMEOUT = 0.05
+    assert config.add_to_history("ping", "queued") == 0
+    assert config.flush_history(timeout=0.05) is False
+    assert config.get_history() == []
+
+    release.set()
+    assert config.flush_history(timeout=5) is True
+    assert [entry["parameters"] for entry in config.get_history()] == ["queued"]
+
+
+def test_connections_of_exited_threads_are_closed(config):
+    connections = []
+    worker = threading.Thread(target=lambda: connections.append(config._connection()))
+    worker.start()
+    worker.join()
+
+    assert any(conn is connections[0] for _, conn in config._connections)
+    config._close_dead_connections()
+    assert all(conn is not connections[0] for _, conn in config._connections)
+    with pytest.raises(Exception):
+        connections[0].execute("SELECT 1")
+
+
+def test_keyset_pages_cover_every_row_once(config):
+    _add(config, 23)
+    first = config.get_history(limit=10, include_output=False)
+    assert "output" not in first[0]
+    assert first[0]["output_size"] == len("reply 22")
+
+    ids, before_id = [], None
+    while True:
+        page = config.get_history(limit=10, before_id=before_id, include_output=False)
+        ids += [entry["id"] for entry in page]
+        if len(page) < 10:
+            break
+        before_id = page[-1]["id"]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 23
+    assert [entry["id"] for entry in config.iter_history(batch_size=4)] == ids
+
+
+def test_output_is_loaded_on_demand(config):
+    _add(config, 1)
+    entry = config.get_history(include_output=False)[0]
+    assert config.get_history_output(entry["id"]) == "reply 0"
+    assert config.get_history_output(entry["id"] + 1) is None
+
+
+def test_full_text_search(config):
+    assert config.fts_enabled
+    config.add_to_history("port_scan", "192.168.1.1", output="22/tcp open ssh")
+    config.add_to_history("ping", "192.168.1.2", output="64 bytes from 192.168.1.2")
+    config.add_to_history("traceroute", "example.org", output="hop 1 gateway")
+
+    assert [e["command"] for e in config.search_history("ssh")] == ["port_scan"]
+    assert [e["command"] for e in config.search_history("192.168")] == ["ping", "port_scan"]
+    assert [e["command"] for e in config.search_history("gate")] == ["traceroute"]
+    assert config.search_history('open "quoted') == []
+    assert len(config.search_history("")) == 3
+
+    newest = config.search_history("192.168")[0]
+    assert [e["command"] for e in config.search_history("192.168", before_id=newest["id"])] == \
+        ["port_scan"]
+
+
+def test_search_index_follows_retention(config):
+    config.settings["max_history_entries"] = 2
+    config.HISTORY_TRIM_INTERVAL = 0
+    for name in ("alpha", "beta", "gamma"):
+        config.add_to_history("ping", name, output=name)
+        config.flush_history()
+    assert config.search_history("alpha") == []
+    assert [e["parameters"] for e in config.search_history("gamma")] == ["gamma"]
+
+
+def test_search_without_fts_uses_like(config):
+    config.fts_enabled = False
+    _add(config, 3)
+    assert [e["parameters"] for e in config.search_history("reply 2")] == ["10.0.0.2"]
+
+
+def _big_output(lines=2000):
+    return "\n".join(f"{port}/tcp closed" for port in range(1, lines))
+
+
+def test_large_outputs_are_compressed(config):
+    output = _big_output()
+    config.add_to_history("port_scan", "10.0.0.1", output=output)
+    config.add_to_history("ping", "10.0.0.2", output="short")
+    config.flush_history()
+
+    conn = config._connection()
+    stored = conn.execute("SELECT output FROM command_history WHERE command = 'port_scan'").fetchone()
+    assert stored[0] is None
+    codec, size, data = conn.execute(
+        "SELECT codec, size, data FROM command_history_output").fetchone()
+    assert (codec, size) == ("zlib", len(output.encode()))
+    assert len(data) < size / 5
+
+    entries = {e["command"]: e for e in config.get_history()}
+    assert entries["port_scan"]["output"] == output
+    assert entries["ping"]["output"] == "short"
+    assert config.search_history("closed")[0]["output_size"] == len(output.encode())
+
+
+def test_small_or_incompressible_output_stays_text(config):
+    assert config._pack_output("") == ("", None)
+    small = "x" * (config.OUTPUT_COMPRESS_THRESHOLD - 1)
+    assert config._pack_output(small) == (small, None)
+
+    # Level 0 only stores, so the "compressed" data is never smaller
+    config.OUTPUT_COMPRESS_LEVEL = 0
+    output = _big_output()
+    assert config._pack_output(output) == (output, None)
+
+
+def test_compact_history_compresses_old_rows(config):
+    output = _big_output()
+    config.OUTPUT_COMPRESS_THRESHOLD = 10 ** 9
+    config.add_to_history("port_scan", "10.0.0.1", output=output)
+    config.flush_history()
+    config.OUTPUT_COMPRESS_THRESHOLD = ConfigManager.OUTPUT_COMPRESS_THRESHOLD
+
+    assert config.compact_history() == 1
+    assert config.compact_history() == 0
+    assert config.get_history()[0]["output"] == output
+
+
+def test_export_streams_decompressed_history(config, tmp_path):
+    output = _big_output()
+    config.add_to_history("port_scan", "10.0.0.1", output=output)
+    _add(config, 2)
+    path = tmp_path / "history.json"
+    assert config.export_data(str(path))
+    exported = json.loads(path.read_text())
+    assert [e["parameters"] for e in exported] == ["10.0.0.1", "10.0.0.0", "10.0.0.1"]
+    assert exported[-1]["output"] == output
+
+    config.clear_history()
+    assert config.export_data(str(path))
+    assert json.loads(path.read_text()) == []
+
+
+def test_structured_results_are_queryable(config):
+    scan = {"host": "10.0.0.1", "success": True, "open_ports": [{"port": 22, "service": "ssh"}],
+            "output": "22/tcp open"}
+    config.add_to_history("port_scan", "10.0.0.1", output=scan["output"], result=scan)
+    config.add_to_history("ping", "10.0.0.2", success=False,
+                          result={"host": "10.0.0.2", "statistics": {"loss_percent": 100}})
+    config.add_to_history("ping", "text only", output="no result")
+    config.flush_history()
+
+    results = config.query_results()
+    assert sorted(r["command"] for r in results) == ["ping", "port_scan"]
+    assert config.query_results(success=False)[0]["loss_percent"] == 100.0
+    assert config.query_results(host="10.0.0.1")[0]["success"] == 1
+
+    items = config.query_result_items(host="10.0.0.1", port=22)
+    assert [(i["port"], i["name"]) for i in items] == [(22, "ssh")]
+    assert config.query_result_items(since="2000-01-01 00:00:00", until="2000-01-02 00:00:00") == []
+
+    entry_id = items[0]["history_id"]
+    assert config.get_result(entry_id) == {key: value for key, value in scan.items() if key != "output"}
+    assert config.get_result(entry_id + 2) is None
+
+
+def test_unstructurable_result_keeps_the_history_row(config):
+    config.add_to_history("port_scan", "10.0.0.1", result={"open_ports": [{"service": "ssh"}]})
+    config.flush_history()
+    assert len(config.get_history()) == 1
+    assert config.query_results() == []
@@ -0,0 +1,80 @@
+"""
+Tests for cron expressions and interval strings
+"""
+
+from datetime import datetime
+
+import pytest
+
+from netpulse.automation.cron import CronSchedule, parse_interval
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (90, 90.0), ("90", 90.0), ("30s", 30.0), ("5m", 300.0), ("1h30m", 5400.0),
+    ("1d", 86400.0), ("2w", 1209600.0), ("1.5h", 5400.0), (" 1H 30M ", 5400.0),
+])
+def test_parse_interval(value, seconds):
+    assert parse_interval(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "5x", "m5", "1h-30m", 0, "0s", -3])
+def test_parse_interval_rejects(value):
+    with pytest.raises(ValueError):
+        parse_interval(value)
+
+
+def _next(expression, after):
+    return CronSchedule(expression).next_after(datetime(*after))
+
+
+def test_next_is_strictly_after():
+    assert _next("*/15 * * * *", (2024, 1, 1, 10, 15, 30)) == datetime(2024, 1, 1, 10, 30)
+    assert _next("30 9 * * *", (2024, 1, 1, 9, 30)) == datetime(2024, 1, 2, 9, 30)
+
+
+def test_aliases_and_names():
+    assert _next("@hourly", (2024, 1, 1, 10, 5)) == datetime(2024, 1, 1, 11, 0)
+    assert _next("@weekly", (2024, 1, 1, 0, 0)) == datetime(2024, 1, 7, 0, 0)
+    assert _next("@yearly", (2024, 6, 1, 0, 0)) == datetime(2025, 1, 1, 0, 0)
+    assert _next("0 8 * jun mon-fri", (2024, 1, 1, 0, 0)) == datetime(2024, 6, 3, 8, 0)
+    assert CronSchedule("0 0 * * 7").weekdays == [0]
+
+
+def test_ranges_steps_and_lists():
+    schedule = CronSchedule("5/20 1-5/2 * * *")
+    assert schedule.minutes == [5, 25, 45]
+    assert schedule.hours == [1, 3, 5]
+    assert CronSchedule("0,30 * 1,15 * *").days == [1, 15]
+
+
+def test_both_day_fields_restricted_match_either():
+    # The 13th or any Friday
+    schedule = CronSchedule("0 0 13 * fri")
+    assert schedule.next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 6)
+    assert schedule.next_after(datetime(2024, 9, 12)) == datetime(2024, 9, 13)
+
+
+def test_star_step_does_not_restrict_the_day():
+    # Vixie cron: '*/2' starts with '*', so only the weekday field restricts
+    schedule = CronSchedule("0 0 */2 * 1")
+    assert schedule.next_after(datetime(2024, 9, 1)) == datetime(2024, 9, 2)
+    assert schedule.next_after(datetime(2024, 9, 2)) == datetime(2024, 9, 9)
+    assert CronSchedule("0 0 1 * */2").next_after(datetime(2024, 9, 1)) == datetime(2024, 10, 1)
+
+
+def test_leap_day():
+    assert _next("0 0 29 2 *", (2025, 3, 1, 0, 0)) == datetime(2028, 2, 29, 0, 0)
+
+
+def test_impossible_date_is_reported():
+    with pytest.raises(ValueError):
+        _next("0 0 30 2 *", (2024, 1, 1, 0, 0))
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *", "60 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8",
+    "*/0 * * * *", "5-1 * * * *", "* * * foo *",
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
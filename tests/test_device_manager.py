@@ -0,0 +1,430 @@
+"""
+Tests for DeviceManager logic that doesn't need a database or devices
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+import pytest
+
+device_manager = pytest.importorskip("netpulse.automation.device_manager", exc_type=ImportError)
+DeviceManager = device_manager.DeviceManager
+
+
+@pytest.fixture
+def manager():
+    """A DeviceManager without database, credentials or network access"""
+    mgr = DeviceManager.__new__(DeviceManager)
+    mgr.max_parallel_devices = 8
+    mgr.device_timeout = 60
+    mgr.operation_deadline = 300
+    mgr._device_slots = threading.BoundedSemaphore(64)
+    mgr._scoped_slots = threading.local()
+    return mgr
+
+
+def _devices(count):
+    return [{"role": f"role{i}", "ip": f"10.0.0.{i}"} for i in range(count)]
+
+
+def test_fan_out_runs_concurrently_and_keeps_order(manager):
+    running = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def work(device):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return device["ip"]
+
+    results = manager._fan_out(_devices(6), work, lambda e: str(e), max_workers=3)
+
+    assert list(results) == [f"role{i}" for i in range(6)]
+    assert list(results.values()) == [f"10.0.0.{i}" for i in range(6)]
+    assert running["peak"] == 3
+
+
+def test_fan_out_reports_errors_and_timeouts(manager):
+    def work(device):
+        if device["ip"].endswith(".1"):
+            raise RuntimeError("boom")
+        if device["ip"].endswith(".2"):
+            time.sleep(1)
+        return "ok"
+
+    results = manager._fan_out(_devices(3), work, lambda e: f"error: {e}", device_timeout=0.2)
+
+    assert results["role0"] == "ok"
+    assert results["role1"] == "error: boom"
+    assert "did not respond" in results["role2"]
+
+
+def test_device_limit_is_scoped_to_calling_thread(manager):
+    seen = {}
+
+    def work(device):
+        seen[threading.current_thread().name] = True
+        return "ok"
+
+    scoped = threading.BoundedSemaphore(1)
+    global_slots = manager._device_slots
+
+    with manager.device_limit(scoped):
+        assert manager._scoped_slots.slots is scoped
+        manager._fan_out(_devices(2), work, str)
+
+        # Other threads keep the manager's global limit
+        other = {}
+        thread = threading.Thread(target=lambda: other.update(
+            slots=getattr(manager._scoped_slots, "slots", None)))
+        thread.start()
+        thread.join()
+        assert other["slots"] is None
+
+    assert getattr(manager._scoped_slots, "slots", None) is None
+    assert manager._device_slots is global_slots
+
+
+def test_batch_runner_does_not_change_shared_manager_limit(manager):
+    from netpulse.automation.batch import BatchRunner
+
+    global_slots = manager._device_slots
+    used = []
+    manager.show_pai_version = lambda marker: used.append(manager._scoped_slots.slots) or {"success": True}
+    manager.prefetch_devices = lambda markers=None, pattern=None: {m: [] for m in markers}
+
+    runner = BatchRunner(manager, max_markers=2, max_devices=3)
+    summary = runner.run("show_pai_version", markers=["PL01", "PL02"])
+
+    assert summary["completed"] == 2
+    assert manager._device_slots is global_slots
+    assert used == [runner._device_slots, runner._device_slots]
+
+
+def test_resolve_markers_keeps_first_spelling_and_order(manager):
+    from netpulse.automation.batch import BatchRunner
+
+    manager.prefetch_devices = lambda markers=None, pattern=None: {"ABC": [], "XYZ": [], "A": []}
+    runner = BatchRunner(manager)
+    assert runner.resolve_markers(["A", "B", "a", "abc"], pattern="%") == ["A", "B", "abc", "XYZ"]
+
+
+class _Cursor:
+    description = [("PL",), ("IP_MCU",), ("IP_PAI",)]
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def execute(self, sql, *params):
+        self.queries.append((sql, params))
+        # SQL Server's default collation compares PL case-insensitively
+        wanted = {p.casefold() for p in params}
+        self.matched = [row for row in self.rows if row[0].casefold() in wanted or "LIKE" in sql]
+
+    def fetchall(self):
+        return self.matched
+
+    def close(self):
+        pass
+
+
+class _Pool:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def run(self, work):
+        return work(self)
+
+
+def test_prefetch_matches_markers_case_insensitively(manager, tmp_path):
+    from netpulse.automation.inventory_cache import InventoryCache
+
+    cursor = _Cursor([("PL01", "10.0.0.1", "10.0.0.2")])
+    manager.conn_str = "DSN=test"
+    manager.inventory = InventoryCache(str(tmp_path / "inv.db"))
+    manager._get_db_pool = lambda: _Pool(cursor)
+
+    resolved = manager.prefetch_devices(markers=["pl01", "PL02"])
+
+    devices = [{"role": "Mcu", "host": "10.0.0.1"}, {"role": "Pai", "host": "10.0.0.2"}]
+    assert resolved == {"pl01": devices, "PL02": []}
+    assert manager.inventory.get_devices("PL01") == devices
+    assert manager.inventory.get_devices("pl02") == []
+    assert manager._get_devices(" Pl01") == devices
+
+
+def test_marker_added_after_full_prefetch_is_looked_up_once(manager, tmp_path):
+    from netpulse.automation.inventory_cache import InventoryCache
+
+    cursor = _Cursor([("PL02", "10.0.0.3", "10.0.0.4")])
+    manager.conn_str = "DSN=test"
+    manager.inventory = InventoryCache(str(tmp_path / "inv.db"))
+    manager.inventory.replace({"PL01": []})
+    manager._get_db_pool = lambda: _Pool(cursor)
+
+    assert [dev["host"] for dev in manager._get_devices("pl02")] == ["10.0.0.3", "10.0.0.4"]
+    assert manager._get_devices("PL99") == []
+    queries = len(cursor.queries)
+    assert manager._get_devices("PL99") == []
+    assert len(cursor.queries) == queries, "a confirmed miss is cached"
+
+
+def test_db_pool_is_rebuilt_after_close(manager, monkeypatch):
+    pool_class = device_manager.ODBCConnectionPool
+    monkeypatch.setattr(device_manager, "ODBCConnectionPool",
+                        lambda conn_str: pool_class(conn_str, warm=False))
+    manager.conn_str = "DSN=test"
+    manager.db_pool = None
+    manager._db_pool_lock = threading.Lock()
+    manager.ssh_pool = None
+    manager.http_probe = type("Probe", (), {"close": lambda self: None})()
+
+    pool = manager._get_db_pool()
+    assert manager._get_db_pool() is pool
+
+    manager.close()
+    assert pool.closed
+    assert manager.db_pool is None
+
+    rebuilt = manager._get_db_pool()
+    assert rebuilt is not pool and not rebuilt.closed
+
+    # A pool closed behind the manager's back is replaced too
+    rebuilt.close_all()
+    assert manager._get_db_pool() is not rebuilt
+
+
+class _LocalShell:
+    """Runs the batch script with the local shell instead of over SSH"""
+
+    def __init__(self):
+        self.scripts = []
+
+    def exec_command(self, host, command, timeout=10):
+        self.scripts.append(command)
+        done = subprocess.run(["sh", "-c", command], capture_output=True, text=True,
+                              timeout=timeout, cwd=tempfile.gettempdir())
+        return done.stdout.strip(), done.stderr.strip()
+
+
+def test_split_batch_output_sections(manager):
+    markers = ["__M_0__", "__M_1__", "__M_2__"]
+    text = "\n__M_0__\nfirst\nline two\n\n__M_1__\n\n__M_2__\nthird"
+    assert manager._split_batch_output(text, markers) == ["first\nline two", "", "third"]
+
+
+def test_ssh_batch_runs_commands_over_one_channel(manager):
+    manager.ssh_credentials = {"username": "admin"}
+    manager.ssh_pool = _LocalShell()
+
+    results = manager._ssh_batch("10.0.0.1", {
+        "hostname": "echo pl01-mcu",
+        "missing": "cat /nonexistent/file",
+        "no_newline": "printf partial",
+        "cd": "cd /",
+        "pwd": "pwd",
+    })
+
+    assert len(manager.ssh_pool.scripts) == 1
+    assert results["hostname"] == "pl01-mcu"
+    assert results["missing"].startswith("Command output: \nError: ")
+    assert "/nonexistent/file" in results["missing"]
+    assert results["no_newline"] == "partial"
+    # Each command runs in its own subshell
+    assert results["pwd"] == os.path.realpath(tempfile.gettempdir())
+    assert manager._is_command_error(results["missing"])
+    assert not manager._is_command_error(results["hostname"])
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("PL01", "PL01"),
+    ("Mcu Primary", "Mcu_Primary"),
+    ("..", "_"),
+    ("../../etc", "etc"),
+    ("a/b\\c", "a_b_c"),
+    ("", "_"),
+])
+def test_path_component_stays_inside_directory(name, expected):
+    component = DeviceManager._path_component(name)
+    assert component == expected
+    assert os.path.basename(os.path.join("backups", component)) == component
+
+
+class _FakeTransfer:
+    """Serves remote files from a dict instead of SFTP"""
+
+    def __init__(self, files):
+        self.files = files
+        self.requested = []
+
+    def download_many(self, host, files, callback=None):
+        import hashlib
+
+        results = {}
+        for remote, local in files.items():
+            self.requested.append(remote)
+            data = self.files[remote.split("-")[0]]
+            with open(local, "wb") as f:
+                f.write(data)
+            results[remote] = {"success": True, "local_file": local, "bytes": len(data),
+                               "sha256": hashlib.sha256(data).hexdigest()}
+        return results
+
+
+def test_full_backup_archive_lands_under_sanitized_path(manager, tmp_path):
+    from netpulse.automation.backup_store import BackupStore
+
+    manager._get_devices = lambda marker: [{"role": "../Mcu", "host": "10.0.0.1"}]
+    manager.backup_dir = str(tmp_path / "backups")
+    manager.backup_store = BackupStore(root=manager.backup_dir, db_path=str(tmp_path / "netpulse.db"))
+    manager.file_transfer = _FakeTransfer({"/tmp/running": b"hostname pl01\n",
+                                           "/tmp/full": b"archive"})
+    manager._ssh_batch = lambda host, commands, timeout=30: {name: "" for name in commands}
+
+    result = manager.backup_config("../PL01", "running")["backup_config"]["../Mcu"]
+
+    local_archive = result["archive"]["download"]["local_file"]
+    assert os.path.realpath(local_archive).startswith(os.path.realpath(manager.backup_dir) + os.sep)
+    assert os.path.join("archives", "PL01", "Mcu") in local_archive
+
+
+def test_incremental_backup_skips_unchanged_files(manager, tmp_path):
+    import hashlib
+    from netpulse.automation.backup_store import BackupStore
+
+    config = {"/tmp/CONFIGURATION": b"MCU_ENABLE=true\n"}
+    manager._get_devices = lambda marker: [{"role": "Mcu", "host": "10.0.0.1"}]
+    manager.backup_dir = str(tmp_path / "backups")
+    manager.backup_store = BackupStore(root=manager.backup_dir, db_path=str(tmp_path / "netpulse.db"))
+    manager.file_transfer = _FakeTransfer(config)
+
+    def ssh_batch(host, commands, timeout=30):
+        digest = hashlib.sha256(config["/tmp/CONFIGURATION"]).hexdigest()
+        return {name: digest if name.endswith(":sha256") else "" for name in commands}
+
+    manager._ssh_batch = ssh_batch
+
+    first = manager.backup_config("PL01", "mcu", incremental=True)["backup_config"]["Mcu"]
+    assert first["incremental"]["transferred"] == 1
+    assert first["mcu_config"]["download"]["stored"]["deduplicated"] is False
+
+    second = manager.backup_config("PL01", "mcu", incremental=True)["backup_config"]["Mcu"]
+    assert second["incremental"]["transferred"] == 0
+    assert second["incremental"]["unchanged"] == 1
+    assert second["mcu_config"]["download"]["skipped"]
+    assert len(manager.file_transfer.requested) == 1
+    stats = manager.backup_store.stats()
+    assert (stats["entries"], stats["blobs"]) == (2, 1)
+
+
+def test_config_index_only_reparses_changed_snapshots(manager, tmp_path, monkeypatch):
+    from netpulse.automation.backup_store import BackupStore
+
+    manager.backup_store = BackupStore(root=str(tmp_path / "backups"), db_path=str(tmp_path / "netpulse.db"))
+    manager._config_indexes = {}
+    manager._parsed_configs = {}
+    manager._config_index_lock = threading.RLock()
+
+    store = manager.backup_store
+    store.add_bytes(b"A=1\nB=2\n", "PL01", "Mcu", "mcu_config")
+    store.add_bytes(b"A=1\nB=2\n", "PL02", "Mcu", "mcu_config")
+    store.add_bytes(b"A=1\nB=3\n", "PL03", "Mcu", "mcu_config")
+
+    parsed = []
+    original = device_manager.parse_config
+    monkeypatch.setattr(device_manager, "parse_config", lambda text: parsed.append(text) or original(text))
+
+    drift = manager.config_drift("PL01", "Mcu")["config_drift"]
+    assert drift["differing"] == {"PL03/Mcu": {"B": ["2", "3"]}}
+    # Identical snapshots share one parse
+    assert len(parsed) == 2
+
+    store.add_bytes(b"A=1\nB=2\n", "PL03", "Mcu", "mcu_config")
+    drift = manager.config_drift("PL01", "Mcu")["config_drift"]
+    assert drift["differing"] == {}
+    assert len(parsed) == 2
+
+    store.add_bytes(b"A=5\nB=2\n", "PL02", "Mcu", "mcu_config")
+    drift = manager.config_drift("PL01", "Mcu", keys=["A"])["config_drift"]
+    assert drift["differing"] == {"PL02/Mcu": {"A": ["1", "5"]}}
+    assert len(parsed) == 3
+
+    # The baseline and the marker filter ignore case like the inventory
+    drift = manager.config_drift(" pl01", "Mcu", markers=["pl02"])["config_drift"]
+    assert drift["devices"] == 1
+    assert drift["differing"] == {"PL02/Mcu": {"A": ["1", "5"]}}
+
+
+class _LocalDevice:
+    """A device whose home directory is a local folder: SFTP via files, SSH via sh"""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.before_upload = None
+
+    def read_bytes(self, host, remote_path):
+        import hashlib
+
+        path = os.path.join(self.root, remote_path)
+        with open(path, "rb") as f:
+            data = f.read()
+        return {"success": True, "data": data, "sha256": hashlib.sha256(data).hexdigest(),
+                "mode": os.stat(path).st_mode}
+
+    def upload_bytes(self, host, data, remote_path, mode=None):
+        import hashlib
+
+        if self.before_upload:
+            self.before_upload()
+        with open(os.path.join(self.root, remote_path), "wb") as f:
+            f.write(data)
+        return {"success": True, "remote_file": remote_path, "bytes": len(data),
+                "sha256": hashlib.sha256(data).hexdigest()}
+
+    def exec_command(self, host, command, timeout=10):
+        done = subprocess.run(["sh", "-c", command], capture_output=True, text=True,
+                              timeout=timeout, cwd=self.root)
+        return done.stdout.strip(), done.stderr.strip()
+
+
+def test_config_transaction_swaps_file_atomically(manager, tmp_path):
+    (tmp_path / "CONFIGURATION").write_bytes(b"MCU_ENABLE=false\r\nMCU_TIMEOUT=30\r\n")
+    device = _LocalDevice(tmp_path)
+    manager.file_transfer = device
+    manager.ssh_pool = device
+    manager.ssh_credentials = {"username": "admin"}
+
+    result = manager._apply_config_transaction("10.0.0.1", {"MCU_ENABLE": "true", "MCU_MISSING": "1"})
+
+    assert "error" not in result
+    assert (tmp_path / "CONFIGURATION").read_bytes() == b"MCU_ENABLE=true\r\nMCU_TIMEOUT=30\r\n"
+    assert len(list(tmp_path.glob("CONFIGURATION.backup.*"))) == 1
+    assert not list(tmp_path.glob("CONFIGURATION.netpulse-*"))
+    assert result["key_changes"]["changed"] == {"MCU_ENABLE": ("false", "true")}
+    assert [u["update_result"] for u in result["updates_applied"]] == ["", "Key not found in CONFIGURATION"]
+
+
+def test_config_transaction_aborts_when_file_changed(manager, tmp_path):
+    config = tmp_path / "CONFIGURATION"
+    config.write_bytes(b"MCU_ENABLE=false\n")
+    device = _LocalDevice(tmp_path)
+    device.before_upload = lambda: config.write_bytes(b"MCU_ENABLE=maybe\n")
+    manager.file_transfer = device
+    manager.ssh_pool = device
+    manager.ssh_credentials = {"username": "admin"}
+
+    result = manager._apply_config_transaction("10.0.0.1", {"MCU_ENABLE": "true"})
+
+    assert "changed on the device" in result["error"]
+    assert config.read_bytes() == b"MCU_ENABLE=maybe\n"
+    assert not list(tmp_path.glob("CONFIGURATION.netpulse-*"))
@@ -0,0 +1,57 @@
+"""
+Tests for ping-based network discovery
+"""
+
+import threading
+
+from netpulse.core import network_tools
+
+
+class _Completed:
+    def __init__(self, returncode, stdout=""):
+        self.returncode = returncode
+        self.stdout = stdout
+
+
+def test_ping_discovery_streams_targets(tools, monkeypatch):
+    lock = threading.Lock()
+    state = {"produced": 0, "pinged": 0, "backlog": 0}
+
+    def fake_run(cmd, **kwargs):
+        ip = cmd[-1]
+        with lock:
+            state["pinged"] += 1
+        if ip.endswith(".7") or ip.endswith(".42"):
+            return _Completed(0, f"64 bytes from {ip}: icmp_seq=1 ttl=64 time=1.5 ms")
+        return _Completed(1)
+
+    def targets():
+        for i in range(1, 255):
+            with lock:
+                state["produced"] += 1
+                state["backlog"] = max(state["backlog"], state["produced"] - state["pinged"])
+            yield f"10.9.8.{i}"
+
+    monkeypatch.setattr(network_tools.subprocess, "run", fake_run)
+    monkeypatch.setattr(network_tools.socket, "gethostbyaddr", lambda ip: (f"host-{ip}", [], [ip]))
+
+    messages = []
+    alive = tools._discover_with_ping(targets(), timeout=1, callback=messages.append)
+
+    assert sorted(host["ip"] for host in alive) == ["10.9.8.42", "10.9.8.7"]
+    assert state["pinged"] == 254
+    # At most a queue's worth (2 per worker) plus one in hand per worker is outstanding
+    assert state["backlog"] <= 50 * 3 + 1
+    assert len(messages) == 2
+
+
+def test_network_discovery_ping_method(tools, monkeypatch):
+    monkeypatch.setattr(network_tools.subprocess, "run",
+                        lambda cmd, **kwargs: _Completed(0 if cmd[-1] == "192.168.50.2" else 1))
+    monkeypatch.setattr(network_tools.socket, "gethostbyaddr", lambda ip: ("gw", [], [ip]))
+
+    result = tools.network_discovery("192.168.50.0/29", timeout=1, method="ping")
+
+    assert result["success"]
+    assert result["hosts_scanned"] == 6
+    assert [host["ip"] for host in result["alive_hosts"]] == ["192.168.50.2"]
@@ -0,0 +1,43 @@
+"""
+Tests for chunked SFTP transfers
+"""
+
+import io
+import os
+
+from netpulse.automation.file_transfer import FileTransfer
+
+
+class FakeRemoteFile(io.BytesIO):
+    """SFTPFile stand-in that records prefetch windows"""
+
+    MAX_REQUEST_SIZE = 32768
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.windows = []
+
+    def prefetch(self, file_size=None, max_concurrent_requests=None):
+        self.windows.append((self.tell(), file_size, max_concurrent_requests))
+
+
+def test_reads_are_prefetched_one_window_at_a_time():
+    data = os.urandom(300 * 1024 + 7)
+    remote = FakeRemoteFile(data)
+    transfer = FileTransfer(ssh_pool=None, chunk_size=16384, max_requests=4)
+
+    chunks = list(transfer._read_chunks(remote, len(data)))
+
+    assert b"".join(chunks) == data
+    window = 4 * 32768
+    assert remote.windows == [(0, window, 4), (window, 2 * window, 4), (2 * window, len(data), 4)]
+    assert max(len(chunk) for chunk in chunks) <= 16384
+
+
+def test_reads_past_reported_size():
+    data = b"x" * 1000
+    remote = FakeRemoteFile(data)
+    transfer = FileTransfer(ssh_pool=None, chunk_size=256)
+
+    assert b"".join(transfer._read_chunks(remote, 0)) == data
+    assert remote.windows == []
@@ -0,0 +1,94 @@
+"""
+Tests for the background fleet reachability monitor
+"""
+
+import pytest
+
+fleet_monitor = pytest.importorskip("netpulse.automation.fleet_monitor", exc_type=ImportError)
+FleetMonitor = fleet_monitor.FleetMonitor
+
+
+class _Inventory:
+    def __init__(self, devices):
+        self.devices = devices
+
+    def all_devices(self):
+        return self.devices
+
+
+class _HTTPProbe:
+    max_concurrency = 4
+
+    def __init__(self, up):
+        self.up = up
+        self.probed = []
+
+    def probe(self, host):
+        self.probed.append(host)
+        if host in self.up:
+            return {"up": True, "status": 200, "latency_ms": 12.5, "method": "GET", "error": None}
+        return {"up": False, "status": None, "latency_ms": None, "method": "GET", "error": "ConnectTimeout"}
+
+
+class _Manager:
+    def __init__(self, devices, http_up):
+        self.inventory = _Inventory(devices)
+        self.http_probe = _HTTPProbe(http_up)
+
+    def refresh_inventory(self, force=False):
+        return {"success": True}
+
+
+class _Tools:
+    """NetworkTools stand-in: ICMP answers for some hosts, TCP for none"""
+
+    def __init__(self, icmp_up):
+        self.icmp_up = icmp_up
+        self.samples = []
+
+    def check_reachability(self, hosts, tcp_ports=(), timeout=2, use_icmp=True, fallback=None):
+        results = {host: {"up": host in self.icmp_up, "via": "icmp" if host in self.icmp_up else None,
+                          "rtt_ms": 1.0 if host in self.icmp_up else None} for host in hosts}
+        down = [host for host in hosts if not results[host]["up"]]
+        if down and fallback:
+            results.update(fallback(down))
+        return results
+
+    def record_samples(self, samples, metric="rtt"):
+        self.samples.extend((host, value, metric) for host, value in samples)
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    devices = {"PL01": [{"role": "Mcu", "host": "10.0.0.1"}, {"role": "Pai", "host": "10.0.0.2"}],
+               "PL02": [{"role": "Mcu", "host": "10.0.0.3"}]}
+    manager = _Manager(devices, http_up={"10.0.0.2"})
+    return FleetMonitor(manager=manager, network_tools=_Tools(icmp_up={"10.0.0.1"}),
+                        db_path=str(tmp_path / "netpulse.db"), down_after=2)
+
+
+def test_round_uses_http_only_for_hosts_still_down(monitor):
+    assert monitor.sync_inventory() == {"devices": 3, "added": 3, "removed": 0}
+
+    result = monitor.run_once(force=True)
+
+    assert result["checked"] == 3 and result["up"] == 2
+    assert sorted(monitor.manager.http_probe.probed) == ["10.0.0.2", "10.0.0.3"]
+    assert sorted(monitor.network_tools.samples) == [("10.0.0.2", 12.5, "http"), ("10.0.0.3", None, "http")]
+
+    states = {(d["marker"], d["role"]): (d["state"], d["via"]) for d in monitor.status()}
+    assert states[("PL01", "Mcu")] == ("up", "icmp")
+    assert states[("PL01", "Pai")] == ("up", "http")
+
+
+def test_device_goes_down_after_consecutive_failures(monitor):
+    monitor.sync_inventory()
+    monitor.run_once(force=True)
+    monitor.network_tools.icmp_up.clear()
+
+    monitor.run_once(force=True)
+    assert {d["role"]: d["state"] for d in monitor.status(marker="PL01")}["Mcu"] == "up"
+
+    result = monitor.run_once(force=True)
+    assert any(t["marker"] == "PL01" and t["role"] == "Mcu" and t["new_state"] == "down"
+               for t in result["transitions"])
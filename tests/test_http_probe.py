@@ -0,0 +1,79 @@
+"""
+Tests for the keep-alive HTTP probe
+"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from netpulse.automation.http_probe import HTTPProbe
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_probes_reuse_one_connection(server):
+    probe = HTTPProbe()
+    try:
+        results = [probe.probe(server) for _ in range(5)]
+    finally:
+        probe.close()
+
+    assert all(r["up"] and r["status"] == 200 and r["error"] is None for r in results)
+    assert all(r["latency_ms"] >= 0 for r in results)
+    assert len(_Handler.connections) == 1
+
+
+def test_head_falls_back_to_get(server):
+    probe = HTTPProbe(method="HEAD")
+    try:
+        result = probe.probe(server)
+    finally:
+        probe.close()
+
+    # The handler has no do_HEAD, so the server answers 501
+    assert result["up"] and result["status"] == 200
+    assert result["method"] == "GET"
+
+
+def test_refused_connection_is_down():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    probe = HTTPProbe(connect_timeout=1)
+    try:
+        result = probe.probe(f"127.0.0.1:{port}")
+    finally:
+        probe.close()
+
+    assert not result["up"]
+    assert result["status"] is None
+    assert result["error"] == "ConnectionError"
@@ -0,0 +1,51 @@
+"""
+Tests for the in-process ICMP sweep engine
+"""
+
+import socket
+import struct
+
+import pytest
+
+from netpulse.core.icmp_sweep import ICMP_ECHO_REPLY, ICMPV6_ECHO_REQUEST, IcmpSweeper
+
+
+def test_echo_request_checksum_verifies():
+    sweeper = IcmpSweeper()
+    packet = sweeper._build_request(42)
+    # A correct internet checksum makes the whole packet sum to zero
+    assert IcmpSweeper._checksum(packet) == 0
+    assert struct.unpack("!HH", packet[4:8]) == (sweeper.identifier, 42)
+
+
+def test_icmpv6_request_leaves_checksum_to_kernel():
+    packet = IcmpSweeper(family=socket.AF_INET6)._build_request(7)
+    assert packet[0] == ICMPV6_ECHO_REQUEST
+    assert packet[2:4] == b"\x00\x00"
+
+
+def test_parse_reply_strips_raw_ipv4_header():
+    sweeper = IcmpSweeper()
+    reply = struct.pack("!BBHHH", ICMP_ECHO_REPLY, 0, 0, 1234, 9) + b"payload"
+    ip_header = bytes([0x45]) + bytes(19)
+
+    assert sweeper._parse_reply(reply, is_raw=False) == (1234, 9)
+    assert sweeper._parse_reply(ip_header + reply, is_raw=True) == (1234, 9)
+    # Our own echo request looped back is not a reply
+    assert sweeper._parse_reply(sweeper._build_request(9), is_raw=False) is None
+    assert sweeper._parse_reply(b"\x00" * 4, is_raw=False) is None
+
+
+def test_sweep_loopback():
+    sweeper = IcmpSweeper(timeout=1)
+    try:
+        sock = sweeper.open_socket()
+    except OSError:
+        pytest.skip("ICMP sockets are not permitted here")
+
+    seen = []
+    replies = sweeper.sweep(["127.0.0.1", "127.0.0.2"], lambda ip, rtt: seen.append(ip), sock=sock)
+
+    assert sorted(ip for ip, _ in replies) == ["127.0.0.1", "127.0.0.2"]
+    assert all(rtt >= 0 for _, rtt in replies)
+    assert sorted(seen) == ["127.0.0.1", "127.0.0.2"]
@@ -0,0 +1,64 @@
+"""
+Tests for the local device inventory cache
+"""
+
+import sqlite3
+import time
+
+from netpulse.automation.inventory_cache import InventoryCache, normalize_marker
+
+DEVICES = [{"role": "Mcu", "host": "10.0.0.1"}, {"role": "Pai", "host": "10.0.0.2"}]
+
+
+def test_lookup_ignores_case_and_whitespace(tmp_path):
+    cache = InventoryCache(str(tmp_path / "inv.db"))
+    cache.store_devices({"PL01": DEVICES})
+
+    assert cache.get_devices("pl01") == DEVICES
+    assert cache.get_devices(" Pl01 ") == DEVICES
+    assert cache.all_devices() == {"PL01": DEVICES}
+    assert normalize_marker(" PL01 ") == "pl01"
+
+
+def test_full_inventory_answers_misses_and_expires(tmp_path):
+    cache = InventoryCache(str(tmp_path / "inv.db"), ttl=0.2)
+    cache.replace({"PL01": DEVICES}, stations=[{"code": "S1"}])
+
+    assert cache.get_devices("PL99") == []
+    assert not cache.has_entry("PL99") and cache.has_entry("pl01")
+    assert cache.is_complete()
+    assert cache.get_stations() == [{"code": "S1"}]
+
+    time.sleep(0.25)
+    assert cache.get_devices("PL01") is None
+    assert cache.get_devices("pl01", allow_stale=True) == DEVICES
+    assert cache.get_devices("PL99") is None
+
+
+def test_persisted_entries_reload_normalized(tmp_path):
+    path = str(tmp_path / "inv.db")
+    cache = InventoryCache(path)
+    cache.store_devices({"PL01": DEVICES})
+    cache.store_devices({"pl01": DEVICES[:1]})
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM inventory_devices").fetchone()[0] == 1
+
+    reloaded = InventoryCache(path)
+    assert reloaded.get_devices("PL01") == DEVICES[:1]
+
+
+def test_legacy_rows_with_different_case_merge(tmp_path):
+    path = str(tmp_path / "inv.db")
+    InventoryCache(path).get_devices("PL01")
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO inventory_devices VALUES ('PL01', '[]', 1)")
+        conn.execute("INSERT INTO inventory_devices VALUES ('pl01', ?, ?)",
+                     ('[{"role": "Mcu", "host": "10.0.0.1"}]', time.time()))
+
+    cache = InventoryCache(path)
+    assert cache.get_devices("Pl01") == DEVICES[:1]
+
+    cache.invalidate("PL01")
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM inventory_devices").fetchone()[0] == 0
@@ -0,0 +1,59 @@
+"""
+Tests for IPv6 targets in port scan and network discovery
+"""
+
+import ipaddress
+import socket
+
+import pytest
+
+from netpulse.core import network_tools
+from netpulse.core.port_scanner import AsyncPortScanner
+
+
+def test_port_scan_ipv6_loopback():
+    try:
+        listener = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        listener.bind(("::1", 0))
+    except OSError:
+        pytest.skip("IPv6 loopback is not available")
+    listener.listen(4)
+    port = listener.getsockname()[1]
+    try:
+        result = AsyncPortScanner(timeout=1).scan("::1", [port])
+    finally:
+        listener.close()
+    assert result["open"] == [port]
+
+
+class _Completed:
+    returncode = 0
+    stdout = (
+        "2001:db8::10 dev eth0 lladdr 52:54:00:00:00:10 REACHABLE\n"
+        "2001:db8::11 dev eth0 lladdr 52:54:00:00:00:11 STALE\n"
+        "2001:db8::12 dev eth0 FAILED\n"
+        "2001:db9::1 dev eth0 lladdr 52:54:00:00:00:20 REACHABLE\n"
+        "fe80::1 dev eth0 lladdr 52:54:00:00:00:01 router REACHABLE\n"
+        "garbage line\n"
+    )
+
+
+def test_read_neighbor_cache_filters_prefix_and_state(tools, monkeypatch):
+    monkeypatch.setattr(network_tools.platform, "system", lambda: "Linux")
+    monkeypatch.setattr(network_tools.subprocess, "run", lambda cmd, **kwargs: _Completed())
+
+    neighbors = tools._read_neighbor_cache(ipaddress.ip_network("2001:db8::/64"))
+    assert neighbors == ["2001:db8::10", "2001:db8::11"]
+
+
+def test_large_ipv6_prefix_uses_neighbour_candidates(tools, monkeypatch):
+    monkeypatch.setattr(tools, "_ipv6_neighbor_candidates", lambda net, timeout: ["2001:db8::10"])
+    monkeypatch.setattr(tools, "_discover_with_icmp",
+                        lambda targets, version, timeout, callback: [{"ip": ip, "status": "alive"}
+                                                                     for ip in targets])
+
+    result = tools.network_discovery("2001:db8::/64", timeout=1)
+
+    assert result["success"]
+    assert result["hosts_scanned"] == 1
+    assert result["alive_hosts"] == [{"ip": "2001:db8::10", "status": "alive"}]
@@ -0,0 +1,81 @@
+"""
+Tests for the constant-memory latency statistics
+"""
+
+import random
+import statistics
+
+import pytest
+
+from netpulse.core.latency_stats import LatencyStats, P2Quantile
+
+
+def _exact(values, p):
+    ordered = sorted(values)
+    return ordered[int(p * (len(ordered) - 1))]
+
+
+@pytest.mark.parametrize("p", [0.5, 0.95, 0.99])
+def test_p2_tracks_exponential_quantiles(p):
+    rng = random.Random(1234)
+    values = [rng.expovariate(1 / 20) for _ in range(20000)]
+    estimator = P2Quantile(p)
+    for value in values:
+        estimator.add(value)
+    assert estimator.value() == pytest.approx(_exact(values, p), rel=0.01)
+
+
+def test_p2_with_few_samples_is_exact():
+    estimator = P2Quantile(0.5)
+    assert estimator.value() is None
+    for value in (9.0, 1.0, 5.0):
+        estimator.add(value)
+    assert estimator.value() == 5.0
+
+
+def test_p2_handles_constant_input():
+    estimator = P2Quantile(0.95)
+    for _ in range(100):
+        estimator.add(7.0)
+    assert estimator.value() == 7.0
+
+
+def test_running_moments_match_statistics():
+    rng = random.Random(7)
+    values = [rng.uniform(1, 50) for _ in range(500)]
+    stats = LatencyStats()
+    for value in values:
+        stats.add(value)
+    assert stats.mean == pytest.approx(statistics.fmean(values))
+    assert stats.stddev == pytest.approx(statistics.stdev(values))
+    assert (stats.min, stats.max) == (min(values), max(values))
+
+
+def test_jitter_follows_rfc3550():
+    stats = LatencyStats()
+    for value in (10.0, 20.0, 10.0):
+        stats.add(value)
+    expected = 10 / 16
+    expected += (10 - expected) / 16
+    assert stats.jitter == pytest.approx(expected)
+
+
+def test_snapshot_with_loss():
+    stats = LatencyStats()
+    stats.add(2.0)
+    stats.add_loss(3)
+    stats.add_loss(-1)
+    snapshot = stats.snapshot()
+    assert stats.sent == 4
+    assert snapshot["loss_percent"] == 75.0
+    assert snapshot["stddev"] == 0.0
+    assert snapshot["jitter"] is None
+    assert snapshot["p50"] == snapshot["p99"] == 2.0
+
+
+def test_empty_snapshot():
+    snapshot = LatencyStats().snapshot()
+    assert snapshot["loss_percent"] == 0.0
+    assert snapshot["avg"] is None
+    assert snapshot["stddev"] is None
+    assert snapshot["p95"] is None
@@ -0,0 +1,102 @@
+"""
+Tests for the pooled SQL Server connections
+"""
+
+import time
+
+import pytest
+
+odbc_pool = pytest.importorskip("netpulse.automation.odbc_pool", exc_type=ImportError)
+ODBCConnectionPool = odbc_pool.ODBCConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        if self.connection.dead:
+            raise odbc_pool.pyodbc.Error("connection lost")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.dead = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.dead:
+            raise odbc_pool.pyodbc.Error("connection lost")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connects(monkeypatch):
+    opened = []
+
+    def connect(conn_str):
+        connection = FakeConnection()
+        opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(odbc_pool.pyodbc, "connect", connect)
+    return opened
+
+
+def test_pool_reuses_connections(connects):
+    pool = ODBCConnectionPool("DSN=test", warm=False)
+    assert pool.run(lambda con: 1) == 1
+    assert pool.run(lambda con: 2) == 2
+    assert len(connects) == 1
+    assert pool.stats() == {"open": 1, "idle": 1, "in_use": 0}
+
+
+def test_pool_warms_min_size_connections(connects):
+    pool = ODBCConnectionPool("DSN=test", min_size=3, warm=False)
+    assert pool.warm() == 3
+    assert pool.stats() == {"open": 3, "idle": 3, "in_use": 0}
+    assert pool.warm() == 0
+
+
+def test_pool_warms_in_background(connects):
+    pool = ODBCConnectionPool("DSN=test", min_size=2)
+    deadline = time.monotonic() + 2
+    while pool.stats()["idle"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["idle"] == 2
+
+
+def test_run_retries_on_dead_connection(connects):
+    pool = ODBCConnectionPool("DSN=test", warm=False, validate_after=3600)
+    pool.run(lambda con: None)
+    connects[0].dead = True
+
+    def query(con):
+        if con.dead:
+            raise odbc_pool.pyodbc.Error("connection lost")
+        return "rows"
+
+    assert pool.run(query) == "rows"
+    assert connects[0].closed
+    assert pool.stats()["open"] == 1
+
+
+def test_closed_pool_rejects_acquire(connects):
+    pool = ODBCConnectionPool("DSN=test", warm=False)
+    pool.run(lambda con: None)
+    pool.close_all()
+    assert pool.closed
+    assert connects[0].closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,73 @@
+"""
+Tests for the asyncio port scanner and port list parsing
+"""
+
+import asyncio
+import socket
+
+import pytest
+
+from netpulse.core.port_scanner import AsyncPortScanner, parse_ports
+
+
+def test_parse_ports_range_and_list():
+    assert list(parse_ports("20-25")) == [20, 21, 22, 23, 24, 25]
+    assert list(parse_ports("22, 80,443")) == [22, 80, 443]
+
+
+@pytest.mark.parametrize("ports", ["0-10", "65530-65536", "80,70000", "-1", "100-50"])
+def test_parse_ports_rejects_out_of_range(ports):
+    with pytest.raises(ValueError):
+        parse_ports(ports)
+
+
+def test_scan_classifies_open_and_closed():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(8)
+    open_port = listener.getsockname()[1]
+
+    # Bind and release a port so it is very likely closed
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(("127.0.0.1", 0))
+    closed_port = probe.getsockname()[1]
+    probe.close()
+
+    seen = []
+    try:
+        scanner = AsyncPortScanner(timeout=1, concurrency=4)
+        result = scanner.scan("127.0.0.1", [open_port, closed_port],
+                              lambda port, state: seen.append((port, state)))
+    finally:
+        listener.close()
+
+    assert result["open"] == [open_port]
+    assert result["closed"] == [closed_port]
+    assert sorted(seen) == sorted([(open_port, "open"), (closed_port, "closed")])
+
+
+def _closed_port():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    return port
+
+
+def test_scan_inside_a_running_loop():
+    port = _closed_port()
+
+    async def main():
+        scanner = AsyncPortScanner(timeout=1)
+        return scanner.scan("127.0.0.1", [port]), await scanner.scan_async("127.0.0.1", [port])
+
+    blocking, awaited = asyncio.run(main())
+    assert blocking["closed"] == awaited["closed"] == [port]
+
+
+def test_port_scan_reports_invalid_port():
+    from netpulse.core.network_tools import NetworkTools
+
+    result = NetworkTools().port_scan("127.0.0.1", "1,99999")
+    assert not result["success"]
+    assert "99999" in result["error"]
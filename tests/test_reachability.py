@@ -0,0 +1,86 @@
+"""
+Tests for bulk reachability checks and the samples they record
+"""
+
+import asyncio
+
+import pytest
+
+from netpulse.core import network_tools
+
+
+class _Sweeper:
+    replies = [("10.0.0.1", 1.234)]
+
+    def __init__(self, **kwargs):
+        pass
+
+    def sweep(self, targets):
+        return [reply for reply in self.replies if reply[0] in targets]
+
+
+@pytest.fixture
+def probes(tools, monkeypatch):
+    tcp_up = {"10.0.0.2": 3.0, "10.0.0.3": 4.0}
+
+    async def tcp(hosts, ports, timeout, concurrency):
+        return [(host, tcp_up[host]) for host in hosts if host in tcp_up]
+
+    monkeypatch.setattr(network_tools, "IcmpSweeper", _Sweeper)
+    monkeypatch.setattr(tools, "_tcp_reachability", tcp)
+    return tools
+
+
+def _values(store, host, metric):
+    return [point["value"] for point in store.query(host, metric=metric, resolution="raw")["points"]]
+
+
+def test_icmp_loss_recorded_only_for_hosts_that_stay_down(probes, timeseries):
+    hosts = ["10.0.0.1", "10.0.0.2", "10.0.0.4", "10.0.0.5"]
+    results = probes.check_reachability(
+        hosts, fallback=lambda down: {"10.0.0.5": {"up": True, "via": "http", "rtt_ms": 9.0}}
+        if "10.0.0.5" in down else {})
+
+    assert results["10.0.0.1"] == {"up": True, "via": "icmp", "rtt_ms": 1.23}
+    assert results["10.0.0.2"]["via"] == "tcp"
+    assert results["10.0.0.4"] == {"up": False, "via": None, "rtt_ms": None}
+    assert results["10.0.0.5"]["via"] == "http"
+
+    assert _values(timeseries, "10.0.0.1", "rtt") == [1.23]
+    # Up over TCP or HTTP: no ICMP loss even though ping went unanswered
+    assert _values(timeseries, "10.0.0.2", "rtt") == []
+    assert _values(timeseries, "10.0.0.5", "rtt") == []
+    assert _values(timeseries, "10.0.0.4", "rtt") == [None]
+    assert _values(timeseries, "10.0.0.2", "tcp") == [3.0]
+    assert _values(timeseries, "10.0.0.4", "tcp") == [None]
+
+
+def test_no_icmp_samples_without_icmp_socket(probes, timeseries, monkeypatch):
+    class NoSocket(_Sweeper):
+        def sweep(self, targets):
+            raise PermissionError("Operation not permitted")
+
+    monkeypatch.setattr(network_tools, "IcmpSweeper", NoSocket)
+    results = probes.check_reachability(["10.0.0.2", "10.0.0.4"])
+
+    assert results["10.0.0.2"]["up"] and not results["10.0.0.4"]["up"]
+    assert _values(timeseries, "10.0.0.4", "rtt") == []
+
+
+def test_fallback_only_sees_hosts_still_down(probes):
+    seen = []
+    probes.check_reachability(["10.0.0.1", "10.0.0.3", "10.0.0.9"],
+                              fallback=lambda down: seen.extend(down) or {})
+    assert seen == ["10.0.0.9"]
+
+
+def test_record_samples_is_public(tools, timeseries):
+    tools.record_samples([("sw1", 5.0), ("sw1", None)], metric="http")
+    assert _values(timeseries, "sw1", "http") == [5.0, None]
+
+
+def test_reachability_inside_a_running_loop(probes):
+    async def main():
+        return probes.check_reachability(["10.0.0.2"], use_icmp=False)
+
+    assert asyncio.run(main())["10.0.0.2"]["via"] == "tcp"
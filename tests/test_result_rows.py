@@ -0,0 +1,38 @@
+"""
+Tests for splitting results into typed rows and a compact payload
+"""
+
+from netpulse.core.result_rows import pack_payload, result_items, result_summary, unpack_payload
+
+
+def test_summary_of_a_ping():
+    result = {"host": "10.0.0.1", "success": True, "output": "...",
+              "statistics": {"avg_time": "1.5", "loss_percent": 25}}
+    assert result_summary(result) == {"host": "10.0.0.1", "success": True,
+                                      "latency_ms": 1.5, "loss_percent": 25.0}
+
+
+def test_summary_falls_back_to_other_fields():
+    summary = result_summary({"network": "10.0.0.0/24", "avg_latency": 3, "packet_loss": 0})
+    assert summary == {"host": "10.0.0.0/24", "success": False, "latency_ms": 3.0, "loss_percent": 0.0}
+    assert result_summary({})["host"] is None
+
+
+def test_items_of_scans_and_lookups():
+    scan = {"host": "10.0.0.1", "open_ports": [{"port": "22", "service": "ssh"}, {"port": 80}]}
+    assert result_items(scan) == [("open_port", "10.0.0.1", 22, "ssh", None),
+                                  ("open_port", "10.0.0.1", 80, None, None)]
+
+    discovery = {"network": "10.0.0.0/30", "alive_hosts": [{"ip": "10.0.0.1", "rtt_ms": 0.4}]}
+    assert result_items(discovery) == [("alive_host", "10.0.0.1", None, None, 0.4)]
+
+    lookup = {"domain": "example.org", "records": {"MX_records": ["10 mail.example.org"],
+                                                   "query_time": 12}}
+    assert result_items(lookup) == [("dns_mx", "example.org", None, "10 mail.example.org", None)]
+
+
+def test_payload_round_trip_drops_output():
+    result = {"host": "10.0.0.1", "output": "x" * 10000, "open_ports": [{"port": 22}], "count": 3}
+    payload = pack_payload(result)
+    assert len(payload) < 100
+    assert unpack_payload(payload) == {"host": "10.0.0.1", "open_ports": [{"port": 22}], "count": 3}
@@ -0,0 +1,221 @@
+"""
+Tests for the scheduled task runner
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from netpulse.automation.scheduler import TaskScheduler, _to_epoch, _to_utc_text
+from netpulse.core.config_manager import ConfigManager
+from netpulse.core.network_tools import NetworkTools
+
+
+class FakeDeviceManager:
+    def __init__(self):
+        self.calls = []
+
+    def show_pai_version(self, marker):
+        self.calls.append(marker)
+        return {"success": True, "marker": marker}
+
+
+@pytest.fixture
+def config(tmp_path):
+    manager = ConfigManager(app_dir=str(tmp_path))
+    yield manager
+    manager.close()
+
+
+def _scheduler(config, **kwargs):
+    runs = []
+    kwargs.setdefault("on_result", runs.append)
+    scheduler = TaskScheduler(config, network_tools=NetworkTools(), device_manager=FakeDeviceManager(),
+                              refresh_interval=60, **kwargs)
+    scheduler.runs = runs
+    return scheduler
+
+
+def _row(config, task_id):
+    return next(row for row in config.get_scheduled_tasks() if row["id"] == task_id)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def _add_row(config, name="subnet", schedule_type="interval", schedule_value="1h", next_run=None):
+    return config.add_scheduled_task(name, "calc_subnet_info", "10.0.0.0/24", schedule_type,
+                                     schedule_value, True, next_run)
+
+
+def test_tasks_are_ordered_by_next_run(config):
+    now = time.time()
+    late = _add_row(config, "late", next_run=_to_utc_text(now + 3600))
+    soon = _add_row(config, "soon", next_run=_to_utc_text(now + 60))
+    scheduler = _scheduler(config)
+    assert scheduler.reload() == {"tasks": 2, "added": 2, "removed": 0}
+
+    assert [task["id"] for task in scheduler.tasks()] == [soon, late]
+    with scheduler._lock:
+        assert scheduler._next_due() == scheduler._tasks[soon].due
+
+
+def test_stale_heap_entries_are_skipped(config):
+    now = time.time()
+    first = _add_row(config, "first", next_run=_to_utc_text(now + 60))
+    second = _add_row(config, "second", next_run=_to_utc_text(now + 120))
+    scheduler = _scheduler(config)
+    scheduler.reload()
+
+    with scheduler._lock:
+        # Rescheduling leaves the old entry in the heap
+        scheduler._push(scheduler._tasks[first], now + 600)
+        assert scheduler._next_due() == scheduler._tasks[second].due
+        scheduler._tasks[second].row["enabled"] = False
+        assert scheduler._next_due() == now + 600
+        assert len(scheduler._schedule) == 1
+
+
+def test_missed_runs_are_caught_up_once(config):
+    now = time.time()
+    missed = now - 3 * 3600 - 60
+    task_id = _add_row(config, next_run=_to_utc_text(missed))
+    scheduler = _scheduler(config)
+    scheduler.start()
+    try:
+        _wait_for(lambda: _row(config, task_id)["last_run"] is not None)
+    finally:
+        scheduler.stop()
+
+    assert len(scheduler.runs) == 1
+    assert scheduler.runs[0]["success"]
+    row = _row(config, task_id)
+    # The missed slots are skipped, keeping the original phase
+    assert _to_epoch(row["next_run"]) == pytest.approx(missed + 4 * 3600, abs=1)
+    assert _to_epoch(row["last_run"]) == pytest.approx(now, abs=5)
+
+
+def test_no_catch_up_skips_missed_runs(config):
+    now = time.time()
+    missed = now - 3 * 3600 - 60
+    task_id = _add_row(config, next_run=_to_utc_text(missed))
+    scheduler = _scheduler(config, catch_up=False)
+    scheduler.reload()
+
+    assert scheduler._tasks[task_id].due == pytest.approx(missed + 4 * 3600, abs=1)
+    assert _to_epoch(_row(config, task_id)["next_run"]) == pytest.approx(missed + 4 * 3600, abs=1)
+    assert scheduler.runs == []
+
+
+def test_one_off_task_is_disabled_after_running(config):
+    at = (datetime.now() - timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
+    task_id = _add_row(config, "once", schedule_type="once", schedule_value=at)
+    scheduler = _scheduler(config)
+    scheduler.start()
+    try:
+        _wait_for(lambda: not _row(config, task_id)["enabled"])
+    finally:
+        scheduler.stop()
+
+    row = _row(config, task_id)
+    assert row["next_run"] is None and row["last_run"] is not None
+    assert len(scheduler.runs) == 1
+    assert scheduler.tasks()[0]["next_run"] is None
+
+
+def test_past_one_off_without_catch_up_is_disabled(config):
+    at = (datetime.now() - timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")
+    task_id = _add_row(config, "once", schedule_type="once", schedule_value=at)
+    scheduler = _scheduler(config, catch_up=False)
+    scheduler.reload()
+    assert not _row(config, task_id)["enabled"]
+    assert scheduler._schedule == []
+
+
+def test_task_edited_during_a_run_is_rescheduled_afterwards(config):
+    scheduler = _scheduler(config)
+    started, release = threading.Event(), threading.Event()
+    execute = scheduler._execute
+
+    def blocking_execute(row):
+        started.set()
+        release.wait(5)
+        return execute(row)
+
+    scheduler._execute = blocking_execute
+    task_id = scheduler.add_task("subnet", "calc_subnet_info", "10.0.0.0/24", "interval", "1h")
+    scheduler.start()
+    try:
+        assert started.wait(5)
+        config.update_scheduled_task(task_id, schedule_value="2h")
+        scheduler.reload()
+        task = scheduler._tasks[task_id]
+        assert task.edited and task.running
+        assert task.row["schedule_value"] == "1h"
+
+        release.set()
+        _wait_for(lambda: scheduler._tasks[task_id] is not task)
+    finally:
+        release.set()
+        scheduler.stop()
+
+    replacement = scheduler._tasks[task_id]
+    assert replacement.interval == 7200
+    assert not replacement.running
+    assert replacement.due == pytest.approx(time.time() + 7200, abs=5)
+    assert len(scheduler.runs) == 1
+
+
+def test_run_task_keeps_the_schedule_and_records_history(config):
+    scheduler = _scheduler(config)
+    task_id = scheduler.add_task("subnet", "calc_subnet_info", "10.0.0.0/24", "cron", "0 3 * * *")
+    before = _row(config, task_id)
+
+    record = scheduler.run_task(task_id)
+    assert record["success"]
+    assert _row(config, task_id) == before
+    config.flush_history()
+    assert config.get_history()[0]["command"] == "calc_subnet_info"
+    assert scheduler.run_task(task_id + 1)["success"] is False
+
+
+def test_add_task_validates(config):
+    scheduler = _scheduler(config)
+    with pytest.raises(ValueError):
+        scheduler.add_task("bad", "calc_subnet_info", "", "weekly", "1")
+    with pytest.raises(ValueError):
+        scheduler.add_task("bad", "calc_subnet_info", "", "interval", "soon")
+    with pytest.raises(ValueError):
+        scheduler.add_task("bad", "calc_subnet_info", "", "once", "2000-01-01 00:00:00")
+    with pytest.raises(ValueError):
+        scheduler.add_task("bad", "format_disk", "")
+    assert config.get_scheduled_tasks() == []
+
+
+def test_parameters_are_parsed():
+    parse = TaskScheduler._parse_parameters
+    assert parse("") == ([], {})
+    assert parse("10.0.0.1") == (["10.0.0.1"], {})
+    assert parse('["a", 2]') == (["a", 2], {})
+    assert parse('{"marker": "PL01"}') == ([], {"marker": "PL01"})
+
+
+def test_device_commands_are_checked(config):
+    pytest.importorskip("netpulse.automation.batch", exc_type=ImportError)
+    scheduler = _scheduler(config)
+
+    assert scheduler._resolve("show_pai_version", "PL01")() == {"success": True, "marker": "PL01"}
+    assert scheduler.device_manager.calls == ["PL01"]
+
+    for parameters in ('["PL01", "PL02"]', '{"marker": "PL01", "bogus": 1}', ""):
+        with pytest.raises(ValueError):
+            scheduler._resolve("show_pai_version", parameters)
+    with pytest.raises(ValueError):
+        scheduler._resolve("no_such_command", "PL01")
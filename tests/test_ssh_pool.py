@@ -0,0 +1,140 @@
+"""
+Tests for the pooled SSH connections
+"""
+
+import io
+import threading
+
+import paramiko
+import pytest
+
+from netpulse.automation.ssh_pool import SSHConnectionPool
+
+
+class _Channel:
+    def close(self):
+        pass
+
+
+class _Stream(io.BytesIO):
+    channel = _Channel()
+
+
+class FakeClient:
+    def __init__(self, fail_exec=False):
+        self.fail_exec = fail_exec
+        self.closed = False
+        self.commands = []
+
+    def exec_command(self, command, timeout=None):
+        if self.fail_exec or self.closed:
+            raise paramiko.SSHException("channel open failed")
+        self.commands.append(command)
+        return None, _Stream(b"ok\n"), _Stream(b"")
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(SSHConnectionPool):
+    def __init__(self, clients):
+        super().__init__({"username": "admin", "password": "x"}, idle_timeout=3600)
+        self.clients = list(clients)
+
+    def _connect(self, host, timeout):
+        return self.clients.pop(0)
+
+    def _is_healthy(self, client):
+        return not client.closed and not client.fail_exec
+
+
+def test_connection_is_reused():
+    client = FakeClient()
+    pool = FakePool([client])
+    assert pool.exec_command("10.0.0.1", "uptime") == ("ok", "")
+    assert pool.exec_command("10.0.0.1", "hostname") == ("ok", "")
+    assert client.commands == ["uptime", "hostname"]
+    assert pool.stats() == {"connections": 1, "active": 0}
+    pool.close_all()
+
+
+def test_discard_keeps_shared_client_open_for_other_users():
+    first, second = FakeClient(), FakeClient()
+    pool = FakePool([first, second])
+
+    held = pool.acquire("10.0.0.1")
+    assert held is first
+
+    # Another thread finds the transport stale and reconnects
+    first.fail_exec = True
+    assert pool.exec_command("10.0.0.1", "uptime") == ("ok", "")
+    assert second.commands == ["uptime"]
+    assert not first.closed, "a client still leased elsewhere must not be closed"
+
+    # A new lease on the replacement connection...
+    replacement = pool.acquire("10.0.0.1")
+    assert replacement is second
+
+    # ...is not affected by the old user releasing its stale client
+    pool.release("10.0.0.1", held)
+    assert first.closed
+    assert pool.stats() == {"connections": 1, "active": 1}
+
+    pool.release("10.0.0.1", replacement)
+    assert pool.stats() == {"connections": 1, "active": 0}
+    pool.close_all()
+    assert second.closed
+
+
+def test_failed_command_on_dead_transport_retires_connection():
+    client = FakeClient()
+    pool = FakePool([client, FakeClient()])
+
+    class Boom(Exception):
+        pass
+
+    def explode(command, timeout=None):
+        client.closed = True
+        raise Boom()
+
+    client.exec_command = explode
+    with pytest.raises(Boom):
+        pool.exec_command("10.0.0.1", "reboot")
+
+    assert pool.stats() == {"connections": 0, "active": 0}
+    pool.close_all()
+
+
+def test_handshake_locks_do_not_accumulate():
+    hosts = [f"10.0.{i // 250}.{i % 250}" for i in range(300)]
+    pool = FakePool([FakeClient() for _ in hosts])
+    for host in hosts:
+        pool.exec_command(host, "uptime")
+    assert pool._key_locks == {}
+    assert pool.stats()["connections"] == 300
+    pool.close_all()
+
+
+def test_concurrent_checkouts_share_one_handshake():
+    pool = FakePool([FakeClient()])
+    gate = threading.Event()
+    connect = pool._connect
+
+    def slow_connect(host, timeout):
+        gate.wait(5)
+        return connect(host, timeout)
+
+    pool._connect = slow_connect
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.acquire("10.0.0.1")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(map(id, results))) == 1
+    assert pool._connections[pool._key("10.0.0.1")].active == 4
+    assert pool._key_locks == {}
+    pool.close_all()
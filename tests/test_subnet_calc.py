@@ -0,0 +1,60 @@
+"""
+Tests for the arithmetic subnet calculator
+"""
+
+import ipaddress
+
+import pytest
+
+
+@pytest.mark.parametrize("cidr", ["10.0.0.0/24", "10.0.0.0/30", "10.0.0.0/31", "10.0.0.5/32",
+                                  "2001:db8::/126", "2001:db8::/127", "2001:db8::1/128"])
+def test_usable_range_matches_hosts(tools, cidr):
+    net = ipaddress.ip_network(cidr, strict=False)
+    hosts = list(net.hosts()) or [net.network_address]
+    first, last, count = tools._usable_range(net)
+
+    assert count == len(list(net.hosts()))
+    assert (first, last) == (int(hosts[0]), int(hosts[-1]))
+
+
+def test_usable_range_huge_prefix_without_iterating(tools):
+    net = ipaddress.ip_network("2001:db8::/32")
+    first, last, count = tools._usable_range(net)
+    assert count == 2 ** 96 - 1
+    assert last == int(net.broadcast_address)
+
+
+def test_calc_subnet_info_with_mask(tools):
+    info = tools.calc_subnet_info("192.168.1.77 255.255.255.192")
+
+    assert info["success"]
+    assert info["cidr_notation"] == "192.168.1.64/26"
+    assert info["ip_address"] == "192.168.1.77"
+    assert info["first_usable"] == "192.168.1.65"
+    assert info["last_usable"] == "192.168.1.126"
+    assert info["usable_host_count"] == 62
+    assert info["ip_class"] == "C"
+
+
+def test_calc_subnet_info_rejects_garbage(tools):
+    assert not tools.calc_subnet_info("not a subnet")["success"]
+
+
+def test_calc_subnet_batch_rows_errors_and_overlaps(tools):
+    result = tools.calc_subnet_batch("10.0.0.0/16, 10.0.5.0/24\n10.1.0.0/16\nbogus\n2001:db8::/48,2001:db8:0:1::/64")
+
+    assert result["success"]
+    assert result["subnet_count"] == 5
+    assert [row[1] for row in result["rows"]][:3] == ["10.0.0.0/16", "10.0.5.0/24", "10.1.0.0/16"]
+    assert result["errors"][0]["input"] == "bogus"
+    assert sorted(result["overlaps"]) == [["10.0.0.0/16", "10.0.5.0/24"],
+                                          ["2001:db8::/48", "2001:db8:0:1::/64"]]
+
+    usable = dict(zip(result["columns"], result["rows"][1]))["usable_host_count"]
+    assert usable == 254
+
+
+def test_calc_subnet_batch_no_overlap_across_families(tools):
+    result = tools.calc_subnet_batch(["0.0.0.0/0", "::/0"])
+    assert result["overlaps"] == []
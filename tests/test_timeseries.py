@@ -0,0 +1,111 @@
+"""
+Tests for the per-target time series store
+"""
+
+import os
+
+from netpulse.core.network_tools import NetworkTools
+from netpulse.core.timeseries import TimeSeriesStore
+
+# Fixed hour boundary so bucket edges are predictable
+T0 = 1_700_002_800.0
+
+
+def _fill(store, target="10.0.0.1", seconds=180, lost_every=10):
+    for i in range(seconds):
+        value = None if i % lost_every == lost_every - 1 else float(i % 7 + 1)
+        store.record(target, value, timestamp=T0 + i)
+
+
+def test_store_is_created_lazily(tmp_path):
+    root = tmp_path / "series"
+    store = TimeSeriesStore(str(root))
+    assert not root.exists()
+    assert store.targets() == []
+    assert store.query("nowhere")["points"] == []
+
+    store.record("10.0.0.1", 1.5, timestamp=T0)
+    store.flush()
+    assert root.is_dir()
+
+
+def test_network_tools_records_nothing_without_a_store():
+    tools = NetworkTools()
+    assert tools.timeseries is None
+    tools.record_samples([("10.0.0.1", 1.0)])
+
+
+def test_raw_query_and_range(timeseries):
+    _fill(timeseries, seconds=30)
+    points = timeseries.query("10.0.0.1", resolution="raw")["points"]
+    assert len(points) == 30
+    assert points[0] == {"time": T0, "value": 1.0}
+    assert points[9]["value"] is None
+
+    window = timeseries.query("10.0.0.1", T0 + 5, T0 + 10, resolution="raw")["points"]
+    assert [p["time"] for p in window] == [T0 + i for i in range(5, 10)]
+
+
+def test_minute_rollups_include_the_open_bucket(timeseries):
+    _fill(timeseries)
+    result = timeseries.query("10.0.0.1", resolution="1m")
+    points = result["points"]
+    assert [p["time"] for p in points] == [T0, T0 + 60, T0 + 120]
+    for point in points:
+        assert point["count"] == 60
+        assert point["lost"] == 6
+        assert point["loss_percent"] == 10.0
+        assert point["min"] == 1.0
+        assert point["max"] == 7.0
+
+
+def test_resolution_is_picked_from_max_points(timeseries):
+    _fill(timeseries)
+    assert timeseries.query("10.0.0.1")["resolution"] == "raw"
+    assert timeseries.query("10.0.0.1", T0, T0 + 180, max_points=10)["resolution"] == "1m"
+    assert timeseries.query("10.0.0.1", T0, T0 + 180, max_points=2)["resolution"] == "1h"
+
+
+def test_summary(timeseries):
+    timeseries.record_many([("a", 2.0), ("b", None)], timestamp=T0)
+    timeseries.record_many([("a", 4.0), ("b", 1.0)], timestamp=T0 + 1)
+    summary = timeseries.summary("a")
+    assert (summary["count"], summary["lost"], summary["min"], summary["max"], summary["avg"]) == \
+        (2, 0, 2.0, 4.0, 3.0)
+    assert timeseries.summary("b")["loss_percent"] == 50.0
+    assert [t["target"] for t in timeseries.targets()] == ["a", "b"]
+
+
+def test_clock_step_back_is_clamped(timeseries):
+    timeseries.record("a", 1.0, timestamp=T0 + 10)
+    timeseries.record("a", 2.0, timestamp=T0)
+    times = [p["time"] for p in timeseries.query("a", resolution="raw")["points"]]
+    assert times == [T0 + 10, T0 + 10]
+
+
+def test_reload_rebuilds_open_buckets(tmp_path):
+    root = str(tmp_path / "series")
+    store = TimeSeriesStore(root, flush_every=1)
+    _fill(store, seconds=90)
+    before = store.query("10.0.0.1", resolution="1m")["points"]
+
+    reopened = TimeSeriesStore(root)
+    assert reopened.query("10.0.0.1", resolution="1m")["points"] == before
+    reopened.record("10.0.0.1", 3.0, timestamp=T0 + 90)
+    assert reopened.query("10.0.0.1", resolution="1m")["points"][-1]["count"] == 31
+
+
+def test_partial_record_is_truncated(tmp_path):
+    root = str(tmp_path / "series")
+    store = TimeSeriesStore(root, flush_every=1)
+    store.record("a", 1.0, timestamp=T0)
+    with open(os.path.join(root, "a.rtt.raw"), "ab") as f:
+        f.write(b"\x00\x01\x02")
+    assert TimeSeriesStore(root).query("a", resolution="raw")["points"] == [{"time": T0, "value": 1.0}]
+
+
+def test_prune_raw_keeps_rollups(timeseries):
+    _fill(timeseries)
+    assert timeseries.prune_raw(T0 + 60) == 60
+    assert timeseries.query("10.0.0.1", resolution="raw")["points"][0]["time"] == T0 + 60
+    assert len(timeseries.query("10.0.0.1", resolution="1m")["points"]) == 3